@@ -0,0 +1,134 @@
+"""
+Command line interface.
+"""
+
+from __future__ import annotations
+
+import time
+
+import click
+
+from localtileserver.tiler.handler import STRETCH_MODES
+from localtileserver.tiler.seed import seed_tiles
+from localtileserver.web.fastapi_app import click_run_app
+from localtileserver.web.routers.utils import parse_style_params
+
+
+class _DefaultGroup(click.Group):
+    """
+    Group that runs ``serve`` when the first argument is not a subcommand.
+
+    Keeps ``localtileserver FILENAME`` working as before subcommands.
+    """
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] != "--help":
+            args = ["serve", *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultGroup)
+def cli():
+    """
+    Serve or pre-render tiles of raster files.
+    """
+
+
+cli.add_command(click_run_app, name="serve")
+
+
+def _parse_bbox(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        bbox = tuple(float(v) for v in value.split(","))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4:
+        raise click.BadParameter("expected west,south,east,north")
+    return bbox
+
+
+@cli.command()
+@click.argument("filename")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--minzoom", type=int, help="Lowest zoom level. Defaults to the dataset's.")
+@click.option("--maxzoom", type=int, help="Highest zoom level. Defaults to the dataset's.")
+@click.option("--bbox", callback=_parse_bbox, help="west,south,east,north in EPSG:4326.")
+@click.option(
+    "-f", "--format", "img_format", default="png", type=click.Choice(["png", "jpeg", "webp"])
+)
+@click.option("--indexes", help="Comma-separated band indexes.")
+@click.option("--colormap", help="Colormap name.")
+@click.option("--vmin", help="Minimum value(s) for rescaling.")
+@click.option("--vmax", help="Maximum value(s) for rescaling.")
+@click.option("--nodata", help="Override the nodata value.")
+@click.option("--expression", help="Band math expression, e.g. (b4-b1)/(b4+b1).")
+@click.option("--stretch", type=click.Choice(sorted(STRETCH_MODES)))
+@click.option("--quality", type=int, help="JPEG/WEBP quality (1-100).")
+@click.option("--compression-level", type=int, help="PNG zlib level (1-9).")
+@click.option("-j", "--processes", type=int, help="Worker processes. Defaults to all CPUs.")
+@click.option("--overwrite", is_flag=True, help="Start over instead of resuming OUTPUT.")
+def seed(
+    filename,
+    output,
+    minzoom,
+    maxzoom,
+    bbox,
+    img_format,
+    indexes,
+    colormap,
+    vmin,
+    vmax,
+    nodata,
+    expression,
+    stretch,
+    quality,
+    compression_level,
+    processes,
+    overwrite,
+):
+    """
+    Pre-render the tiles of FILENAME into the MBTiles archive OUTPUT.
+
+    Rerunning the command resumes an interrupted run.
+    """
+    style = parse_style_params(
+        indexes=indexes, colormap=colormap, vmin=vmin, vmax=vmax, nodata=nodata
+    )
+    encoder_options = {
+        k: v
+        for k, v in {"quality": quality, "compression_level": compression_level}.items()
+        if v is not None
+    }
+    start = time.perf_counter()
+
+    def _progress(done, total):
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        click.echo(f"\r{done}/{total} tiles, {rate:.1f} tiles/s", nl=False, err=True)
+
+    try:
+        result = seed_tiles(
+            filename,
+            output,
+            minzoom=minzoom,
+            maxzoom=maxzoom,
+            bbox=bbox,
+            img_format=img_format,
+            processes=processes,
+            overwrite=overwrite,
+            progress=_progress,
+            expression=expression,
+            stretch=stretch,
+            encoder_options=encoder_options or None,
+            **style,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e)) from None
+    seconds = result["seconds"]
+    rendered = result["rendered"] + result["empty"]
+    click.echo(
+        f"\nRendered {rendered} tiles ({result['empty']} empty, {result['skipped']} already "
+        f"seeded) in {seconds:.1f} s, {rendered / max(seconds, 1e-9):.1f} tiles/s",
+        err=True,
+    )
@@ -46,6 +46,7 @@ from localtileserver.manager import AppManager
 from localtileserver.tiler import (
     format_to_encoding,
     get_building_docs,
+    get_dataset_profile,
     get_feature,
     get_meta_data,
     get_part,
@@ -57,6 +58,8 @@ from localtileserver.tiler import (
     palette_valid_or_raise,
     register_colormap,
 )
+from localtileserver.tiler.archive import TileArchive
+from localtileserver.tiler.export import export_tiles
 from localtileserver.tiler.handler import get_statistics
 from localtileserver.tiler.stac import (
     get_stac_info,
@@ -65,6 +68,8 @@ from localtileserver.tiler.stac import (
     get_stac_statistics,
     get_stac_tile,
 )
+from localtileserver.tiler.stream import DEFAULT_CHUNK_BUDGET, write_part
+from localtileserver.tiler.terrain import TERRAIN_SCHEMES
 from localtileserver.utilities import add_query_parameters
 
 BUILDING_DOCS = get_building_docs()
@@ -81,7 +86,8 @@ class TilerInterface:
     Parameters
     ----------
     source : pathlib.Path, str, Reader, DatasetReaderBase
-        The source dataset to use for the tile client.
+        The source dataset to use for the tile client. Paths of MBTiles
+        and PMTiles archives serve their pre-rendered tiles as stored.
     """
 
     def __init__(
@@ -129,6 +135,8 @@ class TilerInterface:
         str
             The file path or URI string.
         """
+        if isinstance(self.reader, TileArchive):
+            return self.reader.input
         return self.dataset.name
 
     @property
@@ -166,7 +174,7 @@ class TilerInterface:
         list of str
             Band name strings extracted from the dataset metadata.
         """
-        return [desc[0] for desc in self.metadata["band_descriptions"]]
+        return list(get_dataset_profile(self.reader).band_names)
 
     @property
     def min_zoom(self):
@@ -178,10 +186,7 @@ class TilerInterface:
         int
             The minimum zoom level.
         """
-        if hasattr(self.info, "minzoom"):
-            return self.info.minzoom
-        else:
-            return self.reader.minzoom
+        return get_dataset_profile(self.reader).minzoom
 
     @property
     def max_zoom(self):
@@ -193,10 +198,7 @@ class TilerInterface:
         int
             The maximum zoom level.
         """
-        if hasattr(self.info, "maxzoom"):
-            return self.info.maxzoom
-        else:
-            return self.reader.maxzoom
+        return get_dataset_profile(self.reader).maxzoom
 
     @property
     def default_zoom(self):
@@ -673,6 +675,113 @@ class TilerInterface:
                 f.write(result)
         return result
 
+    def export_tiles(
+        self,
+        path: pathlib.Path | str,
+        zooms: int | Iterable[int],
+        bbox: tuple[float, float, float, float] | None = None,
+        encoding: str = "PNG",
+        workers: int | None = None,
+        executor: str = "thread",
+        **style,
+    ) -> dict:
+        """
+        Render tiles into an MBTiles or PMTiles archive for offline use.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Location of the archive. A ``.pmtiles`` suffix writes PMTiles,
+            ``.mbtiles`` writes MBTiles. Replaced if it exists.
+        zooms : int or iterable of int
+            Zoom level(s) to render, e.g. ``range(8, 13)``.
+        bbox : tuple of float, optional
+            ``(west, south, east, north)`` in EPSG:4326. Defaults to the
+            bounds of the raster.
+        encoding : str, optional
+            The tile encoding: ``"PNG"``, ``"JPEG"`` or ``"WEBP"``.
+            Defaults to ``"PNG"``.
+        workers : int, optional
+            Number of render threads or processes. Defaults to the number
+            of CPUs.
+        executor : {"thread", "process"}, optional
+            Render in threads or in processes. Defaults to ``"thread"``.
+        **style
+            ``indexes``, ``colormap``, ``vmin``, ``vmax``, ``nodata``,
+            ``expression`` and ``stretch`` as for :meth:`tile`.
+
+        Returns
+        -------
+        dict
+            Tile counts and timings, see
+            :func:`localtileserver.tiler.export.export_tiles`.
+        """
+        if style.get("expression") and style.get("indexes") is not None:
+            raise ValueError("Cannot use both 'expression' and 'indexes'.")
+        return export_tiles(
+            self.filename,
+            path,
+            zooms,
+            bbox=bbox,
+            img_format=format_to_encoding(encoding),
+            workers=workers,
+            executor=executor,
+            **style,
+        )
+
+    def write_part(
+        self,
+        path: pathlib.Path | str,
+        bbox: tuple[float, float, float, float],
+        encoding: str = "tif",
+        max_size: int | None = None,
+        chunk_budget: int = DEFAULT_CHUNK_BUDGET,
+        **style,
+    ) -> dict:
+        """
+        Write a large bounding box extraction to a file in bounded memory.
+
+        Unlike :meth:`part`, the image is read, styled and written in
+        strips, so outputs of tens of thousands of pixels per side fit in
+        memory.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Output file. Replaced if it exists.
+        bbox : tuple of float
+            Bounding box as ``(left, bottom, right, top)``.
+        encoding : str, optional
+            ``"tif"`` for a tiled, compressed GeoTIFF or ``"png"``.
+            Defaults to ``"tif"``.
+        max_size : int, optional
+            Maximum dimension of the output image in pixels. Defaults to
+            the native resolution of the raster.
+        chunk_budget : int, optional
+            Approximate number of bytes used per strip. Defaults to 64 MiB.
+        **style
+            ``indexes``, ``colormap``, ``vmin``, ``vmax``, ``nodata``,
+            ``expression``, ``stretch``, ``dst_crs`` and ``bounds_crs`` as
+            for :meth:`part`.
+
+        Returns
+        -------
+        dict
+            Output size and strip layout, see
+            :func:`localtileserver.tiler.stream.write_part`.
+        """
+        if style.get("expression") and style.get("indexes") is not None:
+            raise ValueError("Cannot use both 'expression' and 'indexes'.")
+        return write_part(
+            self.reader,
+            bbox,
+            path,
+            img_format=format_to_encoding(encoding),
+            max_size=max_size,
+            chunk_budget=chunk_budget,
+            **style,
+        )
+
     def _repr_png_(self):
         """
         Return a PNG thumbnail for IPython/Jupyter rich display.
@@ -1014,6 +1123,7 @@ class TileServerMixin:
         client: bool = False,
         expression: str | None = None,
         stretch: str | None = None,
+        encoding: str = "png",
     ):
         """
         Get slippy maps tile URL (e.g., ``/zoom/x/y.png``).
@@ -1044,6 +1154,10 @@ class TileServerMixin:
             Image stretch mode. One of ``"none"``, ``"minmax"``,
             ``"linear"``, ``"equalize"``, ``"sqrt"``, or ``"log"``.
             When set, overrides ``vmin``/``vmax``.
+        encoding : str, optional
+            Tile format, e.g. ``"png"`` (default) or ``"jpeg"``. ``"auto"``
+            lets the server pick WEBP for clients that accept it, JPEG for
+            fully opaque tiles and PNG otherwise.
 
         Returns
         -------
@@ -1052,6 +1166,8 @@ class TileServerMixin:
         """
         if expression and indexes is not None:
             raise ValueError("Cannot use both 'expression' and 'indexes'.")
+        if encoding.lower() != "auto":
+            format_to_encoding(encoding)
         # First handle query parameters to check for errors
         params = {}
         if indexes is not None:
@@ -1091,7 +1207,97 @@ class TileServerMixin:
         if stretch is not None:
             params["stretch"] = stretch
         return add_query_parameters(
-            self.create_url("api/tiles/{z}/{x}/{y}.png", client=client), params
+            self.create_url(f"api/tiles/{{z}}/{{x}}/{{y}}.{encoding}", client=client), params
+        )
+
+    def get_terrain_tile_url(
+        self,
+        scheme: str = "mapbox",
+        band: int | str = 1,
+        nodata: int | float | None = None,
+        encoding: str = "png",
+        client: bool = False,
+    ):
+        """
+        Get the URL of elevation tiles encoded as Terrain-RGB or Terrarium.
+
+        Parameters
+        ----------
+        scheme : {"mapbox", "terrarium"}, optional
+            Elevation encoding. Defaults to ``"mapbox"`` (Terrain-RGB).
+        band : int or str, optional
+            Index or name of the elevation band. Defaults to ``1``.
+        nodata : int or float, optional
+            The value from the band to use to interpret as not valid data.
+        encoding : {"png", "webp"}, optional
+            Tile format. Defaults to ``"png"``.
+        client : bool, optional
+            If ``True``, build the URL using the client-facing host and port.
+            Defaults to ``False``.
+
+        Returns
+        -------
+        str
+            The tile URL template with ``{z}/{x}/{y}`` placeholders.
+        """
+        if scheme not in TERRAIN_SCHEMES:
+            raise ValueError(f"scheme must be one of {TERRAIN_SCHEMES}.")
+        if encoding.lower() not in ("png", "webp"):
+            raise ValueError("Terrain tiles must be png or webp.")
+        params = {"scheme": scheme, "band": band}
+        if nodata is not None:
+            params["nodata"] = nodata
+        return add_query_parameters(
+            self.create_url(f"api/terrain/{{z}}/{{x}}/{{y}}.{encoding.lower()}", client=client),
+            params,
+        )
+
+    def get_hillshade_tile_url(
+        self,
+        azimuth: float = 315.0,
+        altitude: float = 45.0,
+        z_factor: float = 1.0,
+        band: int | str = 1,
+        nodata: int | float | None = None,
+        encoding: str = "png",
+        client: bool = False,
+    ):
+        """
+        Get the URL of hillshade tiles computed from an elevation band.
+
+        Parameters
+        ----------
+        azimuth : float, optional
+            Direction of the light in degrees clockwise from north.
+            Defaults to ``315``.
+        altitude : float, optional
+            Angle of the light above the horizon in degrees. Defaults to
+            ``45``.
+        z_factor : float, optional
+            Vertical exaggeration. Defaults to ``1``.
+        band : int or str, optional
+            Index or name of the elevation band. Defaults to ``1``.
+        nodata : int or float, optional
+            The value from the band to use to interpret as not valid data.
+        encoding : str, optional
+            Tile format. Defaults to ``"png"``.
+        client : bool, optional
+            If ``True``, build the URL using the client-facing host and port.
+            Defaults to ``False``.
+
+        Returns
+        -------
+        str
+            The tile URL template with ``{z}/{x}/{y}`` placeholders.
+        """
+        if encoding.lower() != "auto":
+            format_to_encoding(encoding)
+        params = {"azimuth": azimuth, "altitude": altitude, "z_factor": z_factor, "band": band}
+        if nodata is not None:
+            params["nodata"] = nodata
+        return add_query_parameters(
+            self.create_url(f"api/hillshade/{{z}}/{{x}}/{{y}}.{encoding.lower()}", client=client),
+            params,
         )
 
     def as_leaflet_layer(self):
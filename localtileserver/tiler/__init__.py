@@ -1,5 +1,12 @@
 """Tile generation and image processing for localtileserver."""
 
+from localtileserver.tiler.cache import (
+    StatisticsCache,
+    TileCache,
+    get_render_flight,
+    get_statistics_cache,
+    make_cache_key,
+)
 from localtileserver.tiler.data import (
     get_building_docs,
     get_co_elevation_url,
@@ -9,28 +16,40 @@ from localtileserver.tiler.data import (
     get_sf_bay_url,
     str_to_bool,
 )
+from localtileserver.tiler.disk_cache import DiskTileCache
 from localtileserver.tiler.handler import (
+    get_data_tile,
+    get_empty_tile,
     get_feature,
+    get_hillshade_tile,
     get_meta_data,
+    get_metatile,
     get_part,
     get_point,
     get_preview,
     get_reader,
     get_source_bounds,
     get_statistics,
+    get_terrain_tile,
     get_tile,
 )
 from localtileserver.tiler.palettes import (
+    compile_colormap,
     get_palettes,
     get_registered_colormap,
     palette_valid_or_raise,
     register_colormap,
 )
+from localtileserver.tiler.pool import DatasetPool, configure_dataset_pool, get_dataset_pool
+from localtileserver.tiler.profile import DatasetProfile, get_dataset_profile
+from localtileserver.tiler.terrain import decode_terrain, encode_terrain, hillshade
 from localtileserver.tiler.utilities import (
     ImageBytes,
     format_to_encoding,
     get_cache_dir,
     get_clean_filename,
+    get_dataset_version,
+    get_encoder_options,
     make_vsi,
     purge_cache,
 )
@@ -0,0 +1,369 @@
+"""
+Serve pre-rendered tiles from MBTiles and PMTiles archives.
+
+Archives are looked up instead of rendered: a tile request costs one
+indexed SQLite query or one directory search in a memory-mapped file.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+import pathlib
+import threading
+
+import morecantile
+from morecantile import Tile
+import rasterio
+from rasterio.enums import ColorInterp
+from rasterio.warp import transform_bounds
+from rio_tiler.errors import TileOutsideBounds
+
+from .mbtiles import MBTiles
+from .pmtiles import PMTiles
+from .profile import DatasetProfile
+from .utilities import ImageBytes, get_dataset_version
+
+TILE_ARCHIVE_SUFFIXES = (".mbtiles", ".pmtiles")
+
+# MBTiles ``format`` metadata values of the image encodings
+_MBTILES_ENCODINGS = {"png": "PNG", "jpg": "JPEG", "jpeg": "JPEG", "webp": "WEBP"}
+_WORLD = (-180.0, -85.0511287798066, 180.0, 85.0511287798066)
+# Idle read-only connections kept per MBTiles archive
+_MAX_IDLE_CONNECTIONS = 16
+
+
+def is_tile_archive(path: pathlib.Path | str) -> bool:
+    """
+    Return whether *path* names an MBTiles or PMTiles archive.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Path or URL of a dataset.
+
+    Returns
+    -------
+    bool
+        ``True`` for ``.mbtiles`` and ``.pmtiles`` files.
+    """
+    return str(path).lower().endswith(TILE_ARCHIVE_SUFFIXES)
+
+
+class _MBTilesSource:
+    """
+    Pool of read-only connections to one MBTiles archive.
+
+    A SQLite connection serializes the queries made through it, so each
+    concurrent lookup borrows its own connection.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._idle: list[MBTiles] = []
+        with self._connection() as archive:
+            self.metadata = archive.metadata
+            self.zoom_range = archive.zoom_range()
+
+    @contextmanager
+    def _connection(self) -> Iterator[MBTiles]:
+        with self._lock:
+            archive = self._idle.pop() if self._idle else None
+        if archive is None:
+            archive = MBTiles(self.path)
+        try:
+            yield archive
+        finally:
+            with self._lock:
+                if len(self._idle) < _MAX_IDLE_CONNECTIONS:
+                    self._idle.append(archive)
+                    archive = None
+            if archive is not None:
+                archive.close()
+
+    def get_tile(self, z: int, x: int, y: int) -> bytes | None:
+        with self._connection() as archive:
+            return archive.get_tile(z, x, y)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for archive in idle:
+            archive.close()
+
+
+class TileArchive:
+    """
+    Read-only, thread-safe tile source backed by an MBTiles or PMTiles archive.
+
+    Offers the parts of the ``rio_tiler.io.Reader`` interface used to
+    serve tiles (``input``, ``tms``, ``bounds``, ``minzoom``, ``maxzoom``,
+    ``tile_exists`` and ``info``) so that archives can be opened with
+    :func:`localtileserver.tiler.handler.get_reader` and served like
+    rasters. Bounds and zoom range come from the archive metadata.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Path of a local ``.mbtiles`` or ``.pmtiles`` file.
+    """
+
+    def __init__(self, path: pathlib.Path | str):
+        path = pathlib.Path(path)
+        if not is_tile_archive(path):
+            raise ValueError(f"{path} is not an MBTiles or PMTiles archive.")
+        self.input = str(path)
+        self.tms = morecantile.tms.get("WebMercatorQuad")
+        if path.suffix.lower() == ".pmtiles":
+            self._source = PMTiles(path)
+            self.img_format = self._source.img_format
+            self.bounds = self._source.bounds
+            self.minzoom, self.maxzoom = self._source.minzoom, self._source.maxzoom
+            self.metadata = self._source.metadata
+        else:
+            self._source = _MBTilesSource(path)
+            metadata = self._source.metadata
+            self.metadata = metadata
+            self.img_format = _MBTILES_ENCODINGS.get(metadata.get("format", "png").lower())
+            if "bounds" in metadata:
+                self.bounds = tuple(float(v) for v in metadata["bounds"].split(","))
+            else:
+                self.bounds = _WORLD
+            zooms = self._source.zoom_range or (0, 0)
+            self.minzoom = int(metadata.get("minzoom", zooms[0]))
+            self.maxzoom = int(metadata.get("maxzoom", zooms[1]))
+        if self.img_format is None:
+            self.close()
+            raise ValueError(f"{path} does not hold PNG, JPEG or WEBP tiles.")
+
+    def __enter__(self) -> TileArchive:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tile_exists(self, tile_x: int, tile_y: int, tile_z: int) -> bool:
+        """
+        Return whether a tile is within the zoom range and bounds of the archive.
+
+        Parameters
+        ----------
+        tile_x, tile_y, tile_z : int
+            Tile coordinates, in the argument order of
+            ``rio_tiler.io.Reader.tile_exists``.
+
+        Returns
+        -------
+        bool
+            ``True`` if the tile overlaps the archive.
+        """
+        if not self.minzoom <= tile_z <= self.maxzoom:
+            return False
+        if not (0 <= tile_x < 2**tile_z and 0 <= tile_y < 2**tile_z):
+            return False
+        west, south, east, north = self.tms.bounds(Tile(x=tile_x, y=tile_y, z=tile_z))
+        left, bottom, right, top = self.bounds
+        return west < right and east > left and south < top and north > bottom
+
+    def get_tile(self, z: int, x: int, y: int) -> bytes | None:
+        """
+        Return the stored tile at ``z/x/y``, or ``None`` when missing.
+
+        Parameters
+        ----------
+        z, x, y : int
+            XYZ tile coordinates.
+
+        Returns
+        -------
+        bytes or None
+            The encoded tile.
+        """
+        return self._source.get_tile(z, x, y)
+
+    def read_tile(self, z: int, x: int, y: int) -> ImageBytes:
+        """
+        Return the tile at ``z/x/y``, transparent where none was stored.
+
+        Archives leave out empty tiles, so a missing tile within the
+        bounds and zoom range of the archive is served as the empty tile.
+
+        Parameters
+        ----------
+        z, x, y : int
+            XYZ tile coordinates.
+
+        Returns
+        -------
+        ImageBytes
+            The encoded tile.
+
+        Raises
+        ------
+        TileOutsideBounds
+            If the tile is outside the archive.
+        """
+        # Deferred import: handler imports this module to open archives
+        from .handler import get_empty_tile
+
+        data = self._source.get_tile(z, x, y)
+        if data is not None:
+            return ImageBytes(data, mimetype=f"image/{self.img_format.lower()}")
+        if not self.tile_exists(x, y, z):
+            raise TileOutsideBounds(f"Tile(x={x}, y={y}, z={z}) is outside bounds")
+        return get_empty_tile(self.img_format)
+
+    def dataset_profile(self, version: str) -> DatasetProfile:
+        """
+        Describe the archive as an RGBA Web Mercator dataset.
+
+        Parameters
+        ----------
+        version : str
+            Version token of the archive file.
+
+        Returns
+        -------
+        DatasetProfile
+            Profile with the bounds and zoom range of the archive.
+        """
+        crs = rasterio.crs.CRS.from_epsg(3857)
+        bounds = tuple(transform_bounds("EPSG:4326", crs, *self.bounds))
+        resolution = self.tms.matrix(self.maxzoom).cellSize
+        return DatasetProfile(
+            path=self.input,
+            version=version,
+            count=4,
+            width=max(1, round((bounds[2] - bounds[0]) / resolution)),
+            height=max(1, round((bounds[3] - bounds[1]) / resolution)),
+            dtypes=("uint8",) * 4,
+            colorinterp=(ColorInterp.red, ColorInterp.green, ColorInterp.blue, ColorInterp.alpha),
+            descriptions=(None,) * 4,
+            band_names=("b1", "b2", "b3", "b4"),
+            nodata=None,
+            crs=crs,
+            bounds=bounds,
+            geographic_bounds=self.bounds,
+            minzoom=self.minzoom,
+            maxzoom=self.maxzoom,
+            overviews=(),
+        )
+
+    def info(self) -> dict:
+        """
+        Return a summary of the archive.
+
+        Returns
+        -------
+        dict
+            Archive path, ``format``, geographic ``bounds``, zoom range and
+            the metadata stored in the archive.
+        """
+        return {
+            "filename": self.input,
+            "format": self.img_format.lower(),
+            "bounds": dict(zip(("left", "bottom", "right", "top"), self.bounds, strict=True)),
+            "crs": "EPSG:3857",
+            "minzoom": self.minzoom,
+            "maxzoom": self.maxzoom,
+            "metadata": self.metadata,
+        }
+
+    def close(self):
+        """
+        Close the archive.
+        """
+        self._source.close()
+
+
+class _ArchiveLease:
+    """
+    A shared archive and the number of requests reading it.
+    """
+
+    __slots__ = ("archive", "retired", "users")
+
+    def __init__(self, archive: TileArchive):
+        self.archive = archive
+        self.users = 0
+        # Evicted or replaced; closed once the last user returns it
+        self.retired = False
+
+
+_ARCHIVES: OrderedDict[tuple[str, str], _ArchiveLease] = OrderedDict()
+_ARCHIVES_LOCK = threading.Lock()
+_MAX_ARCHIVES = 32
+
+
+def _retire(key: tuple[str, str]) -> TileArchive | None:
+    """
+    Drop an archive from the shared set, returning it if nobody reads it.
+
+    Caller holds ``_ARCHIVES_LOCK``.
+    """
+    lease = _ARCHIVES.pop(key)
+    lease.retired = True
+    return lease.archive if lease.users == 0 else None
+
+
+@contextmanager
+def get_tile_archive(path: pathlib.Path | str, version: str | None = None) -> Iterator[TileArchive]:
+    """
+    Lease a shared open archive, reopened when the file changes.
+
+    Archives are thread-safe, so the tile endpoints share one instance per
+    archive instead of checking handles out of the dataset pool. Archives
+    of replaced versions, and the least recently used archives beyond a
+    fixed number, are closed once the last request reading them returns
+    them.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Cleaned path of the archive.
+    version : str, optional
+        Version token of the archive, if already known (see
+        :func:`localtileserver.tiler.utilities.get_dataset_version`).
+
+    Yields
+    ------
+    TileArchive
+        The open archive. Do not close it or use it after the block.
+    """
+    if version is None:
+        version = get_dataset_version(path)
+    key = (str(path), version)
+    with _ARCHIVES_LOCK:
+        lease = _ARCHIVES.get(key)
+        if lease is not None:
+            _ARCHIVES.move_to_end(key)
+            lease.users += 1
+    if lease is None:
+        archive = TileArchive(path)
+        unused = []
+        with _ARCHIVES_LOCK:
+            lease = _ARCHIVES.get(key)
+            if lease is None:
+                lease = _ARCHIVES[key] = _ArchiveLease(archive)
+            else:
+                # Another thread opened it meanwhile
+                _ARCHIVES.move_to_end(key)
+                unused.append(archive)
+            lease.users += 1
+            stale = [k for k in _ARCHIVES if k[0] == key[0] and k != key]
+            unused.extend(_retire(k) for k in stale)
+            while len(_ARCHIVES) > _MAX_ARCHIVES:
+                unused.append(_retire(next(iter(_ARCHIVES))))
+        for archive in unused:
+            if archive is not None:
+                archive.close()
+    try:
+        yield lease.archive
+    finally:
+        with _ARCHIVES_LOCK:
+            lease.users -= 1
+            close = lease.retired and lease.users == 0
+        if close:
+            lease.archive.close()
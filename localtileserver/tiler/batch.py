@@ -0,0 +1,86 @@
+"""
+Length-prefixed container for returning many tiles in one response.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import struct
+from typing import NamedTuple
+
+BATCH_MEDIA_TYPE = "application/x-tile-batch"
+
+# z, x, y, HTTP status and payload length, in network byte order
+_ITEM_HEADER = struct.Struct(">IIIHI")
+
+
+class BatchItem(NamedTuple):
+    """
+    One tile of a batch response.
+
+    Attributes
+    ----------
+    z, x, y : int
+        Tile coordinates.
+    status : int
+        HTTP status of the tile: ``200`` with the encoded image, ``204``
+        for an empty tile, or an error status with a UTF-8 message.
+    payload : bytes
+        The encoded image or the error message.
+    """
+
+    z: int
+    x: int
+    y: int
+    status: int
+    payload: bytes
+
+
+def pack_batch_item(z: int, x: int, y: int, status: int, payload: bytes) -> bytes:
+    """
+    Frame one tile for a batch response.
+
+    Parameters
+    ----------
+    z, x, y : int
+        Tile coordinates.
+    status : int
+        HTTP status of the tile.
+    payload : bytes
+        The encoded image or the error message.
+
+    Returns
+    -------
+    bytes
+        An 18-byte big-endian header (``z``, ``x``, ``y`` and the payload
+        length as unsigned 32-bit integers, ``status`` as an unsigned
+        16-bit integer after ``y``) followed by *payload*.
+    """
+    return _ITEM_HEADER.pack(z, x, y, status, len(payload)) + payload
+
+
+def iter_batch(data: bytes) -> Iterator[BatchItem]:
+    """
+    Split a batch response into its tiles.
+
+    Parameters
+    ----------
+    data : bytes
+        Body of a ``/api/tiles/batch`` response.
+
+    Yields
+    ------
+    BatchItem
+        The tiles in the order they were requested.
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        if offset + _ITEM_HEADER.size > len(view):
+            raise ValueError("Truncated tile batch header.")
+        z, x, y, status, length = _ITEM_HEADER.unpack_from(view, offset)
+        offset += _ITEM_HEADER.size
+        if offset + length > len(view):
+            raise ValueError("Truncated tile batch payload.")
+        yield BatchItem(z, x, y, status, bytes(view[offset : offset + length]))
+        offset += length
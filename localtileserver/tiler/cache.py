@@ -0,0 +1,434 @@
+"""
+In-process caches shared by the tile handlers.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+import hashlib
+import json
+import pathlib
+import threading
+from typing import Any
+
+from rio_tiler.io import Reader
+
+from .utilities import get_dataset_version
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one computation.
+
+    The first caller for a key runs the function; callers that arrive
+    while it is still running wait for it and receive the same result (or
+    the same exception) instead of repeating the work.
+    """
+
+    class _Call:
+        __slots__ = ("done", "error", "result")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, SingleFlight._Call] = {}
+        self._collapsed = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run *fn* once for all concurrent callers with the same *key*.
+
+        Parameters
+        ----------
+        key : hashable
+            Identity of the computation.
+        fn : callable
+            Zero-argument function computing the value.
+
+        Returns
+        -------
+        object
+            The value returned by *fn*.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+            else:
+                self._collapsed += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    @property
+    def collapsed(self) -> int:
+        """
+        Return how many calls were served by another caller's computation.
+
+        Returns
+        -------
+        int
+            Number of collapsed duplicate calls.
+        """
+        return self._collapsed
+
+
+def dataset_identity(tile_source: Reader) -> tuple[str, str]:
+    """
+    Return a ``(path, version)`` pair identifying a dataset's contents.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader``.
+
+    Returns
+    -------
+    tuple of str
+        The dataset path and its version token from
+        :func:`localtileserver.tiler.utilities.get_dataset_version`.
+    """
+    path = str(tile_source.input)
+    return path, get_dataset_version(path)
+
+
+def _freeze(value) -> Hashable:
+    """
+    Turn request options into a hashable, order-independent key part.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def make_cache_key(path: pathlib.Path | str, version: str, **params) -> str:
+    """
+    Build a canonical cache key for a rendered image.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Cleaned path of the dataset.
+    version : str
+        Dataset version token (see
+        :func:`localtileserver.tiler.utilities.get_dataset_version`).
+    **params
+        Every parameter that affects the rendered output (tile
+        coordinates, format, indexes, colormap, vmin, vmax, nodata,
+        expression, stretch, ...). ``None`` values are dropped so that an
+        omitted parameter and an explicit default share one entry.
+
+    Returns
+    -------
+    str
+        A hex digest uniquely identifying the rendered output.
+    """
+    params = {k: v for k, v in params.items() if v is not None}
+    payload = json.dumps(
+        {"path": str(path), "version": version, "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TileCache:
+    """
+    Thread-safe LRU cache of encoded images bounded by total size.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Total size budget of the cached payloads in bytes. Entries larger
+        than the budget are never stored.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Return the cached payload for *key*, or ``None`` on a miss.
+
+        Parameters
+        ----------
+        key : str
+            Cache key from :func:`make_cache_key`.
+
+        Returns
+        -------
+        bytes or None
+            The cached payload.
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(
+        self,
+        key: str,
+        value: bytes,
+        source: str | None = None,
+        version: str | None = None,
+    ):
+        """
+        Store *value* under *key*, evicting least recently used entries.
+
+        Parameters
+        ----------
+        key : str
+            Cache key from :func:`make_cache_key`.
+        value : bytes
+            The encoded payload.
+        source : str, optional
+            Path of the dataset the payload was rendered from. Unused here;
+            outdated entries are never hit since the version is part of
+            the key, and they age out of the LRU.
+        version : str, optional
+            Version token of the dataset. Unused here.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def clear(self):
+        """
+        Drop all cached payloads and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache usage counters.
+
+        Returns
+        -------
+        dict
+            Dictionary with ``hits``, ``misses``, ``evictions``,
+            ``entries``, ``bytes`` and ``max_bytes``.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class StatisticsCache:
+    """
+    Thread-safe LRU cache of dataset statistics.
+
+    Computing statistics reads an overview of the whole dataset and builds
+    histograms, which is far more expensive than reading a single tile.
+    Entries are keyed by the dataset identity (path and version), band
+    indexes, expression, nodata and any extra statistics options, so a
+    changed file never serves stale values. Concurrent misses for the same
+    key compute the statistics only once.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        Maximum number of cached statistics results. Defaults to ``256``.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, dict] = OrderedDict()
+        self._flight = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+
+    def get(
+        self,
+        tile_source: Reader,
+        indexes: list[int] | None = None,
+        expression: str | None = None,
+        nodata: int | float | None = None,
+        **kwargs,
+    ) -> dict:
+        """
+        Return ``tile_source.statistics(...)``, computing it at most once.
+
+        Parameters
+        ----------
+        tile_source : Reader
+            An open rio-tiler ``Reader`` for the raster dataset.
+        indexes : list of int, optional
+            Band indexes to compute statistics for.
+        expression : str, optional
+            Band math expression to compute statistics on.
+        nodata : int or float, optional
+            Override nodata value for the dataset.
+        **kwargs
+            Additional keyword arguments passed to ``Reader.statistics``.
+
+        Returns
+        -------
+        dict
+            Band name to ``rio_tiler.models.BandStatistics`` mapping. The
+            returned objects are shared and must not be modified.
+        """
+        key = (
+            dataset_identity(tile_source),
+            tuple(indexes) if indexes is not None else None,
+            expression,
+            _freeze(nodata),
+            _freeze(kwargs),
+        )
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+
+        def _compute():
+            stats_kwargs = dict(kwargs)
+            if expression:
+                stats_kwargs["expression"] = expression
+            elif indexes is not None:
+                stats_kwargs["indexes"] = indexes
+            if nodata is not None:
+                stats_kwargs["nodata"] = nodata
+            stats = tile_source.statistics(**stats_kwargs)
+            with self._lock:
+                self._entries[key] = stats
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return stats
+
+        return self._flight.do(key, _compute)
+
+    def snapshot(self, tile_source: Reader) -> dict:
+        """
+        Return the cached statistics of a dataset.
+
+        Parameters
+        ----------
+        tile_source : Reader
+            An open rio-tiler ``Reader`` for the raster dataset.
+
+        Returns
+        -------
+        dict
+            Cache entries that :meth:`load` accepts, e.g. in a worker
+            process rendering the same dataset.
+        """
+        identity = dataset_identity(tile_source)
+        with self._lock:
+            return {key: stats for key, stats in self._entries.items() if key[0] == identity}
+
+    def load(self, entries: dict):
+        """
+        Add entries taken with :meth:`snapshot`.
+
+        Parameters
+        ----------
+        entries : dict
+            Cache entries from :meth:`snapshot`.
+        """
+        with self._lock:
+            self._entries.update(entries)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop all cached statistics and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache usage counters.
+
+        Returns
+        -------
+        dict
+            Dictionary with ``hits``, ``misses``, ``collapsed`` and
+            ``entries`` counts.
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "collapsed": self._flight.collapsed,
+                "entries": len(self._entries),
+            }
+
+
+_STATISTICS_CACHE = StatisticsCache()
+_RENDER_FLIGHT = SingleFlight()
+
+
+def get_statistics_cache() -> StatisticsCache:
+    """
+    Return the process-wide statistics cache.
+
+    Returns
+    -------
+    StatisticsCache
+        The shared cache used by the tile handlers.
+    """
+    return _STATISTICS_CACHE
+
+
+def get_render_flight() -> SingleFlight:
+    """
+    Return the process-wide coalescer of identical image renders.
+
+    Returns
+    -------
+    SingleFlight
+        The shared coalescer used by the tile, thumbnail and part endpoints.
+    """
+    return _RENDER_FLIGHT
@@ -0,0 +1,259 @@
+"""
+Convert GeoTIFFs that are not Cloud Optimized into cached COG copies.
+
+Rendering a low-zoom tile from a striped GeoTIFF without overviews reads
+the dataset at full resolution. A COG copy with internal tiling and
+overviews serves the same tiles from a few small reads.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+import hashlib
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+
+from rio_cogeo import cog_translate, cog_validate
+from rio_cogeo.profiles import cog_profiles
+
+from .utilities import get_cache_dir, get_clean_filename, get_dataset_version
+
+logger = logging.getLogger(__name__)
+
+# Local files eligible for conversion; other formats may be virtual (e.g. WMS)
+_GEOTIFF_SUFFIXES = (".tif", ".tiff")
+
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+class CogConverter:
+    """
+    Convert local GeoTIFFs that are not COGs to cached copies in the background.
+
+    :meth:`resolve` maps the path of a requested dataset to the path to
+    serve: the COG copy once it exists, the original until then. The
+    first request for a GeoTIFF queues it; a background thread checks it
+    with ``rio_cogeo.cog_validate`` (strict) and converts it with
+    ``rio_cogeo.cog_translate`` if needed, one file at a time.
+
+    Copies are keyed by the source path and version (modification time
+    and size), so an edited source is converted again and copies made by
+    earlier processes are reused. A new copy replaces the copies of older
+    versions of the same source.
+
+    Parameters
+    ----------
+    cache_dir : pathlib.Path or str, optional
+        Directory of the copies. Defaults to a ``cog`` directory in
+        :func:`localtileserver.tiler.utilities.get_cache_dir`.
+    profile : str, optional
+        Creation profile of rio-cogeo, e.g. ``"deflate"`` (default),
+        ``"zstd"`` or ``"lzw"``.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path | str | None = None, profile: str = "deflate"):
+        cache_dir = pathlib.Path(cache_dir) if cache_dir else get_cache_dir() / "cog"
+        self.cache_dir = cache_dir.resolve()
+        # Fails early for unknown profiles
+        self.profile = cog_profiles.get(profile)
+        self._cond = threading.Condition()
+        # "pending", "converted", "cog" (already optimized) or "failed"
+        self._states: dict[tuple[str, str], str] = {}
+        self._queue: deque[tuple[str, str]] = deque()
+        self._running = False
+        self._closed = False
+
+    def copy_path(self, path: pathlib.Path | str, version: str) -> pathlib.Path:
+        """
+        Return the location of the COG copy of a dataset version.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Cleaned path of the source dataset.
+        version : str
+            Version token from
+            :func:`localtileserver.tiler.utilities.get_dataset_version`.
+
+        Returns
+        -------
+        pathlib.Path
+            The copy, which may not exist yet.
+        """
+        return self.cache_dir / f"{_digest(str(path))}-{_digest(version)}.tif"
+
+    def _key(self, path: pathlib.Path | str) -> tuple[str, str] | None:
+        """
+        Return the ``(path, version)`` key of an eligible dataset, or ``None``.
+        """
+        try:
+            clean = get_clean_filename(str(path))
+        except OSError:
+            return None
+        if not isinstance(clean, pathlib.Path) or clean.suffix.lower() not in _GEOTIFF_SUFFIXES:
+            return None
+        if clean.parent == self.cache_dir:
+            return None
+        version = get_dataset_version(clean)
+        return (str(clean), version) if version else None
+
+    def resolve(self, path: pathlib.Path | str) -> str:
+        """
+        Return the path to serve for a dataset, queuing its conversion.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Path of the requested dataset, as given in the request.
+
+        Returns
+        -------
+        str
+            The COG copy if it is ready, otherwise *path* unchanged.
+        """
+        key = self._key(path)
+        if key is None:
+            return str(path)
+        copy = self.copy_path(*key)
+        with self._cond:
+            state = self._states.get(key)
+            if state in ("pending", "cog", "failed"):
+                return str(path)
+            # Also picks up copies made by an earlier process
+            if copy.exists():
+                self._states[key] = "converted"
+                return str(copy)
+            if self._closed:
+                return str(path)
+            # New, or the copy was purged from the cache
+            self._states[key] = "pending"
+            self._queue.append(key)
+            if not self._running:
+                self._running = True
+                threading.Thread(target=self._work, name="cog-convert", daemon=True).start()
+        return str(path)
+
+    def status(self, path: pathlib.Path | str) -> str | None:
+        """
+        Return the conversion state of the current version of a dataset.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Path of the dataset.
+
+        Returns
+        -------
+        str or None
+            ``"pending"``, ``"converted"``, ``"cog"`` (already a COG, served
+            as is) or ``"failed"``. ``None`` for datasets that were not
+            requested or are not local GeoTIFFs.
+        """
+        key = self._key(path)
+        with self._cond:
+            return self._states.get(key) if key else None
+
+    def _next(self) -> tuple[str, str] | None:
+        with self._cond:
+            if self._closed or not self._queue:
+                self._running = False
+                self._cond.notify_all()
+                return None
+            return self._queue.popleft()
+
+    def _work(self):
+        while (key := self._next()) is not None:
+            state = self._convert(*key)
+            with self._cond:
+                self._states[key] = state
+
+    def _convert(self, path: str, version: str) -> str:
+        """
+        Write the COG copy of a dataset, returning its new state.
+        """
+        try:
+            # Strict: missing overviews are what makes low zooms slow
+            if cog_validate(path, strict=True, quiet=True)[0]:
+                return "cog"
+        except Exception as e:
+            logger.warning("Could not validate %s as a COG: %s", path, e)
+            return "failed"
+        copy = self.copy_path(path, version)
+        copy.parent.mkdir(parents=True, exist_ok=True)
+        # Unique, so concurrent processes sharing the cache do not collide
+        fd, partial = tempfile.mkstemp(prefix=copy.stem, suffix=".partial", dir=copy.parent)
+        os.close(fd)
+        try:
+            cog_translate(
+                path,
+                partial,
+                self.profile,
+                in_memory=False,
+                forward_band_tags=True,
+                quiet=True,
+            )
+            os.replace(partial, copy)
+        except Exception as e:
+            logger.warning("Could not convert %s to a COG: %s", path, e)
+            return "failed"
+        finally:
+            pathlib.Path(partial).unlink(missing_ok=True)
+        source = copy.name.split("-")[0]
+        for old in copy.parent.glob(f"{source}-*.tif"):
+            if old != copy:
+                try:
+                    old.unlink()
+                except OSError:  # pragma: no cover
+                    # Still open on platforms that lock open files
+                    pass
+        logger.info("Converted %s to the COG %s", path, copy)
+        return "converted"
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Wait until all queued conversions have finished.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum number of seconds to wait.
+
+        Returns
+        -------
+        bool
+            ``True`` if no conversion is queued or running.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._running, timeout=timeout)
+
+    def close(self):
+        """
+        Drop queued conversions; the running one finishes in the background.
+        """
+        with self._cond:
+            self._closed = True
+            for key in self._queue:
+                self._states.pop(key, None)
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Return the number of datasets in each conversion state.
+
+        Returns
+        -------
+        dict
+            Dictionary with ``pending``, ``converted``, ``cog`` and
+            ``failed`` counts.
+        """
+        with self._cond:
+            counts = dict.fromkeys(("pending", "converted", "cog", "failed"), 0)
+            for state in self._states.values():
+                counts[state] += 1
+            return counts
@@ -0,0 +1,357 @@
+"""
+Persistent on-disk cache of rendered tiles.
+"""
+
+from __future__ import annotations
+
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+import weakref
+
+from .utilities import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiles (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    version TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tiles_source ON tiles (source);
+CREATE INDEX IF NOT EXISTS tiles_lru ON tiles (last_access);
+CREATE INDEX IF NOT EXISTS tiles_lfu ON tiles (hits, last_access);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, bytes) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS tiles_insert AFTER INSERT ON tiles BEGIN
+    UPDATE usage SET bytes = bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS tiles_delete AFTER DELETE ON tiles BEGIN
+    UPDATE usage SET bytes = bytes - old.size WHERE id = 0;
+END;
+"""
+
+_EVICTION_ORDER = {
+    "lru": "last_access",
+    "lfu": "hits, last_access",
+}
+
+# Open caches, closed by purge_cache() before the cache directory is removed
+_OPEN_CACHES: weakref.WeakSet[DiskTileCache] = weakref.WeakSet()
+
+
+class DiskTileCache:
+    """
+    Size-capped cache of encoded tiles persisted in a SQLite database.
+
+    Entries survive server restarts and the database can be shared by
+    several worker processes: every write runs in its own transaction and
+    SQLite's write-ahead log lets readers proceed while another process
+    writes. Each entry records the source path and version token it was
+    rendered from, so storing a tile for a newer version of a file drops
+    everything cached for older versions.
+
+    Hits only read the database. Their counts and access times are
+    buffered in memory and written in one transaction every
+    ``flush_hits`` hits or ``flush_interval`` seconds, and before each
+    eviction, so serving cached tiles does not take SQLite's write lock.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Total size budget of the cached payloads in bytes.
+    path : pathlib.Path or str, optional
+        Location of the database file. Defaults to ``tiles.sqlite`` in
+        :func:`localtileserver.tiler.utilities.get_cache_dir`.
+    policy : {"lru", "lfu"}, optional
+        Eviction policy once the budget is exceeded: least recently used
+        or least frequently used. Defaults to ``"lru"``.
+    flush_hits : int, optional
+        Number of buffered hits that triggers a write. Defaults to ``256``.
+    flush_interval : float, optional
+        Seconds after which buffered hits are written on the next hit.
+        Defaults to ``5``.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        path: pathlib.Path | str | None = None,
+        policy: str = "lru",
+        flush_hits: int = 256,
+        flush_interval: float = 5.0,
+    ):
+        if policy not in _EVICTION_ORDER:
+            raise ValueError(
+                f"Eviction policy {policy!r} not recognized. Use one of {list(_EVICTION_ORDER)}."
+            )
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._path = pathlib.Path(path) if path is not None else None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self.flush_hits = flush_hits
+        self.flush_interval = flush_interval
+        # Buffered hits: key -> (hit count, last access time)
+        self._pending: dict[str, tuple[int, float]] = {}
+        self._pending_hits = 0
+        self._last_flush = time.monotonic()
+        _OPEN_CACHES.add(self)
+
+    @property
+    def path(self) -> pathlib.Path:
+        """
+        Return the location of the database file.
+
+        Returns
+        -------
+        pathlib.Path
+            Path to the SQLite database.
+        """
+        if self._path is not None:
+            return self._path
+        return get_cache_dir() / "tiles.sqlite"
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it if necessary.
+        """
+        local = self._local
+        if getattr(local, "generation", None) == self._generation:
+            return local.connection
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly below
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        with self._lock:
+            self._connections.append(conn)
+        local.connection = conn
+        local.generation = self._generation
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Return the cached payload for *key*, or ``None`` on a miss.
+
+        Parameters
+        ----------
+        key : str
+            Cache key from :func:`localtileserver.tiler.cache.make_cache_key`.
+
+        Returns
+        -------
+        bytes or None
+            The cached payload.
+        """
+        conn = self._connect()
+        row = conn.execute("SELECT data FROM tiles WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+            hits, _ = self._pending.get(key, (0, 0.0))
+            self._pending[key] = (hits + 1, time.time())
+            self._pending_hits += 1
+            due = (
+                self._pending_hits >= self.flush_hits
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+        return row[0]
+
+    def _take_pending(self) -> list[tuple[int, float, str]]:
+        """
+        Remove and return the buffered hits as ``UPDATE`` parameters.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._pending_hits = 0
+            self._last_flush = time.monotonic()
+        return [(hits, last, key) for key, (hits, last) in pending.items()]
+
+    @staticmethod
+    def _write_hits(conn: sqlite3.Connection, rows: list[tuple[int, float, str]]):
+        conn.executemany(
+            "UPDATE tiles SET hits = hits + ?, last_access = MAX(last_access, ?) WHERE key = ?",
+            rows,
+        )
+
+    def flush(self):
+        """
+        Write the buffered hit counts and access times to the database.
+        """
+        rows = self._take_pending()
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_hits(conn, rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            # Access statistics only steer eviction, losing them is harmless
+            logger.debug("Failed to record tile cache hits: %s", e)
+
+    def put(
+        self,
+        key: str,
+        value: bytes,
+        source: str | None = None,
+        version: str | None = None,
+    ):
+        """
+        Store *value* under *key*, evicting entries beyond the size budget.
+
+        Parameters
+        ----------
+        key : str
+            Cache key from :func:`localtileserver.tiler.cache.make_cache_key`.
+        value : bytes
+            The encoded payload.
+        source : str, optional
+            Path of the dataset the payload was rendered from.
+        version : str, optional
+            Version token of the dataset. Entries for *source* with a
+            different version are removed.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        source = source or ""
+        version = version or ""
+        rows = self._take_pending()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Eviction ranks entries by the hits recorded so far
+            self._write_hits(conn, rows)
+            if source:
+                conn.execute(
+                    "DELETE FROM tiles WHERE source = ? AND version != ?", (source, version)
+                )
+            conn.execute("DELETE FROM tiles WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT INTO tiles (key, source, version, data, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, source, version, memoryview(value), size, time.time()),
+            )
+            evicted = self._evict(conn, keep=key)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            with self._lock:
+                self._evictions += evicted
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> int:
+        """
+        Remove entries other than *keep* until the budget holds.
+
+        Runs inside a transaction. The entry just stored is kept, otherwise
+        LFU eviction would always drop it first.
+        """
+        (used,) = conn.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()
+        excess = used - self.max_bytes
+        if excess <= 0:
+            return 0
+        order = _EVICTION_ORDER[self.policy]
+        keys = []
+        rows = conn.execute(
+            f"SELECT key, size FROM tiles WHERE key != ? ORDER BY {order}",
+            (keep,),
+        )
+        for key, size in rows:
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM tiles WHERE key = ?", keys)
+        return len(keys)
+
+    def clear(self):
+        """
+        Drop all cached payloads and reset the counters.
+        """
+        conn = self._connect()
+        conn.execute("DELETE FROM tiles")
+        self._take_pending()
+        with self._lock:
+            self._hits = self._misses = self._evictions = 0
+
+    def close(self):
+        """
+        Close all open database connections.
+
+        Buffered hits are written first. The cache stays usable; the next
+        operation reopens the database.
+        """
+        self.flush()
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:  # pragma: no cover
+                logger.debug("Failed to close tile cache database: %s", e)
+
+    def stats(self) -> dict:
+        """
+        Return cache usage counters.
+
+        Hit, miss and eviction counts are for this process; ``entries`` and
+        ``bytes`` describe the shared database.
+
+        Returns
+        -------
+        dict
+            Dictionary with ``hits``, ``misses``, ``evictions``,
+            ``entries``, ``bytes``, ``max_bytes`` and ``policy``.
+        """
+        conn = self._connect()
+        (entries,) = conn.execute("SELECT COUNT(*) FROM tiles").fetchone()
+        (used,) = conn.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": entries,
+                "bytes": used,
+                "max_bytes": self.max_bytes,
+                "policy": self.policy,
+            }
+
+
+def close_disk_caches():
+    """
+    Close the database connections of every open :class:`DiskTileCache`.
+    """
+    for cache in list(_OPEN_CACHES):
+        cache.close()
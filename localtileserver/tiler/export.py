@@ -0,0 +1,246 @@
+"""
+Export a styled tile pyramid to an MBTiles or PMTiles archive.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import hashlib
+import os
+import pathlib
+import time
+
+from rio_tiler.errors import TileOutsideBounds
+
+from .cache import get_statistics_cache
+from .handler import _warm_statistics, get_tile
+from .mbtiles import MBTILES_FORMATS, MBTiles
+from .pmtiles import PMTILES_TILE_TYPES, PMTilesWriter
+from .pool import get_dataset_pool
+from .profile import get_dataset_profile
+from .seed import _CHUNK_SIZE, _chunks, _is_empty, _render_chunks
+from .utilities import get_clean_filename, get_dataset_version, get_encoder_options
+
+EXPORT_FORMATS = {".mbtiles": MBTILES_FORMATS, ".pmtiles": PMTILES_TILE_TYPES}
+
+
+def _render_chunks_threaded(
+    chunks: Iterator[list],
+    filename: str,
+    tile_kwargs: dict,
+    workers: int,
+    version: str | None = None,
+) -> Iterator[list]:
+    """
+    Yield rendered chunks, in completion order, from a pool of threads.
+
+    Each chunk renders with a handle checked out of the dataset pool, so
+    threads never share a rasterio handle.
+    """
+    img_format = tile_kwargs["img_format"]
+    pool = get_dataset_pool()
+
+    def _render(tiles):
+        out = []
+        with pool.reader(filename, version=version) as reader:
+            for z, x, y in tiles:
+                try:
+                    data = get_tile(reader, z, x, y, **tile_kwargs)
+                except TileOutsideBounds:
+                    data = None
+                out.append((z, x, y, None if _is_empty(data, img_format) else bytes(data)))
+        return out
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="tile-export") as executor:
+        pending: set[Future] = set()
+        for chunk in chunks:
+            pending.add(executor.submit(_render, chunk))
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def export_tiles(
+    filename: pathlib.Path | str,
+    path: pathlib.Path | str,
+    zooms: int | Iterable[int],
+    bbox: tuple[float, float, float, float] | None = None,
+    img_format: str = "PNG",
+    workers: int | None = None,
+    executor: str = "thread",
+    progress: Callable[[int, int], None] | None = None,
+    **style,
+) -> dict:
+    """
+    Render the tiles of some zoom levels into a new MBTiles or PMTiles archive.
+
+    The archive type follows the suffix of *path*. Tiles with identical
+    contents, such as the blank tiles of a constant area, are stored once.
+    Empty tiles and tiles outside the dataset are not stored. The archive
+    is written to a temporary file and moved to *path* when complete.
+
+    The style is resolved and the dataset statistics it needs are computed
+    once, before rendering starts; process workers receive a copy of them.
+
+    Parameters
+    ----------
+    filename : pathlib.Path or str
+        Path or URL of the raster dataset.
+    path : pathlib.Path or str
+        Location of the archive, ending in ``.mbtiles`` or ``.pmtiles``.
+        Replaced if it exists.
+    zooms : int or iterable of int
+        Zoom level(s) to render, e.g. ``range(8, 13)``.
+    bbox : tuple of float, optional
+        ``(west, south, east, north)`` in EPSG:4326 to restrict the export
+        to. Defaults to the bounds of the dataset.
+    img_format : {"PNG", "JPEG", "WEBP"}, optional
+        Tile format. Defaults to ``"PNG"``.
+    workers : int, optional
+        Number of render threads or processes. Defaults to the number of
+        CPUs.
+    executor : {"thread", "process"}, optional
+        Render in a pool of threads sharing this process's caches, or in a
+        pool of processes, which scales better for styles that are costly
+        in Python. Defaults to ``"thread"``.
+    progress : callable, optional
+        Called as ``progress(done, total)`` after each rendered chunk.
+    **style
+        Style arguments of :func:`localtileserver.tiler.handler.get_tile`
+        (``indexes``, ``colormap``, ``vmin``, ``vmax``, ``nodata``,
+        ``expression``, ``stretch`` and ``encoder_options``).
+
+    Returns
+    -------
+    dict
+        Tile counts: ``tiles`` (in the zoom range and bbox), ``stored``,
+        ``empty`` (empty or outside the dataset) and ``unique`` (distinct
+        stored contents). Timings in seconds: ``statistics`` (resolving
+        the style), ``render``, ``write`` and the total ``seconds``. And
+        the rendering rate, ``tiles_per_second``.
+
+    Raises
+    ------
+    ValueError
+        If the archive type, format, zoom levels, executor or bbox are
+        not valid.
+    """
+    start = time.perf_counter()
+    path = pathlib.Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported archive type {path.suffix!r}; use .mbtiles or .pmtiles.")
+    img_format = img_format.upper()
+    if img_format not in EXPORT_FORMATS[suffix]:
+        raise ValueError(f"{suffix} supports {list(EXPORT_FORMATS[suffix])}, not {img_format}.")
+    if executor not in ("thread", "process"):
+        raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+    zooms = sorted({zooms} if isinstance(zooms, int) else set(zooms))
+    if not zooms or zooms[0] < 0:
+        raise ValueError(f"Invalid zoom levels {zooms}.")
+    style = {k: v for k, v in style.items() if v is not None}
+    get_encoder_options(img_format, **style.get("encoder_options", {}))
+
+    filename = str(get_clean_filename(filename))
+    # Keyed like the tile endpoints, so they share the pooled handles
+    version = get_dataset_version(filename)
+    with get_dataset_pool().reader(filename, version=version) as reader:
+        profile = get_dataset_profile(reader)
+        tms = reader.tms
+        _warm_statistics(reader, **{k: v for k, v in style.items() if k != "encoder_options"})
+        statistics = get_statistics_cache().snapshot(reader)
+    statistics_seconds = time.perf_counter() - start
+
+    west, south, east, north = profile.geographic_bounds
+    if bbox is not None:
+        west, south = max(west, bbox[0]), max(south, bbox[1])
+        east, north = min(east, bbox[2]), min(north, bbox[3])
+        if west >= east or south >= north:
+            raise ValueError("bbox does not intersect the dataset.")
+
+    def _tiles():
+        for tile in tms.tiles(west, south, east, north, zooms=zooms, truncate=True):
+            yield tile.z, tile.x, tile.y
+
+    total = sum(1 for _ in _tiles())
+    workers = max(1, min(workers or os.cpu_count() or 1, -(-total // _CHUNK_SIZE)))
+    tile_kwargs = {"img_format": img_format, **style}
+    if executor == "thread":
+        results = _render_chunks_threaded(
+            _chunks(_tiles(), _CHUNK_SIZE), filename, tile_kwargs, workers, version
+        )
+    else:
+        results = _render_chunks(
+            _chunks(_tiles(), _CHUNK_SIZE), filename, tile_kwargs, workers, statistics
+        )
+
+    # MBTiles are built under a temporary name; PMTilesWriter does this itself
+    target = path.with_name(path.name + ".partial") if suffix == ".mbtiles" else path
+    if suffix == ".mbtiles":
+        target.unlink(missing_ok=True)
+        archive = MBTiles(target, mode="a", deduplicate=True)
+    else:
+        archive = PMTilesWriter(target, img_format)
+    render_start = time.perf_counter()
+    write_seconds = 0.0
+    done = stored = 0
+    digests = set()
+    try:
+        for chunk in results:
+            write_start = time.perf_counter()
+            tiles = [result for result in chunk if result[3] is not None]
+            digests.update(hashlib.blake2b(data, digest_size=16).digest() for *_, data in tiles)
+            if suffix == ".mbtiles":
+                archive.put_tiles(tiles)
+            else:
+                for tile in tiles:
+                    archive.put_tile(*tile)
+            stored += len(tiles)
+            done += len(chunk)
+            write_seconds += time.perf_counter() - write_start
+            if progress is not None:
+                progress(done, total)
+    except BaseException:
+        if suffix == ".mbtiles":
+            archive.close()
+            target.unlink(missing_ok=True)
+        else:
+            archive.abort()
+        raise
+    render_seconds = time.perf_counter() - render_start - write_seconds
+
+    write_start = time.perf_counter()
+    name = pathlib.Path(filename).stem
+    bounds = (west, south, east, north)
+    if suffix == ".mbtiles":
+        archive.update_metadata(
+            name=name,
+            format=MBTILES_FORMATS[img_format],
+            type="overlay",
+            version="1.1",
+            bounds=",".join(str(v) for v in bounds),
+            center=f"{(west + east) / 2},{(south + north) / 2},{zooms[0]}",
+            minzoom=zooms[0],
+            maxzoom=zooms[-1],
+        )
+        archive.close()
+        os.replace(target, path)
+    else:
+        archive.close(bounds=bounds, metadata={"name": name}, minzoom=zooms[0], maxzoom=zooms[-1])
+    write_seconds += time.perf_counter() - write_start
+    seconds = time.perf_counter() - start
+    return {
+        "tiles": total,
+        "stored": stored,
+        "empty": done - stored,
+        "unique": len(digests),
+        "statistics": statistics_seconds,
+        "render": render_seconds,
+        "write": write_seconds,
+        "seconds": seconds,
+        "tiles_per_second": done / max(render_seconds + write_seconds, 1e-9),
+    }
@@ -4,44 +4,55 @@ Methods for working with images.
 
 from __future__ import annotations
 
-import json
+from functools import lru_cache
+from io import BytesIO
 import pathlib
+import warnings
 
+from morecantile import Tile
 import numpy as np
 import rasterio
 from rasterio.enums import ColorInterp
-from rio_tiler.colormap import cmap
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.io import MemoryFile
+from rio_tiler.colormap import apply_cmap
+from rio_tiler.errors import InvalidFormat, TileOutsideBounds
 from rio_tiler.io import Reader
 from rio_tiler.models import ImageData
+from rio_tiler.utils import linear_rescale, render
 
-from .palettes import get_registered_colormap
-from .utilities import ImageBytes, get_clean_filename, make_crs
+from .archive import TileArchive, is_tile_archive
+from .cache import get_statistics_cache
+from .palettes import compile_colormap
+from .profile import get_dataset_profile
+from .terrain import encode_terrain, hillshade
+from .utilities import ImageBytes, get_clean_filename, get_encoder_options, make_crs
 
-try:
-    from matplotlib.colors import (
-        Colormap as _MPLColormap,
-        LinearSegmentedColormap as _MPLLinearSegmentedColormap,
-        ListedColormap as _MPLListedColormap,
-    )
-except ImportError:
-    _MPLColormap = _MPLLinearSegmentedColormap = _MPLListedColormap = None
+_WGS84 = rasterio.crs.CRS.from_epsg(4326)
+_WEB_MERCATOR = rasterio.crs.CRS.from_epsg(3857)
+_EARTH_RADIUS = 6378137.0
 
 
-def get_reader(path: pathlib.Path | str) -> Reader:
+def get_reader(path: pathlib.Path | str) -> Reader | TileArchive:
     """
     Open a raster file and return a rio-tiler Reader.
 
     Parameters
     ----------
     path : pathlib.Path or str
-        Path or URL to the raster file.
+        Path or URL to the raster file, or path of an MBTiles or PMTiles
+        archive of pre-rendered tiles.
 
     Returns
     -------
-    Reader
-        A rio-tiler ``Reader`` instance for the given path.
+    Reader or TileArchive
+        A rio-tiler ``Reader`` instance for the given path, or a
+        :class:`localtileserver.tiler.archive.TileArchive` for archives.
     """
-    return Reader(get_clean_filename(path))
+    clean = get_clean_filename(path)
+    if is_tile_archive(clean):
+        return TileArchive(clean)
+    return Reader(clean)
 
 
 def get_meta_data(tile_source: Reader):
@@ -59,6 +70,8 @@ def get_meta_data(tile_source: Reader):
         A dictionary containing dataset metadata including band info,
         CRS, transform, data type, and geographic bounds.
     """
+    if isinstance(tile_source, TileArchive):
+        return tile_source.info()
     info = tile_source.info()
     if hasattr(info, "model_dump"):
         info = info.model_dump()
@@ -96,8 +109,8 @@ def get_source_bounds(tile_source: Reader, projection: str = "EPSG:4326", decima
         A dictionary with keys ``"left"``, ``"bottom"``, ``"right"``,
         and ``"top"`` representing the bounding box in the target CRS.
     """
-    src_crs = tile_source.dataset.crs
-    if not src_crs:
+    profile = get_dataset_profile(tile_source)
+    if not profile.crs:
         return {
             "left": -180.0,
             "bottom": -90.0,
@@ -105,9 +118,12 @@ def get_source_bounds(tile_source: Reader, projection: str = "EPSG:4326", decima
             "top": 90.0,
         }
     dst_crs = make_crs(projection)
-    left, bottom, right, top = rasterio.warp.transform_bounds(
-        src_crs, dst_crs, *tile_source.dataset.bounds
-    )
+    if dst_crs == _WGS84:
+        left, bottom, right, top = profile.geographic_bounds
+    else:
+        left, bottom, right, top = rasterio.warp.transform_bounds(
+            profile.crs, dst_crs, *profile.bounds
+        )
     return {
         "left": round(left, decimal_places),
         "bottom": round(bottom, decimal_places),
@@ -125,7 +141,8 @@ def _handle_band_indexes(tile_source: Reader, indexes: list[int] | None = None):
     """
     Resolve band indexes, auto-detecting RGB bands when *indexes* is None.
     """
-    band_names = [desc[0] for desc in tile_source.info().band_descriptions]
+    profile = get_dataset_profile(tile_source)
+    band_names = profile.band_names
 
     def _index_lookup(index_or_name: str):
         try:
@@ -141,13 +158,13 @@ def _handle_band_indexes(tile_source: Reader, indexes: list[int] | None = None):
     if not indexes:
         RGB_INTERPRETATIONS = [ColorInterp.red, ColorInterp.green, ColorInterp.blue]
         RGB_DESCRIPTORS = ["red", "green", "blue"]
-        if set(RGB_INTERPRETATIONS).issubset(set(tile_source.dataset.colorinterp)):
-            indexes = [tile_source.dataset.colorinterp.index(i) + 1 for i in RGB_INTERPRETATIONS]
-        elif set(RGB_DESCRIPTORS).issubset(set(tile_source.dataset.descriptions)):
-            indexes = [tile_source.dataset.descriptions.index(i) + 1 for i in RGB_DESCRIPTORS]
-        elif len(tile_source.dataset.indexes) >= 3:
+        if set(RGB_INTERPRETATIONS).issubset(set(profile.colorinterp)):
+            indexes = [profile.colorinterp.index(i) + 1 for i in RGB_INTERPRETATIONS]
+        elif set(RGB_DESCRIPTORS).issubset(set(profile.descriptions)):
+            indexes = [profile.descriptions.index(i) + 1 for i in RGB_DESCRIPTORS]
+        elif profile.count >= 3:
             indexes = [1, 2, 3]
-        elif len(tile_source.dataset.indexes) < 3:
+        elif profile.count < 3:
             indexes = [1]
         else:
             raise ValueError("Could not determine band indexes")
@@ -165,10 +182,11 @@ def _handle_nodata(tile_source: Reader, nodata: int | float | None = None):
     """
     Return a normalised nodata value, defaulting to NaN for float dtypes.
     """
+    profile = get_dataset_profile(tile_source)
     floaty = False
-    if any(dtype.startswith("float") for dtype in tile_source.dataset.dtypes):
+    if any(dtype.startswith("float") for dtype in profile.dtypes):
         floaty = True
-    if floaty and nodata is None and tile_source.dataset.nodata is not None:
+    if floaty and nodata is None and profile.nodata is not None:
         nodata = np.nan
     elif nodata is not None:
         if isinstance(nodata, str):
@@ -206,10 +224,144 @@ def _handle_vmin_vmax(
     return dict(zip(indexes, vmin, strict=True)), dict(zip(indexes, vmax, strict=True))
 
 
+def _band_statistics(
+    tile_source: Reader,
+    indexes: list[int],
+    expression: str | None = None,
+    nodata: int | float | None = None,
+    **kwargs,
+):
+    """
+    Return cached dataset statistics keyed by band (or expression output) index.
+    """
+    if isinstance(nodata, float) and np.isnan(nodata):
+        # NaN is the implicit default for float datasets, not an override
+        nodata = None
+    cache = get_statistics_cache()
+    if expression:
+        stats = cache.get(tile_source, expression=expression, nodata=nodata, **kwargs)
+        return dict(zip(indexes, stats.values(), strict=False))
+    stats = cache.get(tile_source, indexes=indexes, nodata=nodata, **kwargs)
+    return {i: stats[f"b{i}"] for i in indexes}
+
+
+# Number of histogram bins used to build the dataset-wide equalization CDF
+_EQUALIZE_BINS = 256
+
+
+def _equalize_band(data: np.ndarray, histogram: list[list[float]]) -> np.ndarray:
+    """
+    Map *data* through the CDF of a dataset histogram onto 0-255.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Band values of a tile.
+    histogram : list
+        ``[counts, bin_edges]`` as returned in
+        ``rio_tiler.models.BandStatistics.histogram``.
+
+    Returns
+    -------
+    numpy.ndarray
+        Equalized values in the 0-255 range, as ``float64`` (``uint8`` for
+        ``uint8`` input).
+    """
+    counts, edges = np.asarray(histogram[0], dtype=float), np.asarray(histogram[1], dtype=float)
+    total = counts.sum()
+    if total <= 0:
+        return np.zeros_like(data, dtype=float)
+    cdf = np.concatenate(([0.0], np.cumsum(counts) / total)) * 255
+    if data.dtype == np.uint8:
+        # Evaluate the CDF once per possible value and gather
+        lut = np.interp(np.arange(256), edges, cdf).astype(np.uint8)
+        return lut[data]
+    return np.interp(data, edges, cdf)
+
+
 STRETCH_MODES = {"none", "minmax", "linear", "equalize", "sqrt", "log"}
 
 
-def _apply_stretch(img: ImageData, stretch: str, tile_source: Reader, indexes: list[int]):
+def _stretch_float32(values: np.ndarray, lo: float, hi: float, stretch: str) -> np.ndarray:
+    """
+    Map float32 *values* from ``[lo, hi]`` onto 0-255 in place.
+
+    ``"linear"`` maps linearly, ``"sqrt"`` and ``"log"`` apply their
+    transform after normalizing to ``[0, 1]``. Returns *values*.
+    """
+    if not hi > lo:
+        values.fill(0)
+        return values
+    np.subtract(values, np.float32(lo), out=values)
+    np.multiply(values, np.float32(1.0 / (hi - lo)), out=values)
+    np.clip(values, 0, 1, out=values)
+    if stretch == "sqrt":
+        np.sqrt(values, out=values)
+    elif stretch == "log":
+        np.multiply(values, np.float32(254), out=values)
+        np.log1p(values, out=values)
+        np.multiply(values, np.float32(1.0 / np.log(255)), out=values)
+    np.multiply(values, np.float32(255), out=values)
+    return values
+
+
+@lru_cache(maxsize=64)
+def _stretch_lut(dtype: str, lo: float, hi: float, stretch: str) -> np.ndarray:
+    """
+    Return the uint8 output of every possible ``uint8``/``uint16`` input.
+    """
+    values = np.arange(np.iinfo(dtype).max + 1, dtype=np.float32)
+    lut = _stretch_float32(values, lo, hi, stretch).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+def _rescale_image(img: ImageData, in_range: list[tuple[float, float]], stretch: str = "linear"):
+    """
+    Rescale every band of *img* from *in_range* to ``uint8`` in place.
+
+    Replaces ``ImageData.rescale`` (which works in float64 with several
+    temporaries) and also applies the ``"sqrt"`` and ``"log"`` stretches
+    in the same pass. ``uint8`` and ``uint16`` bands are mapped with one
+    gather through a cached lookup table; other dtypes are processed in a
+    single float32 buffer. Masked pixels are set to 0.
+    """
+    data = img.array.data
+    mask = np.ma.getmaskarray(img.array)
+    if data.dtype == np.uint8 and stretch == "linear" and all(r == (0, 255) for r in in_range):
+        # Already in the output range
+        return
+    out = np.empty(data.shape, dtype=np.uint8)
+    for band_idx, (lo, hi) in enumerate(in_range):
+        if data.dtype in (np.uint8, np.uint16):
+            np.take(
+                _stretch_lut(data.dtype.name, float(lo), float(hi), stretch),
+                data[band_idx],
+                out=out[band_idx],
+            )
+        else:
+            values = data[band_idx].astype(np.float32)
+            out[band_idx] = _stretch_float32(values, lo, hi, stretch)
+    out[mask] = 0
+    img.array = np.ma.MaskedArray(out, mask=mask)
+    if img.alpha_mask is not None:
+        img.alpha_mask = linear_rescale(
+            img.alpha_mask,
+            in_range=(0, np.iinfo(img.alpha_mask.dtype).max),
+            out_range=(0, 255),
+        ).astype(np.uint8)
+    img.scales = [1.0] * img.count
+    img.offsets = [0.0] * img.count
+
+
+def _apply_stretch(
+    img: ImageData,
+    stretch: str,
+    tile_source: Reader,
+    indexes: list[int],
+    expression: str | None = None,
+    nodata: int | float | None = None,
+):
     """
     Apply a stretch mode to the image data in-place.
 
@@ -225,6 +377,11 @@ def _apply_stretch(img: ImageData, stretch: str, tile_source: Reader, indexes: l
         An open rio-tiler ``Reader`` used to compute band statistics.
     indexes : list of int
         Band indexes to stretch.
+    expression : str, optional
+        Band math expression that produced *img*, if any. Statistics are
+        then computed on the expression outputs.
+    nodata : int or float, optional
+        Override nodata value used when computing statistics.
 
     Returns
     -------
@@ -235,128 +392,379 @@ def _apply_stretch(img: ImageData, stretch: str, tile_source: Reader, indexes: l
     """
     if stretch == "none":
         return {i: 0 for i in indexes}, {i: 255 for i in indexes}
-    stats = tile_source.statistics(indexes=indexes)
+    if stretch not in STRETCH_MODES:
+        raise ValueError(f"Invalid stretch mode: {stretch!r}. Must be one of {STRETCH_MODES}.")
+    if stretch == "equalize":
+        stats = _band_statistics(
+            tile_source,
+            indexes,
+            expression=expression,
+            nodata=nodata,
+            hist_options={"bins": _EQUALIZE_BINS},
+        )
+    else:
+        stats = _band_statistics(tile_source, indexes, expression=expression, nodata=nodata)
     if stretch == "minmax":
-        vmin = {i: stats[f"b{i}"].min for i in indexes}
-        vmax = {i: stats[f"b{i}"].max for i in indexes}
+        vmin = {i: stats[i].min for i in indexes}
+        vmax = {i: stats[i].max for i in indexes}
     elif stretch == "linear":
         # 2nd to 98th percentile stretch
-        vmin = {i: stats[f"b{i}"].percentile_2 for i in indexes}
-        vmax = {i: stats[f"b{i}"].percentile_98 for i in indexes}
+        vmin = {i: stats[i].percentile_2 for i in indexes}
+        vmax = {i: stats[i].percentile_98 for i in indexes}
     elif stretch == "equalize":
-        # Histogram equalization via numpy
-        for band_idx, _band_num in enumerate(indexes):
-            band_data = img.data[band_idx].astype(float)
-            mask = img.mask[0] if img.mask.ndim == 3 else img.mask
-            valid = band_data[mask > 0] if mask.any() else band_data.ravel()
-            if valid.size > 0:
-                sorted_vals = np.sort(valid)
-                cdf = np.searchsorted(sorted_vals, band_data) / max(len(sorted_vals), 1)
-                img.data[band_idx] = (cdf * 255).astype(img.data.dtype)
-        return {i: 0 for i in indexes}, {i: 255 for i in indexes}
-    elif stretch == "sqrt":
-        vmin = {i: stats[f"b{i}"].min for i in indexes}
-        vmax = {i: stats[f"b{i}"].max for i in indexes}
+        # Histogram equalization with the dataset-wide CDF so that
+        # neighbouring tiles share the same contrast
         for band_idx, band_num in enumerate(indexes):
-            band_data = img.data[band_idx].astype(float)
-            lo, hi = vmin[band_num], vmax[band_num]
-            if hi > lo:
-                normalized = np.clip((band_data - lo) / (hi - lo), 0, 1)
-                img.data[band_idx] = (np.sqrt(normalized) * 255).astype(img.data.dtype)
+            equalized = _equalize_band(img.data[band_idx], stats[band_num].histogram)
+            img.data[band_idx] = equalized.astype(img.data.dtype, copy=False)
         return {i: 0 for i in indexes}, {i: 255 for i in indexes}
-    elif stretch == "log":
-        vmin = {i: stats[f"b{i}"].min for i in indexes}
-        vmax = {i: stats[f"b{i}"].max for i in indexes}
-        for band_idx, band_num in enumerate(indexes):
-            band_data = img.data[band_idx].astype(float)
-            lo, hi = vmin[band_num], vmax[band_num]
-            if hi > lo:
-                normalized = np.clip((band_data - lo) / (hi - lo), 0, 1)
-                img.data[band_idx] = (np.log1p(normalized * 254) / np.log(255) * 255).astype(
-                    img.data.dtype
-                )
+    elif stretch in ("sqrt", "log"):
+        _rescale_image(img, [(stats[i].min, stats[i].max) for i in indexes], stretch=stretch)
         return {i: 0 for i in indexes}, {i: 255 for i in indexes}
-    else:
-        raise ValueError(f"Invalid stretch mode: {stretch!r}. Must be one of {STRETCH_MODES}.")
     return vmin, vmax
 
 
-def _render_image(
+def _style_image(
     tile_source: Reader,
     img: ImageData,
     indexes: list[int],
     vmin: dict[int, float | None],
     vmax: dict[int, float | None],
     colormap: str | None = None,
-    img_format: str = "PNG",
     stretch: str | None = None,
-):
+    expression: str | None = None,
+    nodata: int | float | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Rescale, colormap, and render an ImageData to encoded image bytes.
+    Rescale and colormap an ImageData, returning its output bands and alpha mask.
+
+    Values are rescaled with dataset-wide statistics, so images read from
+    adjacent windows of a dataset share the same contrast.
     """
-    # Resolve colormap to a dict for rio-tiler rendering
-    registered = get_registered_colormap(colormap) if isinstance(colormap, str) else None
-    if registered is not None:
-        colormap = registered
-    elif colormap in cmap.list():
-        colormap = cmap.get(colormap)
-    elif _MPLListedColormap is not None and isinstance(colormap, _MPLListedColormap):
-        c = _MPLLinearSegmentedColormap.from_list("", colormap.colors, N=256)
-        colormap = {k: tuple(v) for k, v in enumerate(c(range(256), 1, 1))}
-    elif _MPLColormap is not None and isinstance(colormap, _MPLColormap):
-        colormap = {k: tuple(v) for k, v in enumerate(colormap(range(256), 1, 1))}
-    elif colormap:
-        c = json.loads(colormap)
-        if isinstance(c, list):
-            if _MPLLinearSegmentedColormap is None:
-                raise ImportError(
-                    "matplotlib is required for list-based colormaps. "
-                    "Install with 'pip install localtileserver[colormaps]'."
-                )
-            c = _MPLLinearSegmentedColormap.from_list("", c, N=256)
-            colormap = {k: tuple(v) for k, v in enumerate(c(range(256), 1, 1))}
-        else:
-            colormap = {}
-            for key, value in c.items():
-                colormap[int(key)] = tuple(value)
+    # Resolve the colormap to a cached lookup table
+    lut = compile_colormap(colormap)
 
     # Apply stretch mode if specified (overrides vmin/vmax)
     if stretch and stretch != "none":
-        vmin, vmax = _apply_stretch(img, stretch, tile_source, indexes)
+        vmin, vmax = _apply_stretch(
+            img, stretch, tile_source, indexes, expression=expression, nodata=nodata
+        )
 
+    palette = None
     if (
-        not colormap
+        lut is None
         and len(indexes) == 1
-        and tile_source.dataset.colorinterp[indexes[0] - 1] == ColorInterp.palette
+        and get_dataset_profile(tile_source).colorinterp[indexes[0] - 1] == ColorInterp.palette
     ):
         # NOTE: vmin/vmax are not used for palette images
-        colormap = tile_source.dataset.colormap(indexes[0])
+        palette = tile_source.dataset.colormap(indexes[0])
     elif (
         img.data.dtype != np.dtype("uint8")
         or any(v is not None for v in vmin.values())
         or any(v is not None for v in vmax.values())
     ):
-        stats = tile_source.statistics(indexes=indexes)
+        if any(v is None for v in vmin.values()) or any(v is None for v in vmax.values()):
+            stats = _band_statistics(tile_source, indexes, expression=expression, nodata=nodata)
         in_range = []
         for i in indexes:
             in_range.append(
                 (
-                    stats[f"b{i}"].min if vmin[i] is None else vmin[i],
-                    stats[f"b{i}"].max if vmax[i] is None else vmax[i],
+                    stats[i].min if vmin[i] is None else vmin[i],
+                    stats[i].max if vmax[i] is None else vmax[i],
                 )
             )
-        img.rescale(
-            in_range=in_range,
-            out_range=[(0, 255)],
+        _rescale_image(img, in_range)
+    if lut is not None:
+        return _apply_lut(img, lut)
+    if palette:
+        data, alpha = apply_cmap(img.array.data, palette)
+        return data, np.where(img.mask != 0, alpha, 0).astype(data.dtype)
+    return img.array.data, img.mask
+
+
+def _render_image(
+    tile_source: Reader,
+    img: ImageData,
+    indexes: list[int],
+    vmin: dict[int, float | None],
+    vmax: dict[int, float | None],
+    colormap: str | None = None,
+    img_format: str = "PNG",
+    stretch: str | None = None,
+    expression: str | None = None,
+    nodata: int | float | None = None,
+    encoder_options: dict | None = None,
+):
+    """
+    Rescale, colormap, and render an ImageData to encoded image bytes.
+
+    An *img_format* of ``"AUTO"`` encodes fully opaque 8-bit tiles as JPEG
+    and everything else as PNG.
+    """
+    encoder_options = encoder_options or {}
+    auto = img_format.upper() == "AUTO"
+
+    # Nothing to rescale or colormap when every pixel is masked
+    if img_format.upper() in _EMPTY_IMAGE_FORMATS and not _alpha(img).any():
+        return get_empty_tile(img_format, width=img.width, height=img.height)
+    data, mask = _style_image(
+        tile_source,
+        img,
+        indexes,
+        vmin,
+        vmax,
+        colormap=colormap,
+        stretch=stretch,
+        expression=expression,
+        nodata=nodata,
+    )
+    if data.dtype not in (np.uint8, np.uint16) and img_format.upper() not in ("GTIFF", "NPY"):
+        # Let rio-tiler bring dtypes the driver cannot store into range
+        if auto:
+            img_format = "PNG"
+        return ImageBytes(
+            img.render(img_format=img_format, **get_encoder_options(img_format, **encoder_options)),
+            mimetype=f"image/{img_format.lower()}",
         )
-    return ImageBytes(
-        img.render(img_format=img_format, colormap=colormap if colormap else None),
-        mimetype=f"image/{img_format.lower()}",
+    if auto:
+        img_format = _auto_format(data, mask)
+    return _encode(
+        data,
+        mask,
+        img_format,
+        transform=img.transform,
+        crs=img.crs,
+        **get_encoder_options(img_format, **encoder_options),
     )
 
 
-def get_tile(
+_EMPTY_IMAGE_FORMATS = ("PNG", "JPEG", "WEBP", "AUTO")
+
+
+def get_empty_tile(img_format: str = "PNG", width: int = 256, height: int = 256) -> ImageBytes:
+    """
+    Return a fully transparent image, encoded once per format and size.
+
+    Parameters
+    ----------
+    img_format : str, optional
+        Output image format: ``"PNG"``, ``"JPEG"``, ``"WEBP"`` or
+        ``"AUTO"`` (encoded as PNG). JPEG has no alpha channel, so its
+        empty image is black. Defaults to ``"PNG"``.
+    width : int, optional
+        Image width in pixels. Defaults to ``256``.
+    height : int, optional
+        Image height in pixels. Defaults to ``256``.
+
+    Returns
+    -------
+    ImageBytes
+        The shared encoded image.
+
+    Raises
+    ------
+    ValueError
+        If *img_format* is not an image format with an empty image.
+    """
+    fmt = img_format.upper()
+    if fmt not in _EMPTY_IMAGE_FORMATS:
+        raise ValueError(f"No empty image for format {img_format!r}.")
+    return _empty_tile("PNG" if fmt == "AUTO" else fmt, width, height)
+
+
+@lru_cache(maxsize=64)
+def _empty_tile(img_format: str, width: int, height: int) -> ImageBytes:
+    data = np.zeros((3, height, width), dtype=np.uint8)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    return _encode(data, mask, img_format)
+
+
+def _auto_format(data: np.ndarray, mask: np.ndarray) -> str:
+    """
+    Pick JPEG for fully opaque 8-bit images JPEG can store, PNG otherwise.
+    """
+    if data.dtype == np.uint8 and data.shape[0] in (1, 3) and (mask == 255).all():
+        return "JPEG"
+    return "PNG"
+
+
+def _alpha(img: ImageData) -> np.ndarray:
+    """
+    Return the validity mask of an image as ``uint8`` 0 (masked) / 255 (valid).
+
+    ``ImageData.mask`` uses the range of the data type instead, e.g.
+    ``-3.4e38`` for masked float32 pixels.
+    """
+    if img.alpha_mask is not None:
+        return img.alpha_mask
+    valid = np.logical_or.reduce(~np.ma.getmaskarray(img.array))
+    return valid.astype(np.uint8) * np.uint8(255)
+
+
+def _apply_lut(img: ImageData, lut: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Colormap a single-band image with a 256x4 lookup table.
+
+    Equivalent to rio-tiler's colormap handling in ``img.render`` but
+    applies the colormap with one vectorized gather. Returns the RGB bands
+    and the alpha mask.
+    """
+    if img.count != 1:
+        raise InvalidFormat("Source data must be 1 band")
+    data = img.data[0]
+    if data.dtype != np.uint8:
+        data = data.astype(np.uint8)
+    rgba = np.take(lut.T, data, axis=1)
+    # Masked pixels stay transparent, valid ones take the colormap alpha
+    mask = np.where(img.mask != 0, rgba[3], 0).astype(np.uint8)
+    return rgba[:3], mask
+
+
+def _encode(
+    data: np.ndarray,
+    mask: np.ndarray | None,
+    img_format: str,
+    transform=None,
+    crs=None,
+    **creation_options,
+) -> ImageBytes:
+    """
+    Encode bands and an alpha mask into an :class:`ImageBytes`.
+
+    Mirrors ``rio_tiler.utils.render`` for data that is already in its
+    output dtype (colormapped, ``uint8`` or ``uint16``), so the image is
+    written to GDAL without the type checks and casts of ``img.render``.
+    *creation_options* are passed to the GDAL driver.
+    """
+    mimetype = f"image/{img_format.lower()}"
+    fmt = img_format.upper()
+    if fmt in ("NPY", "NPZ"):
+        return ImageBytes(render(data, mask, img_format=fmt, **creation_options), mimetype=mimetype)
+    if fmt == "WEBP" and data.shape[0] == 1:
+        # WEBP does not support single band images
+        data = np.repeat(data, 3, axis=0)
+    if fmt == "PNG" and data.dtype == np.uint16 and mask is not None:
+        mask = linear_rescale(mask, (0, 255), (0, 65535)).astype(np.uint16)
+    elif fmt == "JPEG":
+        mask = None
+    count, height, width = data.shape
+    profile = {
+        "driver": fmt,
+        "dtype": data.dtype,
+        "count": count + 1 if mask is not None else count,
+        "height": height,
+        "width": width,
+    }
+    if fmt == "GTIFF":
+        profile["transform"] = transform
+        if crs:
+            profile["crs"] = crs
+    profile.update(creation_options)
+    try:
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", category=NotGeoreferencedWarning)
+            with MemoryFile() as memfile:
+                with memfile.open(**profile) as dst:
+                    dst.write(data, indexes=list(range(1, count + 1)))
+                    if mask is not None:
+                        if ColorInterp.alpha not in dst.colorinterp:
+                            dst.colorinterp = *dst.colorinterp[:-1], ColorInterp.alpha
+                        dst.write(mask.astype(data.dtype), indexes=count + 1)
+                return ImageBytes(memfile.read(), mimetype=mimetype)
+    except Exception as e:
+        raise InvalidFormat(
+            f"Could not encode array of shape ({count},{height},{width}) and of "
+            f"datatype `{data.dtype}` using {fmt} driver"
+        ) from e
+
+
+def _tile_read_options(
     tile_source: Reader,
+    indexes: list[int] | None = None,
+    colormap: str | None = None,
+    nodata: int | float | None = None,
+    expression: str | None = None,
+) -> tuple[dict, list[int] | None, int | float | None]:
+    """
+    Resolve the read arguments of a styled tile.
+
+    Returns the keyword arguments for ``Reader.tile``/``Reader.part``, the
+    band indexes (``None`` for expressions, which are known after reading)
+    and the normalised nodata value.
+    """
+    nodata = _handle_nodata(tile_source, nodata)
+    if expression:
+        return {"expression": expression, "nodata": nodata}, None, nodata
+    if colormap is not None and indexes is None:
+        indexes = [1]
+    indexes = _handle_band_indexes(tile_source, indexes)
+    return {"indexes": indexes, "nodata": nodata}, indexes, nodata
+
+
+def _render_tile(
+    tile_source: Reader,
+    img: ImageData,
+    indexes: list[int] | None,
+    vmin: float | list[float] | None,
+    vmax: float | list[float] | None,
+    nodata: int | float | None,
+    **kwargs,
+) -> ImageBytes:
+    """
+    Render a tile read with the options from :func:`_tile_read_options`.
+    """
+    if indexes is None:
+        indexes = list(range(1, img.count + 1))
+    vmin, vmax = _handle_vmin_vmax(indexes, vmin, vmax)
+    return _render_image(
+        tile_source, img, indexes=indexes, vmin=vmin, vmax=vmax, nodata=nodata, **kwargs
+    )
+
+
+def _warm_statistics(
+    tile_source: Reader,
+    indexes: list[int] | None = None,
+    colormap: str | None = None,
+    vmin: float | list[float] | None = None,
+    vmax: float | list[float] | None = None,
+    nodata: int | float | None = None,
+    expression: str | None = None,
+    stretch: str | None = None,
+):
+    """
+    Compute the cached statistics that rendering tiles with a style needs.
+
+    Rendering many tiles concurrently then finds them in the statistics
+    cache instead of racing to compute them from the first tiles.
+    """
+    _, indexes, nodata = _tile_read_options(tile_source, indexes, colormap, nodata, expression)
+    if indexes is None:
+        # Expressions produce one output per ';'-separated term
+        indexes = list(range(1, expression.count(";") + 2))
+    if stretch == "equalize":
+        _band_statistics(
+            tile_source,
+            indexes,
+            expression=expression,
+            nodata=nodata,
+            hist_options={"bins": _EQUALIZE_BINS},
+        )
+        return
+    if stretch and stretch != "none":
+        _band_statistics(tile_source, indexes, expression=expression, nodata=nodata)
+        return
+    vmin, vmax = _handle_vmin_vmax(indexes, vmin, vmax)
+    profile = get_dataset_profile(tile_source)
+    unscaled = expression is None and all(profile.dtypes[i - 1] == "uint8" for i in indexes)
+    given = [v for v in (*vmin.values(), *vmax.values()) if v is not None]
+    if unscaled and not given:
+        return
+    if None in vmin.values() or None in vmax.values():
+        _band_statistics(tile_source, indexes, expression=expression, nodata=nodata)
+
+
+def get_tile(
+    tile_source: Reader | TileArchive,
     z: int,
     x: int,
     y: int,
@@ -368,14 +776,16 @@ def get_tile(
     img_format: str = "PNG",
     expression: str | None = None,
     stretch: str | None = None,
+    encoder_options: dict | None = None,
 ):
     """
     Generate a rendered map tile for the given ZXY index.
 
     Parameters
     ----------
-    tile_source : Reader
-        An open rio-tiler ``Reader`` for the raster dataset.
+    tile_source : Reader or TileArchive
+        An open rio-tiler ``Reader`` for the raster dataset, or an open
+        tile archive.
     z : int
         Zoom level of the tile.
     x : int
@@ -393,7 +803,8 @@ def get_tile(
     nodata : int or float, optional
         Override nodata value for the dataset.
     img_format : str, optional
-        Output image format (e.g., ``"PNG"``, ``"JPEG"``). Defaults to
+        Output image format (e.g., ``"PNG"``, ``"JPEG"``). ``"AUTO"``
+        picks JPEG for fully opaque tiles and PNG otherwise. Defaults to
         ``"PNG"``.
     expression : str, optional
         Band math expression (e.g., ``"b1/b2"``). When provided,
@@ -402,43 +813,385 @@ def get_tile(
         Stretch mode to apply before rendering. One of ``"none"``,
         ``"minmax"``, ``"linear"``, ``"equalize"``, ``"sqrt"``, or
         ``"log"``.
+    encoder_options : dict, optional
+        Encoder settings (``quality``, ``compression_level``,
+        ``lossless``) as accepted by
+        :func:`localtileserver.tiler.utilities.get_encoder_options`.
 
     Returns
     -------
     ImageBytes
-        Encoded image bytes with an associated MIME type.
+        Encoded image bytes with an associated MIME type. Tiles of an
+        archive are returned as stored, whatever the style arguments and
+        *img_format*.
     """
-    if expression:
-        nodata = _handle_nodata(tile_source, nodata)
-        img = tile_source.tile(x, y, z, expression=expression, nodata=nodata)
-        expr_indexes = list(range(1, img.count + 1))
-        vmin, vmax = _handle_vmin_vmax(expr_indexes, vmin, vmax)
-        return _render_image(
-            tile_source,
-            img,
-            indexes=expr_indexes,
-            vmin=vmin,
-            vmax=vmax,
-            colormap=colormap,
-            img_format=img_format,
-            stretch=stretch,
-        )
-    if colormap is not None and indexes is None:
-        indexes = [1]
-    indexes = _handle_band_indexes(tile_source, indexes)
-    nodata = _handle_nodata(tile_source, nodata)
-    vmin, vmax = _handle_vmin_vmax(indexes, vmin, vmax)
-    img = tile_source.tile(x, y, z, indexes=indexes, nodata=nodata)
-    return _render_image(
+    if isinstance(tile_source, TileArchive):
+        return tile_source.read_tile(z, x, y)
+    read_options, indexes, nodata = _tile_read_options(
+        tile_source, indexes, colormap, nodata, expression
+    )
+    img = tile_source.tile(x, y, z, **read_options)
+    return _render_tile(
         tile_source,
         img,
-        indexes=indexes,
-        vmin=vmin,
-        vmax=vmax,
+        indexes,
+        vmin,
+        vmax,
+        nodata,
         colormap=colormap,
         img_format=img_format,
         stretch=stretch,
+        expression=expression,
+        encoder_options=encoder_options,
+    )
+
+
+METATILE_SIZES = (1, 2, 4)
+
+
+def get_metatile(
+    tile_source: Reader,
+    z: int,
+    x: int,
+    y: int,
+    size: int = 2,
+    indexes: list[int] | None = None,
+    colormap: str | None = None,
+    vmin: float | list[float] | None = None,
+    vmax: float | list[float] | None = None,
+    nodata: int | float | None = None,
+    img_format: str = "PNG",
+    expression: str | None = None,
+    stretch: str | None = None,
+    encoder_options: dict | None = None,
+) -> dict[tuple[int, int, int], ImageBytes]:
+    """
+    Render the block of *size* by *size* tiles containing a tile at once.
+
+    The block is read and warped in a single ``Reader.part`` call and then
+    sliced into tiles, so neighbouring tiles share the range requests and
+    warp setup of one read instead of repeating them.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for the raster dataset.
+    z : int
+        Zoom level of the tile.
+    x : int
+        Column index of the tile.
+    y : int
+        Row index of the tile.
+    size : {1, 2, 4}, optional
+        Number of tiles along each side of the block. Blocks are aligned
+        to multiples of *size* and clipped to the tile matrix. Defaults to
+        ``2``.
+    indexes : list of int, optional
+        Band indexes to render. Auto-detected when not provided.
+    colormap : str, optional
+        Name of a colormap to apply when rendering a single band.
+    vmin : float or list of float, optional
+        Minimum value(s) for rescaling band data.
+    vmax : float or list of float, optional
+        Maximum value(s) for rescaling band data.
+    nodata : int or float, optional
+        Override nodata value for the dataset.
+    img_format : str, optional
+        Output image format of each tile, as for :func:`get_tile`.
+        Defaults to ``"PNG"``.
+    expression : str, optional
+        Band math expression (e.g., ``"b1/b2"``). When provided,
+        *indexes* is ignored.
+    stretch : str, optional
+        Stretch mode to apply before rendering. One of ``"none"``,
+        ``"minmax"``, ``"linear"``, ``"equalize"``, ``"sqrt"``, or
+        ``"log"``.
+    encoder_options : dict, optional
+        Encoder settings (``quality``, ``compression_level``,
+        ``lossless``) as accepted by
+        :func:`localtileserver.tiler.utilities.get_encoder_options`.
+
+    Returns
+    -------
+    dict
+        Encoded tiles of the block keyed by ``(z, x, y)``, including the
+        requested tile. Tiles outside the dataset are left out.
+
+    Raises
+    ------
+    TileOutsideBounds
+        If the requested tile is outside the dataset.
+    ValueError
+        If *size* is not supported.
+    """
+    if size not in METATILE_SIZES:
+        raise ValueError(f"Metatile size must be one of {METATILE_SIZES}.")
+    if not tile_source.tile_exists(x, y, z):
+        raise TileOutsideBounds(f"Tile(x={x}, y={y}, z={z}) is outside bounds")
+    tms = tile_source.tms
+    matrix = tms.matrix(z)
+    x0, y0 = x - x % size, y - y % size
+    columns = min(size, matrix.matrixWidth - x0)
+    rows = min(size, matrix.matrixHeight - y0)
+    left, _, _, top = tms.xy_bounds(Tile(x=x0, y=y0, z=z))
+    _, bottom, right, _ = tms.xy_bounds(Tile(x=x0 + columns - 1, y=y0 + rows - 1, z=z))
+    read_options, indexes, nodata = _tile_read_options(
+        tile_source, indexes, colormap, nodata, expression
     )
+    width, height = matrix.tileWidth, matrix.tileHeight
+    block = tile_source.part(
+        (left, bottom, right, top),
+        dst_crs=tms.rasterio_crs,
+        bounds_crs=tms.rasterio_crs,
+        height=height * rows,
+        width=width * columns,
+        max_size=None,
+        **read_options,
+    )
+    tiles = {}
+    for row in range(rows):
+        for column in range(columns):
+            tx, ty = x0 + column, y0 + row
+            if not tile_source.tile_exists(tx, ty, z):
+                continue
+            window = (
+                slice(row * height, (row + 1) * height),
+                slice(column * width, (column + 1) * width),
+            )
+            img = ImageData(
+                block.array[(slice(None), *window)],
+                crs=block.crs,
+                bounds=tms.xy_bounds(Tile(x=tx, y=ty, z=z)),
+                band_names=block.band_names,
+                band_descriptions=block.band_descriptions,
+                nodata=block.nodata,
+                scales=block.scales,
+                offsets=block.offsets,
+                metadata=block.metadata,
+                dataset_statistics=block.dataset_statistics,
+                alpha_mask=None if block.alpha_mask is None else block.alpha_mask[window],
+            )
+            tiles[(z, tx, ty)] = _render_tile(
+                tile_source,
+                img,
+                indexes,
+                vmin,
+                vmax,
+                nodata,
+                colormap=colormap,
+                img_format=img_format,
+                stretch=stretch,
+                expression=expression,
+                encoder_options=encoder_options,
+            )
+    return tiles
+
+
+def get_terrain_tile(
+    tile_source: Reader,
+    z: int,
+    x: int,
+    y: int,
+    scheme: str = "mapbox",
+    band: int | str = 1,
+    nodata: int | float | None = None,
+    img_format: str = "PNG",
+) -> ImageBytes:
+    """
+    Generate an elevation tile encoded as Terrain-RGB or Terrarium.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for a digital elevation model.
+    z : int
+        Zoom level of the tile.
+    x : int
+        Column index of the tile.
+    y : int
+        Row index of the tile.
+    scheme : {"mapbox", "terrarium"}, optional
+        Elevation encoding (see
+        :func:`localtileserver.tiler.terrain.encode_terrain`). Defaults to
+        ``"mapbox"``.
+    band : int or str, optional
+        Index or name of the elevation band. Defaults to ``1``.
+    nodata : int or float, optional
+        Override nodata value for the dataset. Nodata pixels are
+        transparent.
+    img_format : {"PNG", "WEBP"}, optional
+        Output image format. WEBP is always encoded losslessly. Defaults to
+        ``"PNG"``.
+
+    Returns
+    -------
+    ImageBytes
+        Encoded image bytes with an associated MIME type.
+
+    Raises
+    ------
+    ValueError
+        If *img_format* is not a lossless format or *scheme* is unknown.
+    """
+    img_format = img_format.upper()
+    if img_format not in ("PNG", "WEBP"):
+        raise ValueError("Terrain tiles need a lossless format: PNG or WEBP.")
+    indexes = _handle_band_indexes(tile_source, [band])
+    nodata = _handle_nodata(tile_source, nodata)
+    img = tile_source.tile(x, y, z, indexes=indexes, nodata=nodata)
+    alpha = _alpha(img)
+    if not alpha.any():
+        return get_empty_tile(img_format, width=img.width, height=img.height)
+    rgb = encode_terrain(img.data[0], scheme)
+    options = {"LOSSLESS": "TRUE"} if img_format == "WEBP" else {}
+    return _encode(rgb, alpha, img_format, **options)
+
+
+def get_hillshade_tile(
+    tile_source: Reader,
+    z: int,
+    x: int,
+    y: int,
+    azimuth: float = 315.0,
+    altitude: float = 45.0,
+    z_factor: float = 1.0,
+    band: int | str = 1,
+    nodata: int | float | None = None,
+    img_format: str = "PNG",
+    encoder_options: dict | None = None,
+) -> ImageBytes:
+    """
+    Generate a hillshade map tile from a digital elevation model.
+
+    The tile is read with a one-pixel buffer so that slopes at its edges
+    match those of the neighboring tiles.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for a digital elevation model.
+    z : int
+        Zoom level of the tile.
+    x : int
+        Column index of the tile.
+    y : int
+        Row index of the tile.
+    azimuth : float, optional
+        Direction of the light source in degrees clockwise from north.
+        Defaults to ``315``.
+    altitude : float, optional
+        Angle of the light source above the horizon in degrees. Defaults
+        to ``45``.
+    z_factor : float, optional
+        Vertical exaggeration. Defaults to ``1``.
+    band : int or str, optional
+        Index or name of the elevation band. Defaults to ``1``.
+    nodata : int or float, optional
+        Override nodata value for the dataset.
+    img_format : str, optional
+        Output image format (e.g., ``"PNG"``, ``"JPEG"``). Defaults to
+        ``"PNG"``.
+    encoder_options : dict, optional
+        Encoder settings (``quality``, ``compression_level``,
+        ``lossless``) as accepted by
+        :func:`localtileserver.tiler.utilities.get_encoder_options`.
+
+    Returns
+    -------
+    ImageBytes
+        Encoded grayscale image bytes with an associated MIME type.
+    """
+    indexes = _handle_band_indexes(tile_source, [band])
+    nodata = _handle_nodata(tile_source, nodata)
+    img = tile_source.tile(x, y, z, indexes=indexes, nodata=nodata, buffer=1)
+    elevation = np.ma.filled(img.array[0].astype(np.float32), np.nan)
+    cellsize = abs(img.transform.a)
+    if img.crs == _WEB_MERCATOR:
+        # Web Mercator stretches ground distances by 1 / cos(latitude)
+        y_center = (img.bounds[1] + img.bounds[3]) / 2
+        latitude = 2 * np.arctan(np.exp(y_center / _EARTH_RADIUS)) - np.pi / 2
+        cellsize *= np.cos(latitude)
+    shaded = hillshade(elevation, cellsize, azimuth=azimuth, altitude=altitude, z_factor=z_factor)
+    valid = np.isfinite(shaded)
+    if not valid.any():
+        return get_empty_tile(img_format, width=shaded.shape[1], height=shaded.shape[0])
+    data = np.where(valid, shaded, 0).astype(np.uint8)[np.newaxis]
+    mask = valid.astype(np.uint8) * np.uint8(255)
+    if img_format.upper() == "AUTO":
+        img_format = _auto_format(data, mask)
+    options = get_encoder_options(img_format, **(encoder_options or {}))
+    return _encode(data, mask, img_format, **options)
+
+
+# Types the band values can be cast to; all of them can hold the 0/255 mask
+DATA_TILE_DTYPES = ("uint8", "uint16", "int16", "uint32", "int32", "float16", "float32", "float64")
+
+
+def get_data_tile(
+    tile_source: Reader,
+    z: int,
+    x: int,
+    y: int,
+    indexes: list[int] | None = None,
+    nodata: int | float | None = None,
+    expression: str | None = None,
+    dtype: str | None = None,
+) -> ImageBytes:
+    """
+    Read the raw band values of a map tile for client-side rendering.
+
+    Unlike :func:`get_tile` the values are neither rescaled nor
+    colormapped, so no statistics are computed.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for the raster dataset.
+    z : int
+        Zoom level of the tile.
+    x : int
+        Column index of the tile.
+    y : int
+        Row index of the tile.
+    indexes : list of int, optional
+        Band indexes to read. Auto-detected when not provided.
+    nodata : int or float, optional
+        Override nodata value for the dataset.
+    expression : str, optional
+        Band math expression (e.g., ``"b1/b2"``). When provided,
+        *indexes* is ignored.
+    dtype : str, optional
+        Cast the values to this type to shrink the payload, e.g.
+        ``"float16"``. One of :data:`DATA_TILE_DTYPES`. Defaults to the
+        type of the data read.
+
+    Returns
+    -------
+    ImageBytes
+        A NumPy ``.npy`` array of shape ``(bands + 1, height, width)``: the
+        band values followed by the mask band (``0`` for masked pixels,
+        ``255`` for valid ones), the same layout as rio-tiler's NPY output.
+
+    Raises
+    ------
+    ValueError
+        If *dtype* is not one of :data:`DATA_TILE_DTYPES`.
+    """
+    if dtype is not None and dtype not in DATA_TILE_DTYPES:
+        raise ValueError(f"dtype {dtype!r} not supported. Use one of {list(DATA_TILE_DTYPES)}.")
+    nodata = _handle_nodata(tile_source, nodata)
+    if expression:
+        img = tile_source.tile(x, y, z, expression=expression, nodata=nodata)
+    else:
+        indexes = _handle_band_indexes(tile_source, indexes)
+        img = tile_source.tile(x, y, z, indexes=indexes, nodata=nodata)
+    data = img.array.data
+    if dtype is not None:
+        data = data.astype(dtype, copy=False)
+    stacked = np.concatenate((data, _alpha(img)[np.newaxis].astype(data.dtype)))
+    with BytesIO() as bio:
+        np.save(bio, stacked)
+        return ImageBytes(bio.getvalue(), mimetype="application/x-npy")
 
 
 def get_statistics(
@@ -471,17 +1224,15 @@ def get_statistics(
         whose values are dictionaries of statistics including min,
         max, mean, std, and histogram.
     """
-    stats_kwargs = dict(kwargs)
     if expression:
-        stats = tile_source.statistics(expression=expression, **stats_kwargs)
+        stats = get_statistics_cache().get(tile_source, expression=expression, **kwargs)
     else:
         if indexes is not None:
             if isinstance(indexes, (str, int)):
                 indexes = [int(indexes)]
             else:
                 indexes = [int(i) for i in indexes]
-            stats_kwargs["indexes"] = indexes
-        stats = tile_source.statistics(**stats_kwargs)
+        stats = get_statistics_cache().get(tile_source, indexes=indexes, **kwargs)
     result = {}
     for band_name, band_stats in stats.items():
         if hasattr(band_stats, "model_dump"):
@@ -505,6 +1256,7 @@ def get_part(
     bounds_crs: str | None = None,
     expression: str | None = None,
     stretch: str | None = None,
+    encoder_options: dict | None = None,
 ):
     """
     Extract a spatial subset (bounding box crop) from the raster.
@@ -541,6 +1293,10 @@ def get_part(
         *indexes* is ignored.
     stretch : str, optional
         Stretch mode to apply before rendering.
+    encoder_options : dict, optional
+        Encoder settings (``quality``, ``compression_level``,
+        ``lossless``) as accepted by
+        :func:`localtileserver.tiler.utilities.get_encoder_options`.
 
     Returns
     -------
@@ -566,6 +1322,9 @@ def get_part(
             colormap=colormap,
             img_format=img_format,
             stretch=stretch,
+            expression=expression,
+            nodata=nodata,
+            encoder_options=encoder_options,
         )
     if colormap is not None and indexes is None:
         indexes = [1]
@@ -581,6 +1340,8 @@ def get_part(
         colormap=colormap,
         img_format=img_format,
         stretch=stretch,
+        nodata=nodata,
+        encoder_options=encoder_options,
     )
 
 
@@ -597,6 +1358,7 @@ def get_feature(
     dst_crs: str | None = None,
     expression: str | None = None,
     stretch: str | None = None,
+    encoder_options: dict | None = None,
 ):
     """
     Extract data masked to a GeoJSON feature.
@@ -630,6 +1392,10 @@ def get_feature(
         *indexes* is ignored.
     stretch : str, optional
         Stretch mode to apply before rendering.
+    encoder_options : dict, optional
+        Encoder settings (``quality``, ``compression_level``,
+        ``lossless``) as accepted by
+        :func:`localtileserver.tiler.utilities.get_encoder_options`.
 
     Returns
     -------
@@ -658,6 +1424,9 @@ def get_feature(
             colormap=colormap,
             img_format=img_format,
             stretch=stretch,
+            expression=expression,
+            nodata=nodata,
+            encoder_options=encoder_options,
         )
     if colormap is not None and indexes is None:
         indexes = [1]
@@ -673,6 +1442,8 @@ def get_feature(
         colormap=colormap,
         img_format=img_format,
         stretch=stretch,
+        nodata=nodata,
+        encoder_options=encoder_options,
     )
 
 
@@ -717,6 +1488,7 @@ def get_preview(
     crs: str | None = None,
     expression: str | None = None,
     stretch: str | None = None,
+    encoder_options: dict | None = None,
 ):
     """
     Generate a downsampled preview image of the entire raster.
@@ -751,6 +1523,10 @@ def get_preview(
         Stretch mode to apply before rendering. One of ``"none"``,
         ``"minmax"``, ``"linear"``, ``"equalize"``, ``"sqrt"``, or
         ``"log"``.
+    encoder_options : dict, optional
+        Encoder settings (``quality``, ``compression_level``,
+        ``lossless``) as accepted by
+        :func:`localtileserver.tiler.utilities.get_encoder_options`.
 
     Returns
     -------
@@ -783,6 +1559,9 @@ def get_preview(
             colormap=colormap,
             img_format=img_format,
             stretch=stretch,
+            expression=expression,
+            nodata=nodata,
+            encoder_options=encoder_options,
         )
     if colormap is not None and indexes is None:
         indexes = [1]
@@ -811,4 +1590,6 @@ def get_preview(
         colormap=colormap,
         img_format=img_format,
         stretch=stretch,
+        nodata=nodata,
+        encoder_options=encoder_options,
     )
@@ -0,0 +1,223 @@
+"""
+Read and write tiles in MBTiles (SQLite) archives.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+import hashlib
+import pathlib
+import sqlite3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tiles (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    tile_data BLOB NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+"""
+
+# Stores each distinct tile once; ``tiles`` is a view so readers see the usual layout
+_DEDUPLICATED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS map (
+    zoom_level INTEGER NOT NULL,
+    tile_column INTEGER NOT NULL,
+    tile_row INTEGER NOT NULL,
+    tile_id TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS map_index ON map (zoom_level, tile_column, tile_row);
+CREATE TABLE IF NOT EXISTS images (tile_id TEXT PRIMARY KEY, tile_data BLOB NOT NULL);
+CREATE VIEW IF NOT EXISTS tiles AS
+    SELECT map.zoom_level AS zoom_level, map.tile_column AS tile_column,
+        map.tile_row AS tile_row, images.tile_data AS tile_data
+    FROM map JOIN images ON images.tile_id = map.tile_id;
+"""
+
+# MBTiles names of the tile encodings
+MBTILES_FORMATS = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}
+
+
+def _tms_row(z: int, y: int) -> int:
+    # MBTiles counts rows from the south like TMS; map tiles count from the north
+    return (1 << z) - 1 - y
+
+
+class MBTiles:
+    """
+    An MBTiles 1.3 archive of raster tiles.
+
+    Tiles are addressed with the XYZ scheme used by the tile endpoints and
+    stored with the flipped TMS rows the specification requires. Writes
+    are grouped in a transaction until :meth:`commit`, which is also
+    called when the archive is closed.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Location of the archive. Created when it does not exist.
+    mode : {"r", "a"}, optional
+        ``"r"`` opens an existing archive read-only, ``"a"`` opens or
+        creates it for writing. Defaults to ``"r"``.
+    deduplicate : bool, optional
+        Create a new archive that stores identical tiles, such as the
+        blank tiles over water, only once. Existing archives keep their
+        layout. Defaults to ``False``.
+    """
+
+    def __init__(self, path: pathlib.Path | str, mode: str = "r", deduplicate: bool = False):
+        if mode not in ("r", "a"):
+            raise ValueError(f"mode must be 'r' or 'a', got {mode!r}")
+        self.path = pathlib.Path(path)
+        self.mode = mode
+        if mode == "r":
+            if not self.path.exists():
+                raise FileNotFoundError(f"MBTiles archive not found: {self.path}")
+            self._conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            if self._layout() is None:
+                self._conn.executescript(_DEDUPLICATED_SCHEMA if deduplicate else _SCHEMA)
+        self.deduplicated = self._layout() == "view"
+
+    def _layout(self) -> str | None:
+        row = self._conn.execute("SELECT type FROM sqlite_master WHERE name = 'tiles'").fetchone()
+        return None if row is None else row[0]
+
+    def __enter__(self) -> MBTiles:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def metadata(self) -> dict[str, str]:
+        """
+        Return the metadata table.
+
+        Returns
+        -------
+        dict
+            Metadata names mapped to their values.
+        """
+        return dict(self._conn.execute("SELECT name, value FROM metadata"))
+
+    def update_metadata(self, **values):
+        """
+        Set metadata entries, converting values to strings.
+
+        Parameters
+        ----------
+        **values
+            Metadata names and values, e.g. ``format="png"``.
+        """
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+            [(name, str(value)) for name, value in values.items()],
+        )
+
+    def get_tile(self, z: int, x: int, y: int) -> bytes | None:
+        """
+        Return the encoded tile at ``z/x/y``, or ``None`` when missing.
+
+        Parameters
+        ----------
+        z, x, y : int
+            XYZ tile coordinates.
+
+        Returns
+        -------
+        bytes or None
+            The stored tile.
+        """
+        row = self._conn.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, _tms_row(z, y)),
+        ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def put_tiles(self, tiles: Iterable[tuple[int, int, int, bytes]]):
+        """
+        Store encoded tiles, replacing existing ones.
+
+        Parameters
+        ----------
+        tiles : iterable of tuple
+            ``(z, x, y, data)`` tuples.
+        """
+        if not self.deduplicated:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) "
+                "VALUES (?, ?, ?, ?)",
+                ((z, x, _tms_row(z, y), data) for z, x, y, data in tiles),
+            )
+            return
+        rows = []
+        images = {}
+        for z, x, y, data in tiles:
+            tile_id = hashlib.blake2b(data, digest_size=16).hexdigest()
+            images[tile_id] = data
+            rows.append((z, x, _tms_row(z, y), tile_id))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO images (tile_id, tile_data) VALUES (?, ?)", images.items()
+        )
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO map (zoom_level, tile_column, tile_row, tile_id) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    def tile_coordinates(self, z: int | None = None) -> Iterator[tuple[int, int, int]]:
+        """
+        Iterate over the XYZ coordinates of the stored tiles.
+
+        Parameters
+        ----------
+        z : int, optional
+            Only list tiles of this zoom level.
+
+        Yields
+        ------
+        tuple of int
+            ``(z, x, y)`` coordinates.
+        """
+        query = "SELECT zoom_level, tile_column, tile_row FROM tiles"
+        params: tuple = ()
+        if z is not None:
+            query += " WHERE zoom_level = ?"
+            params = (z,)
+        for zoom, column, row in self._conn.execute(query, params):
+            yield zoom, column, _tms_row(zoom, row)
+
+    def zoom_range(self) -> tuple[int, int] | None:
+        """
+        Return the lowest and highest zoom level of the stored tiles.
+
+        Returns
+        -------
+        tuple of int or None
+            ``(minzoom, maxzoom)``, or ``None`` for an empty archive.
+        """
+        table = "map" if self.deduplicated else "tiles"
+        row = self._conn.execute(f"SELECT MIN(zoom_level), MAX(zoom_level) FROM {table}").fetchone()
+        return None if row[0] is None else (row[0], row[1])
+
+    def commit(self):
+        """
+        Commit pending writes to disk.
+        """
+        self._conn.commit()
+
+    def close(self):
+        """
+        Commit pending writes and close the archive.
+        """
+        if self.mode == "a":
+            self._conn.commit()
+        self._conn.close()
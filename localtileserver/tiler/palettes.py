@@ -2,13 +2,24 @@
 Colormap palette registry and validation utilities.
 """
 
+from functools import lru_cache
 import hashlib
 import json
 import logging
 import threading
 
+import numpy as np
 from rio_tiler.colormap import cmap as RIO_CMAPS
 
+try:
+    from matplotlib.colors import (
+        Colormap as _MPLColormap,
+        LinearSegmentedColormap as _MPLLinearSegmentedColormap,
+        ListedColormap as _MPLListedColormap,
+    )
+except ImportError:
+    _MPLColormap = _MPLLinearSegmentedColormap = _MPLListedColormap = None
+
 logger = logging.getLogger(__name__)
 
 # Thread-safe server-side colormap registry for custom colormaps (#231).
@@ -110,3 +121,86 @@ def get_palettes():
         Dictionary mapping palette source names to lists of colormap names.
     """
     return {"matplotlib": list(RIO_CMAPS.data.keys())}
+
+
+def _lut_from_dict(colormap: dict) -> np.ndarray:
+    """
+    Build a 256x4 lookup table from an ``{int: (r, g, b[, a])}`` dict.
+
+    Values without an entry map to fully transparent black, matching
+    rio-tiler's handling of discrete colormaps. Colormaps apply to 8-bit
+    output values, so keys outside 0-255 raise a ``ValueError`` rather
+    than silently rendering nothing.
+    """
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    for key, value in colormap.items():
+        key = int(key)
+        if not 0 <= key < 256:
+            raise ValueError(f"Colormap keys must be between 0 and 255, got {key}.")
+        rgba = tuple(value)
+        lut[key] = rgba if len(rgba) == 4 else (*rgba, 255)
+    return lut
+
+
+def _lut_from_mpl(colormap) -> np.ndarray:
+    """
+    Sample a matplotlib colormap into a 256x4 lookup table.
+    """
+    if isinstance(colormap, _MPLListedColormap):
+        colormap = _MPLLinearSegmentedColormap.from_list("", colormap.colors, N=256)
+    return np.asarray(colormap(range(256), 1, 1), dtype=np.uint8)
+
+
+@lru_cache(maxsize=256)
+def _compile_colormap_str(colormap: str) -> np.ndarray:
+    registered = get_registered_colormap(colormap)
+    if registered is not None:
+        lut = _lut_from_dict(registered)
+    elif colormap in RIO_CMAPS.list():
+        lut = _lut_from_dict(RIO_CMAPS.get(colormap))
+    else:
+        c = json.loads(colormap)
+        if isinstance(c, list):
+            if _MPLLinearSegmentedColormap is None:
+                raise ImportError(
+                    "matplotlib is required for list-based colormaps. "
+                    "Install with 'pip install localtileserver[colormaps]'."
+                )
+            lut = _lut_from_mpl(_MPLLinearSegmentedColormap.from_list("", c, N=256))
+        else:
+            lut = _lut_from_dict(c)
+    # Shared between requests
+    lut.flags.writeable = False
+    return lut
+
+
+def compile_colormap(colormap) -> np.ndarray | None:
+    """
+    Compile a colormap into a 256x4 ``uint8`` RGBA lookup table.
+
+    Compiled tables for string colormaps are cached, so resolving the same
+    colormap for every tile costs a dictionary lookup.
+
+    Parameters
+    ----------
+    colormap : str or matplotlib.colors.Colormap
+        A rio-tiler colormap name, a ``custom:<hash>`` registry key (see
+        :func:`register_colormap`), a JSON ``{value: [r, g, b, a]}`` dict,
+        a JSON list of matplotlib colors, or a matplotlib ``Colormap``.
+
+    Returns
+    -------
+    numpy.ndarray or None
+        Read-only array of shape ``(256, 4)`` where row ``i`` is the color
+        of value ``i``, or ``None`` if *colormap* is empty.
+
+    Raises
+    ------
+    ValueError
+        If a ``{value: color}`` colormap has keys outside 0-255.
+    """
+    if not colormap:
+        return None
+    if _MPLColormap is not None and isinstance(colormap, _MPLColormap):
+        return _lut_from_mpl(colormap)
+    return _compile_colormap_str(colormap)
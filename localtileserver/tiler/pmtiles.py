@@ -0,0 +1,488 @@
+"""
+Read and write tiles in PMTiles version 3 archives.
+
+PMTiles stores a tile pyramid in a single file addressed by offsets, so a
+tile is found with a directory lookup and read with one ``pread``. See
+https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import struct
+import tempfile
+import threading
+
+_MAGIC = b"PMTiles"
+_HEADER = struct.Struct("<7sBQQQQQQQQQQQBBBBBBiiiiBii")
+_HEADER_SIZE = 127
+# Root directory and header must fit in the first 16 KiB
+_ROOT_BUDGET = 16384 - _HEADER_SIZE
+
+_COMPRESSION_NONE = 1
+_COMPRESSION_GZIP = 2
+
+# PMTiles tile type codes
+PMTILES_TILE_TYPES = {"PNG": 2, "JPEG": 3, "WEBP": 4}
+
+
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """
+    Return the PMTiles ID of a tile: its position on a Hilbert curve.
+
+    Parameters
+    ----------
+    z, x, y : int
+        XYZ tile coordinates.
+
+    Returns
+    -------
+    int
+        The tile ID.
+    """
+    tile_id = ((1 << (2 * z)) - 1) // 3
+    s = 1 << z >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        tile_id += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return tile_id
+
+
+def tileid_to_zxy(tile_id: int) -> tuple[int, int, int]:
+    """
+    Return the XYZ coordinates of a PMTiles tile ID.
+
+    Parameters
+    ----------
+    tile_id : int
+        The tile ID.
+
+    Returns
+    -------
+    tuple of int
+        ``(z, x, y)`` coordinates.
+    """
+    z = 0
+    acc = 0
+    while acc + (1 << (2 * z)) <= tile_id:
+        acc += 1 << (2 * z)
+        z += 1
+    t = tile_id - acc
+    x = y = 0
+    s = 1
+    while s < (1 << z):
+        rx = 1 & (t // 2)
+        ry = 1 & (t ^ rx)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        x += s * rx
+        y += s * ry
+        t //= 4
+        s *= 2
+    return z, x, y
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    tile_id: int
+    offset: int
+    length: int
+    # Number of consecutive IDs sharing the tile; 0 points at a leaf directory
+    run_length: int
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _serialize_directory(entries: list[_Entry]) -> bytes:
+    out = bytearray()
+    _write_varint(out, len(entries))
+    last_id = 0
+    for entry in entries:
+        _write_varint(out, entry.tile_id - last_id)
+        last_id = entry.tile_id
+    for entry in entries:
+        _write_varint(out, entry.run_length)
+    for entry in entries:
+        _write_varint(out, entry.length)
+    for i, entry in enumerate(entries):
+        previous = entries[i - 1] if i else None
+        if previous is not None and entry.offset == previous.offset + previous.length:
+            _write_varint(out, 0)
+        else:
+            _write_varint(out, entry.offset + 1)
+    return gzip.compress(bytes(out), mtime=0)
+
+
+def _deserialize_directory(data: bytes) -> list[_Entry]:
+    data = gzip.decompress(data)
+    count, pos = _read_varint(data, 0)
+    tile_ids = []
+    last_id = 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        last_id += delta
+        tile_ids.append(last_id)
+    run_lengths = []
+    for _ in range(count):
+        value, pos = _read_varint(data, pos)
+        run_lengths.append(value)
+    lengths = []
+    for _ in range(count):
+        value, pos = _read_varint(data, pos)
+        lengths.append(value)
+    entries = []
+    for i in range(count):
+        value, pos = _read_varint(data, pos)
+        if value == 0 and i > 0:
+            offset = entries[i - 1].offset + entries[i - 1].length
+        else:
+            offset = value - 1
+        entries.append(_Entry(tile_ids[i], offset, lengths[i], run_lengths[i]))
+    return entries
+
+
+def _build_directories(entries: list[_Entry]) -> tuple[bytes, bytes]:
+    """
+    Return the root directory and the leaf directories for *entries*.
+    """
+    root = _serialize_directory(entries)
+    if len(root) <= _ROOT_BUDGET:
+        return root, b""
+    leaf_size = 4096
+    while True:
+        leaves = bytearray()
+        root_entries = []
+        for start in range(0, len(entries), leaf_size):
+            chunk = entries[start : start + leaf_size]
+            leaf = _serialize_directory(chunk)
+            root_entries.append(_Entry(chunk[0].tile_id, len(leaves), len(leaf), 0))
+            leaves += leaf
+        root = _serialize_directory(root_entries)
+        if len(root) <= _ROOT_BUDGET:
+            return root, bytes(leaves)
+        leaf_size *= 2
+
+
+def _e7(value: float) -> int:
+    return round(value * 10_000_000)
+
+
+class PMTilesWriter:
+    """
+    Write a PMTiles archive, storing identical tiles only once.
+
+    Tiles may be added in any order. Their contents are spooled to a
+    temporary file next to *path* and the archive is assembled, with the
+    tile data clustered in tile ID order, when :meth:`close` is called.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Location of the archive. Replaced if it exists.
+    img_format : {"PNG", "JPEG", "WEBP"}
+        Encoding of the tiles.
+    """
+
+    def __init__(self, path: pathlib.Path | str, img_format: str):
+        img_format = img_format.upper()
+        if img_format not in PMTILES_TILE_TYPES:
+            raise ValueError(f"PMTiles supports {list(PMTILES_TILE_TYPES)}, not {img_format}.")
+        self.path = pathlib.Path(path)
+        self.img_format = img_format
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._spool = tempfile.TemporaryFile(dir=self.path.parent)
+        self._contents: dict[bytes, tuple[int, int]] = {}
+        self._tiles: dict[int, bytes] = {}
+        self._spooled = 0
+
+    def __enter__(self) -> PMTilesWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def put_tile(self, z: int, x: int, y: int, data: bytes):
+        """
+        Add an encoded tile.
+
+        Parameters
+        ----------
+        z, x, y : int
+            XYZ tile coordinates.
+        data : bytes
+            The encoded tile.
+        """
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest not in self._contents:
+            self._spool.write(data)
+            self._contents[digest] = (self._spooled, len(data))
+            self._spooled += len(data)
+        self._tiles[zxy_to_tileid(z, x, y)] = digest
+
+    def abort(self):
+        """
+        Discard the added tiles without writing the archive.
+        """
+        self._spool.close()
+
+    def close(
+        self,
+        bounds: tuple[float, float, float, float] = (-180.0, -85.0511, 180.0, 85.0511),
+        metadata: dict | None = None,
+        minzoom: int | None = None,
+        maxzoom: int | None = None,
+    ):
+        """
+        Assemble the archive.
+
+        Parameters
+        ----------
+        bounds : tuple of float, optional
+            ``(west, south, east, north)`` in EPSG:4326. Defaults to the
+            whole Web Mercator world.
+        metadata : dict, optional
+            JSON metadata to store in the archive.
+        minzoom, maxzoom : int, optional
+            Zoom range of the archive. Default to the zoom levels of the
+            added tiles.
+        """
+        entries: list[_Entry] = []
+        order: list[bytes] = []
+        placed: dict[bytes, tuple[int, int]] = {}
+        offset = 0
+        for tile_id in sorted(self._tiles):
+            digest = self._tiles[tile_id]
+            if digest not in placed:
+                length = self._contents[digest][1]
+                placed[digest] = (offset, length)
+                order.append(digest)
+                offset += length
+            tile_offset, length = placed[digest]
+            last = entries[-1] if entries else None
+            if (
+                last is not None
+                and last.offset == tile_offset
+                and last.tile_id + last.run_length == tile_id
+            ):
+                entries[-1] = _Entry(last.tile_id, last.offset, last.length, last.run_length + 1)
+            else:
+                entries.append(_Entry(tile_id, tile_offset, length, 1))
+        root, leaves = _build_directories(entries)
+        meta = gzip.compress(json.dumps(metadata or {}).encode(), mtime=0)
+        zooms = [0, 0]
+        if self._tiles:
+            zooms = [tileid_to_zxy(min(self._tiles))[0], tileid_to_zxy(max(self._tiles))[0]]
+        if minzoom is not None:
+            zooms[0] = minzoom
+        if maxzoom is not None:
+            zooms[1] = maxzoom
+        west, south, east, north = bounds
+        root_offset = _HEADER_SIZE
+        meta_offset = root_offset + len(root)
+        leaf_offset = meta_offset + len(meta)
+        data_offset = leaf_offset + len(leaves)
+        header = _HEADER.pack(
+            _MAGIC,
+            3,
+            root_offset,
+            len(root),
+            meta_offset,
+            len(meta),
+            leaf_offset,
+            len(leaves),
+            data_offset,
+            offset,
+            len(self._tiles),
+            len(entries),
+            len(order),
+            1,
+            _COMPRESSION_GZIP,
+            _COMPRESSION_NONE,
+            PMTILES_TILE_TYPES[self.img_format],
+            zooms[0],
+            zooms[1],
+            _e7(west),
+            _e7(south),
+            _e7(east),
+            _e7(north),
+            zooms[0],
+            _e7((west + east) / 2),
+            _e7((south + north) / 2),
+        )
+        partial = self.path.with_name(self.path.name + ".partial")
+        with open(partial, "wb") as f:
+            f.write(header)
+            f.write(root)
+            f.write(meta)
+            f.write(leaves)
+            for digest in order:
+                spool_offset, length = self._contents[digest]
+                self._spool.seek(spool_offset)
+                f.write(self._spool.read(length))
+        self._spool.close()
+        os.replace(partial, self.path)
+
+
+class PMTiles:
+    """
+    Read-only, thread-safe access to a PMTiles archive.
+
+    The file is memory-mapped. The root directory is parsed on open and
+    leaf directories are parsed once and kept, so a tile lookup is a
+    binary search followed by a slice of the mapping.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        Location of the archive.
+    """
+
+    def __init__(self, path: pathlib.Path | str):
+        self.path = pathlib.Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER_SIZE or self._mmap[:7] != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a PMTiles archive.")
+        fields = _HEADER.unpack_from(self._mmap, 0)
+        if fields[1] != 3:
+            self._mmap.close()
+            raise ValueError(f"PMTiles version {fields[1]} is not supported.")
+        (
+            self._root_offset,
+            self._root_length,
+            self._meta_offset,
+            self._meta_length,
+            self._leaf_offset,
+            self._leaf_length,
+            self._data_offset,
+        ) = fields[2:9]
+        if fields[14] != _COMPRESSION_GZIP or fields[15] != _COMPRESSION_NONE:
+            self._mmap.close()
+            raise ValueError("Only gzip directories and uncompressed tiles are supported.")
+        self.tile_type = fields[16]
+        self.minzoom, self.maxzoom = fields[17], fields[18]
+        self.bounds = tuple(v / 10_000_000 for v in fields[19:23])
+        self.center = (fields[24] / 10_000_000, fields[25] / 10_000_000, fields[23])
+        self._root = self._directory(self._root_offset, self._root_length)
+        self._leaves: dict[int, tuple[list[int], list[_Entry]]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> PMTiles:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _directory(self, offset: int, length: int) -> tuple[list[int], list[_Entry]]:
+        entries = _deserialize_directory(self._mmap[offset : offset + length])
+        return [entry.tile_id for entry in entries], entries
+
+    def _leaf(self, entry: _Entry) -> tuple[list[int], list[_Entry]]:
+        leaf = self._leaves.get(entry.offset)
+        if leaf is None:
+            leaf = self._directory(self._leaf_offset + entry.offset, entry.length)
+            with self._lock:
+                self._leaves[entry.offset] = leaf
+        return leaf
+
+    @property
+    def img_format(self) -> str | None:
+        """
+        Return the tile encoding, e.g. ``"PNG"``.
+
+        Returns
+        -------
+        str or None
+            The encoding, or ``None`` for tile types other than images.
+        """
+        for name, code in PMTILES_TILE_TYPES.items():
+            if code == self.tile_type:
+                return name
+        return None
+
+    @property
+    def metadata(self) -> dict:
+        """
+        Return the JSON metadata of the archive.
+
+        Returns
+        -------
+        dict
+            The decoded metadata.
+        """
+        raw = self._mmap[self._meta_offset : self._meta_offset + self._meta_length]
+        return json.loads(gzip.decompress(raw)) if raw else {}
+
+    def get_tile(self, z: int, x: int, y: int) -> bytes | None:
+        """
+        Return the encoded tile at ``z/x/y``, or ``None`` when missing.
+
+        Parameters
+        ----------
+        z, x, y : int
+            XYZ tile coordinates.
+
+        Returns
+        -------
+        bytes or None
+            The stored tile.
+        """
+        tile_id = zxy_to_tileid(z, x, y)
+        tile_ids, entries = self._root
+        # Root and leaf directories nest at most a few levels deep
+        for _ in range(4):
+            i = bisect_right(tile_ids, tile_id) - 1
+            if i < 0:
+                return None
+            entry = entries[i]
+            if entry.run_length == 0:
+                tile_ids, entries = self._leaf(entry)
+                continue
+            if tile_id >= entry.tile_id + entry.run_length:
+                return None
+            start = self._data_offset + entry.offset
+            return self._mmap[start : start + entry.length]
+        return None
+
+    def close(self):
+        """
+        Unmap the archive.
+        """
+        self._mmap.close()
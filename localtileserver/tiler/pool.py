@@ -0,0 +1,318 @@
+"""
+Process-wide pool of reusable rio-tiler dataset handles.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import logging
+import pathlib
+import threading
+import time
+
+from rasterio import RasterioIOError
+from rio_tiler.io import Reader
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetPool:
+    """
+    Thread-safe pool of open ``Reader`` handles keyed by cleaned path and version.
+
+    Opening a dataset is expensive: GDAL has to open the file and, for
+    ``/vsicurl`` sources, fetch and parse the COG header over the network.
+    The pool keeps already-open handles around so that later requests for
+    the same dataset can reuse them.
+
+    rasterio dataset handles are not thread-safe, so a handle is checked
+    out exclusively by one thread at a time and concurrent requests for the
+    same dataset each get their own handle. Idle handles are closed once
+    they have not been used for ``idle_timeout`` seconds, or when the pool
+    needs room for a new handle. Handles are also keyed by the dataset
+    version (see :func:`localtileserver.tiler.utilities.get_dataset_version`),
+    so a checkout for a rewritten file closes the idle handles of its
+    earlier versions instead of reusing them.
+
+    Parameters
+    ----------
+    max_open : int, optional
+        Maximum number of open handles across all datasets. When the pool
+        is full the least recently used idle handle is closed to make
+        room. Handles that are checked out are never closed, so the pool
+        may temporarily exceed this limit under heavy concurrency.
+        Defaults to ``64``.
+    idle_timeout : float, optional
+        Seconds after which an unused handle is closed. Defaults to
+        ``300``.
+    """
+
+    def __init__(self, max_open: int = 64, idle_timeout: float = 300.0):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        # Idle handles per dataset, most recently returned last
+        self._idle: dict[tuple[str, str | None], list[tuple[float, Reader]]] = {}
+        self._in_use = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _key(path: pathlib.Path | str, version: str | None) -> tuple[str, str | None]:
+        return str(path), version
+
+    def checkout(
+        self,
+        path: pathlib.Path | str,
+        opener: Callable[[pathlib.Path | str], Reader] | None = None,
+        version: str | None = None,
+    ) -> Reader:
+        """
+        Take an open handle for *path* out of the pool.
+
+        The handle belongs to the caller until it is given back with
+        :meth:`checkin`.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Cleaned path of the dataset (see
+            :func:`localtileserver.tiler.utilities.get_clean_filename`).
+        opener : callable, optional
+            Function used to open a new handle on a pool miss. Defaults to
+            ``rio_tiler.io.Reader``.
+        version : str, optional
+            Version token of the dataset. Idle handles of other known
+            versions of *path* are closed.
+
+        Returns
+        -------
+        Reader
+            An open rio-tiler ``Reader`` for *path*.
+        """
+        key = self._key(path, version)
+        with self._lock:
+            self._expire_idle()
+            self._drop_stale(key)
+            handles = self._idle.get(key)
+            if handles:
+                _, reader = handles.pop()
+                if not handles:
+                    del self._idle[key]
+                self._hits += 1
+                self._in_use += 1
+                return reader
+            self._misses += 1
+            # Make room before opening so the file descriptor limit holds
+            while self._open_count() >= self.max_open and self._evict_one():
+                pass
+        # Open outside of the lock so slow remote opens do not serialize
+        reader = (opener or Reader)(path)
+        with self._lock:
+            self._in_use += 1
+        return reader
+
+    def checkin(
+        self,
+        path: pathlib.Path | str,
+        reader: Reader,
+        discard: bool = False,
+        version: str | None = None,
+    ):
+        """
+        Give a handle obtained from :meth:`checkout` back to the pool.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            The path the handle was checked out for.
+        reader : Reader
+            The handle to return.
+        discard : bool, optional
+            If ``True``, close the handle instead of keeping it for reuse.
+            Use this when the handle may be in a bad state (e.g. after an
+            I/O error).
+        version : str, optional
+            The version the handle was checked out for.
+        """
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._close(reader)
+                return
+            self._idle.setdefault(self._key(path, version), []).append((time.monotonic(), reader))
+            while self._open_count() > self.max_open and self._evict_one():
+                pass
+
+    @contextmanager
+    def reader(
+        self,
+        path: pathlib.Path | str,
+        opener: Callable[[pathlib.Path | str], Reader] | None = None,
+        version: str | None = None,
+    ) -> Iterator[Reader]:
+        """
+        Context manager that checks a handle out and back in.
+
+        Parameters
+        ----------
+        path : pathlib.Path or str
+            Cleaned path of the dataset.
+        opener : callable, optional
+            Function used to open a new handle on a pool miss.
+        version : str, optional
+            Version token of the dataset.
+
+        Yields
+        ------
+        Reader
+            An open rio-tiler ``Reader`` for *path*.
+        """
+        reader = self.checkout(path, opener=opener, version=version)
+        discard = False
+        try:
+            yield reader
+        except RasterioIOError:
+            # The handle may be broken, do not hand it out again
+            discard = True
+            raise
+        finally:
+            self.checkin(path, reader, discard=discard, version=version)
+
+    def clear(self):
+        """
+        Close all idle handles and reset the counters.
+        """
+        with self._lock:
+            for handles in self._idle.values():
+                for _, reader in handles:
+                    self._close(reader)
+            self._idle.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return pool usage counters.
+
+        Returns
+        -------
+        dict
+            Dictionary with ``hits``, ``misses``, ``evictions``, ``open``,
+            ``idle`` and ``in_use`` counts.
+        """
+        with self._lock:
+            idle = sum(len(h) for h in self._idle.values())
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "open": idle + self._in_use,
+                "idle": idle,
+                "in_use": self._in_use,
+            }
+
+    def _open_count(self) -> int:
+        return self._in_use + sum(len(h) for h in self._idle.values())
+
+    def _evict_one(self) -> bool:
+        """
+        Close the least recently used idle handle. Caller holds the lock.
+        """
+        oldest_key = None
+        oldest_time = None
+        for key, handles in self._idle.items():
+            # Each list is ordered by return time, so index 0 is the oldest
+            if oldest_time is None or handles[0][0] < oldest_time:
+                oldest_key, oldest_time = key, handles[0][0]
+        if oldest_key is None:
+            return False
+        handles = self._idle[oldest_key]
+        _, reader = handles.pop(0)
+        if not handles:
+            del self._idle[oldest_key]
+        self._close(reader)
+        self._evictions += 1
+        return True
+
+    def _drop_stale(self, key: tuple[str, str | None]):
+        """
+        Close idle handles of other versions of a dataset. Caller holds the lock.
+
+        Handles checked out without a version are never stale, and a
+        checkout without a version drops nothing.
+        """
+        if key[1] is None:
+            return
+        stale = [k for k in self._idle if k[0] == key[0] and k[1] not in (None, key[1])]
+        for other in stale:
+            for _, reader in self._idle.pop(other):
+                self._close(reader)
+                self._evictions += 1
+
+    def _expire_idle(self):
+        """
+        Close handles idle for longer than ``idle_timeout``. Caller holds the lock.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            handles = self._idle[key]
+            while handles and handles[0][0] < cutoff:
+                _, reader = handles.pop(0)
+                self._close(reader)
+                self._evictions += 1
+            if not handles:
+                del self._idle[key]
+
+    @staticmethod
+    def _close(reader: Reader):
+        try:
+            reader.close()
+        except Exception as e:  # pragma: no cover
+            logger.debug("Failed to close pooled dataset %s: %s", reader.input, e)
+
+
+_DATASET_POOL: DatasetPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_dataset_pool() -> DatasetPool:
+    """
+    Return the process-wide dataset pool, creating it if necessary.
+
+    Returns
+    -------
+    DatasetPool
+        The shared pool used by the tile server endpoints.
+    """
+    global _DATASET_POOL
+    with _POOL_LOCK:
+        if _DATASET_POOL is None:
+            _DATASET_POOL = DatasetPool()
+        return _DATASET_POOL
+
+
+def configure_dataset_pool(max_open: int | None = None, idle_timeout: float | None = None):
+    """
+    Adjust the limits of the process-wide dataset pool.
+
+    Parameters
+    ----------
+    max_open : int, optional
+        Maximum number of open handles across all datasets.
+    idle_timeout : float, optional
+        Seconds after which an unused handle is closed.
+
+    Returns
+    -------
+    DatasetPool
+        The shared pool.
+    """
+    pool = get_dataset_pool()
+    with pool._lock:
+        if max_open is not None:
+            pool.max_open = max_open
+        if idle_timeout is not None:
+            pool.idle_timeout = idle_timeout
+    return pool
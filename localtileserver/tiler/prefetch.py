@@ -0,0 +1,245 @@
+"""
+Background prefetching of the tiles a map is likely to request next.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds an idle worker waits for new work before exiting
+_IDLE_TIMEOUT = 30.0
+
+
+def prefetch_candidates(z: int, x: int, y: int, depth: int = 1) -> list[tuple[int, int, int]]:
+    """
+    List the tiles likely to be requested after a tile.
+
+    Parameters
+    ----------
+    z, x, y : int
+        The requested tile.
+    depth : int, optional
+        Radius of the ring of neighbours at the same zoom and number of
+        zoom levels of children. Defaults to ``1``: the eight neighbours
+        and the four children.
+
+    Returns
+    -------
+    list of tuple of int
+        ``(z, x, y)`` tiles, nearest neighbours first and children last,
+        clipped to the tile matrix.
+    """
+    n = 2**z
+    ring = [
+        (z, x + dx, y + dy)
+        for dx in range(-depth, depth + 1)
+        for dy in range(-depth, depth + 1)
+        if (dx or dy) and 0 <= x + dx < n and 0 <= y + dy < n
+    ]
+    ring.sort(key=lambda tile: max(abs(tile[1] - x), abs(tile[2] - y)))
+    children = []
+    for level in range(1, depth + 1):
+        scale = 2**level
+        children.extend(
+            (z + level, x * scale + dx, y * scale + dy)
+            for dy in range(scale)
+            for dx in range(scale)
+        )
+    return ring + children
+
+
+class TilePrefetcher:
+    """
+    Render likely next tiles into the tile caches in the background.
+
+    Work is dropped rather than allowed to compete with interactive
+    requests: the queue is bounded and discards its oldest entries when
+    full, workers wait while any request wrapped in :meth:`foreground` is
+    running, and after each render a worker pauses so that prefetching
+    uses at most *cpu_share* of its thread's time.
+
+    Parameters
+    ----------
+    depth : int, optional
+        Passed to :func:`prefetch_candidates`. Defaults to ``1``.
+    max_queue : int, optional
+        Maximum number of queued tiles. Defaults to ``256``.
+    workers : int, optional
+        Number of background threads. Defaults to ``1``.
+    cpu_share : float, optional
+        Fraction of each worker's time spent rendering, in ``(0, 1]``.
+        Defaults to ``0.25``.
+    """
+
+    def __init__(
+        self,
+        depth: int = 1,
+        max_queue: int = 256,
+        workers: int = 1,
+        cpu_share: float = 0.25,
+    ):
+        if depth < 1:
+            raise ValueError("depth must be at least 1.")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1.")
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        if not 0 < cpu_share <= 1:
+            raise ValueError("cpu_share must be in (0, 1].")
+        self.depth = depth
+        self.max_queue = max_queue
+        self.workers = workers
+        self.cpu_share = cpu_share
+        self._cond = threading.Condition()
+        self._queue: deque[tuple[Hashable, tuple[int, int, int], Callable]] = deque()
+        self._pending: set[Hashable] = set()
+        self._running = 0
+        self._active = 0
+        self._closed = False
+        self._scheduled = 0
+        self._completed = 0
+        self._dropped = 0
+        self._failed = 0
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """
+        Mark an interactive request; prefetching waits until it finishes.
+        """
+        with self._cond:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def schedule(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        render: Callable[[int, int, int], object],
+        key: Callable[[int, int, int], Hashable] | None = None,
+    ) -> int:
+        """
+        Queue the likely next tiles after ``(z, x, y)``.
+
+        Parameters
+        ----------
+        z, x, y : int
+            The tile that was just requested.
+        render : callable
+            Called as ``render(z, x, y)`` on a worker thread. It is
+            expected to store the tile in the tile caches, and to return
+            quickly if it is already cached.
+        key : callable, optional
+            Called as ``key(z, x, y)`` to identify a tile, so that a tile
+            already in the queue is not queued twice. Defaults to the
+            tile coordinates.
+
+        Returns
+        -------
+        int
+            Number of newly queued tiles.
+        """
+        key = key or (lambda *tile: tile)
+        queued = 0
+        with self._cond:
+            if self._closed:
+                return 0
+            for tile in prefetch_candidates(z, x, y, self.depth):
+                tile_key = key(*tile)
+                if tile_key in self._pending:
+                    continue
+                if len(self._queue) >= self.max_queue:
+                    # The newest viewport matters most
+                    old_key, _, _ = self._queue.popleft()
+                    self._pending.discard(old_key)
+                    self._dropped += 1
+                self._queue.append((tile_key, tile, render))
+                self._pending.add(tile_key)
+                queued += 1
+            self._scheduled += queued
+            while queued and self._running < min(self.workers, len(self._queue)):
+                self._running += 1
+                threading.Thread(target=self._work, name="tile-prefetch", daemon=True).start()
+            self._cond.notify_all()
+        return queued
+
+    def _next(self) -> tuple[Hashable, tuple[int, int, int], Callable] | None:
+        """
+        Wait for a job while no interactive request runs, or ``None`` to exit.
+        """
+        with self._cond:
+            deadline = time.monotonic() + _IDLE_TIMEOUT
+            while not self._closed and (self._active or not self._queue):
+                if not self._queue and time.monotonic() >= deadline:
+                    break
+                self._cond.wait(timeout=1.0)
+            if self._closed or not self._queue:
+                self._running -= 1
+                return None
+            return self._queue.popleft()
+
+    def _work(self):
+        while (job := self._next()) is not None:
+            tile_key, tile, render = job
+            start = time.perf_counter()
+            try:
+                render(*tile)
+            except Exception as e:
+                # Tiles outside the dataset are expected among the candidates
+                logger.debug("Prefetch of tile %s failed: %s", tile, e)
+                failed = True
+            else:
+                failed = False
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self._pending.discard(tile_key)
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                # Keep rendering to the configured share of this thread's time
+                pause = elapsed * (1 - self.cpu_share) / self.cpu_share
+                if pause > 0:
+                    self._cond.wait_for(lambda: self._closed, timeout=pause)
+
+    def close(self):
+        """
+        Drop queued tiles and stop the workers after their current render.
+        """
+        with self._cond:
+            self._closed = True
+            self._dropped += len(self._queue)
+            self._queue.clear()
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """
+        Return prefetch counters.
+
+        Returns
+        -------
+        dict
+            Dictionary with ``scheduled``, ``completed``, ``failed``,
+            ``dropped`` and ``queued`` counts.
+        """
+        with self._cond:
+            return {
+                "scheduled": self._scheduled,
+                "completed": self._completed,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "queued": len(self._queue),
+            }
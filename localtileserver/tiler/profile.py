@@ -0,0 +1,154 @@
+"""
+Compact, memoized description of a raster dataset.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+
+from rasterio.crs import CRS
+from rasterio.enums import ColorInterp
+from rasterio.warp import transform_bounds
+from rio_tiler.io import Reader
+
+from .cache import dataset_identity
+
+_WGS84 = CRS.from_epsg(4326)
+
+
+@dataclass(frozen=True, slots=True)
+class DatasetProfile:
+    """
+    Immutable summary of the dataset properties used while rendering.
+
+    Build instances with :func:`get_dataset_profile`, which computes the
+    profile once per dataset version instead of on every request.
+
+    Attributes
+    ----------
+    path : str
+        Path of the dataset.
+    version : str
+        Version token from
+        :func:`localtileserver.tiler.utilities.get_dataset_version`.
+    count : int
+        Number of bands.
+    width, height : int
+        Raster size in pixels.
+    dtypes : tuple of str
+        Data type of each band.
+    colorinterp : tuple of rasterio.enums.ColorInterp
+        Color interpretation of each band.
+    descriptions : tuple of str or None
+        Description of each band as stored in the dataset.
+    band_names : tuple of str
+        Band names as reported by rio-tiler (``b1``, ``b2``, ...).
+    nodata : float or None
+        Nodata value of the dataset.
+    crs : rasterio.crs.CRS or None
+        Native CRS of the dataset.
+    bounds : tuple of float
+        ``(left, bottom, right, top)`` in the native CRS.
+    geographic_bounds : tuple of float
+        ``(left, bottom, right, top)`` in EPSG:4326. The whole world for
+        datasets without a CRS.
+    minzoom, maxzoom : int
+        Web Mercator zoom range of the dataset.
+    overviews : tuple of int
+        Overview decimation factors of the first band.
+    """
+
+    path: str
+    version: str
+    count: int
+    width: int
+    height: int
+    dtypes: tuple[str, ...]
+    colorinterp: tuple[ColorInterp, ...]
+    descriptions: tuple[str | None, ...]
+    band_names: tuple[str, ...]
+    nodata: float | None
+    crs: CRS | None
+    bounds: tuple[float, float, float, float]
+    geographic_bounds: tuple[float, float, float, float]
+    minzoom: int
+    maxzoom: int
+    overviews: tuple[int, ...]
+
+
+_PROFILES: OrderedDict[tuple[str, str], DatasetProfile] = OrderedDict()
+_PROFILES_LOCK = threading.Lock()
+_MAX_PROFILES = 256
+
+
+def _build_profile(tile_source: Reader, path: str, version: str) -> DatasetProfile:
+    # Deferred import: archives build their profiles with DatasetProfile
+    from .archive import TileArchive
+
+    if isinstance(tile_source, TileArchive):
+        return tile_source.dataset_profile(version)
+    dataset = tile_source.dataset
+    crs = dataset.crs or None
+    bounds = tuple(dataset.bounds)
+    if crs:
+        geographic_bounds = tuple(transform_bounds(crs, _WGS84, *bounds))
+    else:
+        geographic_bounds = (-180.0, -90.0, 180.0, 90.0)
+    info = tile_source.info()
+    return DatasetProfile(
+        path=path,
+        version=version,
+        count=dataset.count,
+        width=dataset.width,
+        height=dataset.height,
+        dtypes=tuple(dataset.dtypes),
+        colorinterp=tuple(dataset.colorinterp),
+        descriptions=tuple(dataset.descriptions),
+        band_names=tuple(desc[0] for desc in info.band_descriptions),
+        nodata=dataset.nodata,
+        crs=crs,
+        bounds=bounds,
+        geographic_bounds=geographic_bounds,
+        minzoom=tile_source.minzoom,
+        maxzoom=tile_source.maxzoom,
+        overviews=tuple(dataset.overviews(1)) if dataset.count else (),
+    )
+
+
+def get_dataset_profile(tile_source: Reader) -> DatasetProfile:
+    """
+    Return the profile of a dataset, computing it once per version.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for the raster dataset.
+
+    Returns
+    -------
+    DatasetProfile
+        The shared, immutable profile of the dataset.
+    """
+    key = dataset_identity(tile_source)
+    with _PROFILES_LOCK:
+        profile = _PROFILES.get(key)
+        if profile is not None:
+            _PROFILES.move_to_end(key)
+            return profile
+    # Concurrent first requests may both build it; the result is identical
+    profile = _build_profile(tile_source, *key)
+    with _PROFILES_LOCK:
+        _PROFILES[key] = profile
+        while len(_PROFILES) > _MAX_PROFILES:
+            _PROFILES.popitem(last=False)
+    return profile
+
+
+def clear_dataset_profiles():
+    """
+    Forget all memoized dataset profiles.
+    """
+    with _PROFILES_LOCK:
+        _PROFILES.clear()
@@ -0,0 +1,272 @@
+"""
+Pre-render a tile pyramid into an MBTiles archive.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+import json
+import multiprocessing
+import os
+import pathlib
+import time
+
+from rio_tiler.errors import TileOutsideBounds
+
+from .cache import get_statistics_cache
+from .handler import _warm_statistics, get_empty_tile, get_reader, get_tile
+from .mbtiles import MBTILES_FORMATS, MBTiles
+from .profile import get_dataset_profile
+from .utilities import get_clean_filename, get_encoder_options
+
+# Tiles sent to a worker process at once
+_CHUNK_SIZE = 32
+# Tiles written per transaction; an interrupted run loses at most this many
+_COMMIT_EVERY = 256
+
+_WORKER_STATE: dict = {}
+
+
+def _init_worker(filename: str, tile_kwargs: dict, statistics: dict | None = None):
+    _WORKER_STATE["reader"] = get_reader(filename)
+    _WORKER_STATE["kwargs"] = tile_kwargs
+    if statistics:
+        # Statistics computed by the parent, so workers do not each recompute them
+        get_statistics_cache().load(statistics)
+
+
+def _render_chunk(tiles: list[tuple[int, int, int]]) -> list[tuple[int, int, int, bytes | None]]:
+    """
+    Render tiles in a worker, with ``None`` for empty or outside tiles.
+    """
+    reader = _WORKER_STATE["reader"]
+    kwargs = _WORKER_STATE["kwargs"]
+    out = []
+    for z, x, y in tiles:
+        try:
+            data = get_tile(reader, z, x, y, **kwargs)
+        except TileOutsideBounds:
+            data = None
+        # Missing tiles read as transparent, so empty tiles are not stored
+        out.append((z, x, y, None if _is_empty(data, kwargs["img_format"]) else bytes(data)))
+    return out
+
+
+def _is_empty(data: bytes | None, img_format: str) -> bool:
+    """
+    Return whether a rendered tile has no valid pixel.
+    """
+    if data is None:
+        return True
+    empty = get_empty_tile(img_format)
+    if img_format.upper() == "JPEG":
+        # No alpha: an opaque black tile encodes like the empty one, so only
+        # the shared image returned for fully masked tiles counts
+        return data is empty
+    return data == empty
+
+
+def _chunks(tiles: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(tiles)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _render_chunks(
+    chunks: Iterator[list],
+    filename: str,
+    tile_kwargs: dict,
+    processes: int,
+    statistics: dict | None = None,
+) -> Iterator[list]:
+    """
+    Yield rendered chunks, in completion order, from a pool of processes.
+    """
+    if processes == 1:
+        _init_worker(filename, tile_kwargs)
+        try:
+            for chunk in chunks:
+                yield _render_chunk(chunk)
+        finally:
+            _WORKER_STATE.pop("reader").close()
+        return
+    # Spawned workers do not inherit open GDAL handles from this process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        processes,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(filename, tile_kwargs, statistics),
+    ) as executor:
+        pending: set[Future] = set()
+        for chunk in chunks:
+            pending.add(executor.submit(_render_chunk, chunk))
+            # Bound the work in flight instead of submitting the whole pyramid
+            if len(pending) >= processes * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def seed_tiles(
+    filename: pathlib.Path | str,
+    path: pathlib.Path | str,
+    minzoom: int | None = None,
+    maxzoom: int | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+    img_format: str = "PNG",
+    processes: int | None = None,
+    overwrite: bool = False,
+    progress: Callable[[int, int], None] | None = None,
+    **style,
+) -> dict:
+    """
+    Render every tile of a zoom range into an MBTiles archive.
+
+    Seeding resumes where an earlier run into the same archive stopped:
+    tiles already in the archive are skipped. Empty tiles and tiles
+    outside the dataset are not stored, so a resumed run checks them
+    again, which is cheap.
+
+    Parameters
+    ----------
+    filename : pathlib.Path or str
+        Path or URL of the raster dataset.
+    path : pathlib.Path or str
+        Location of the MBTiles archive.
+    minzoom, maxzoom : int, optional
+        Zoom range to render. Default to the zoom range of the dataset.
+    bbox : tuple of float, optional
+        ``(west, south, east, north)`` in EPSG:4326 to restrict seeding
+        to. Defaults to the bounds of the dataset.
+    img_format : {"PNG", "JPEG", "WEBP"}, optional
+        Tile format. Defaults to ``"PNG"``.
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs; ``1``
+        renders in the calling process.
+    overwrite : bool, optional
+        Start a new archive even if *path* exists. Defaults to ``False``.
+    progress : callable, optional
+        Called as ``progress(done, total)`` after each rendered chunk,
+        where *total* counts the tiles not yet in the archive.
+    **style
+        Style arguments of :func:`localtileserver.tiler.handler.get_tile`
+        (``indexes``, ``colormap``, ``vmin``, ``vmax``, ``nodata``,
+        ``expression``, ``stretch`` and ``encoder_options``).
+
+    Returns
+    -------
+    dict
+        Counts of ``rendered`` (stored), ``empty`` (empty or outside the
+        dataset) and ``skipped`` (already in the archive) tiles, and the
+        elapsed ``seconds``.
+
+    Raises
+    ------
+    ValueError
+        If the format is not supported by MBTiles, or the archive was
+        seeded from another dataset or with other settings.
+    """
+    start = time.perf_counter()
+    img_format = img_format.upper()
+    if img_format not in MBTILES_FORMATS:
+        raise ValueError(f"MBTiles supports {list(MBTILES_FORMATS)}, not {img_format}.")
+    # Omitted and None style arguments must resume the same archive
+    style = {k: v for k, v in style.items() if v is not None}
+    get_encoder_options(img_format, **style.get("encoder_options", {}))
+    filename = str(get_clean_filename(filename))
+    with get_reader(filename) as reader:
+        profile = get_dataset_profile(reader)
+        tms = reader.tms
+        # Computed once here and shipped to the workers, so all tiles share them
+        _warm_statistics(reader, **{k: v for k, v in style.items() if k != "encoder_options"})
+        statistics = get_statistics_cache().snapshot(reader)
+    minzoom = profile.minzoom if minzoom is None else minzoom
+    maxzoom = profile.maxzoom if maxzoom is None else maxzoom
+    if not 0 <= minzoom <= maxzoom:
+        raise ValueError(f"Invalid zoom range {minzoom}-{maxzoom}.")
+    west, south, east, north = profile.geographic_bounds
+    if bbox is not None:
+        west, south = max(west, bbox[0]), max(south, bbox[1])
+        east, north = min(east, bbox[2]), min(north, bbox[3])
+        if west >= east or south >= north:
+            raise ValueError("bbox does not intersect the dataset.")
+
+    # Settings a resumed run must share with the run that started the archive
+    settings = json.dumps(
+        {"source": filename, "format": img_format, "style": style}, sort_keys=True, default=str
+    )
+    path = pathlib.Path(path)
+    if overwrite:
+        path.unlink(missing_ok=True)
+    zooms = range(minzoom, maxzoom + 1)
+    with MBTiles(path, mode="a") as archive:
+        previous = archive.metadata.get("localtileserver:settings")
+        if previous is not None and previous != settings:
+            raise ValueError(
+                f"{path} was seeded with other settings; pass overwrite=True to start over."
+            )
+        existing = set(archive.tile_coordinates())
+        # A resumed run may extend the zoom range or area of the archive
+        extent = [west, south, east, north, minzoom, maxzoom]
+        if previous is not None:
+            metadata = archive.metadata
+            old = [float(v) for v in metadata["bounds"].split(",")]
+            old += [int(metadata["minzoom"]), int(metadata["maxzoom"])]
+            extent = [
+                min(extent[0], old[0]),
+                min(extent[1], old[1]),
+                max(extent[2], old[2]),
+                max(extent[3], old[3]),
+                min(extent[4], old[4]),
+                max(extent[5], old[5]),
+            ]
+        archive.update_metadata(
+            **{
+                "name": pathlib.Path(filename).stem,
+                "format": MBTILES_FORMATS[img_format],
+                "type": "overlay",
+                "version": "1.1",
+                "bounds": ",".join(str(v) for v in extent[:4]),
+                "center": f"{(extent[0] + extent[2]) / 2},{(extent[1] + extent[3]) / 2},"
+                f"{extent[4]}",
+                "minzoom": extent[4],
+                "maxzoom": extent[5],
+                "localtileserver:settings": settings,
+            }
+        )
+        archive.commit()
+
+        def _tiles():
+            for tile in tms.tiles(west, south, east, north, zooms=zooms, truncate=True):
+                yield tile.z, tile.x, tile.y
+
+        total = sum(1 for tile in _tiles() if tile not in existing)
+        skipped = sum(1 for _ in _tiles()) - total
+        todo = (tile for tile in _tiles() if tile not in existing)
+        processes = max(1, min(processes or os.cpu_count() or 1, -(-total // _CHUNK_SIZE)))
+        tile_kwargs = {"img_format": img_format, **style}
+        done = rendered = uncommitted = 0
+        for results in _render_chunks(
+            _chunks(todo, _CHUNK_SIZE), filename, tile_kwargs, processes, statistics
+        ):
+            stored = [result for result in results if result[3] is not None]
+            archive.put_tiles(stored)
+            rendered += len(stored)
+            done += len(results)
+            uncommitted += len(results)
+            if uncommitted >= _COMMIT_EVERY:
+                archive.commit()
+                uncommitted = 0
+            if progress is not None:
+                progress(done, total)
+    return {
+        "rendered": rendered,
+        "empty": done - rendered,
+        "skipped": skipped,
+        "seconds": time.perf_counter() - start,
+    }
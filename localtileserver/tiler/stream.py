@@ -0,0 +1,459 @@
+"""
+Stream large bounding box extractions in strips of bounded size.
+
+:func:`localtileserver.tiler.handler.get_part` reads and encodes the whole
+output image at once. The functions here read, style and write it in
+horizontal strips instead, so the memory used does not grow with the
+output size.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import itertools
+import os
+import pathlib
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+import rasterio
+from rasterio import windows
+from rasterio.crs import CRS
+from rasterio.enums import ColorInterp
+from rasterio.transform import array_bounds, from_bounds
+from rasterio.warp import transform_bounds
+from rio_tiler.errors import InvalidFormat
+from rio_tiler.expression import parse_expression
+from rio_tiler.io import Reader
+from rio_tiler.reader import output_size
+from rio_tiler.utils import get_vrt_transform
+
+from .handler import (
+    STRETCH_MODES,
+    _handle_vmin_vmax,
+    _style_image,
+    _tile_read_options,
+    _warm_statistics,
+)
+from .profile import get_dataset_profile
+from .utilities import make_crs
+
+STREAM_FORMATS = ("GTIFF", "PNG")
+DEFAULT_CHUNK_BUDGET = 64 * 1024 * 1024
+
+# Block size of the GeoTIFF output; strips span whole rows of blocks
+_BLOCK_SIZE = 512
+# Styled output (up to three bands and alpha), plus the filtered PNG rows
+_OUTPUT_BYTES_PER_PIXEL = 12
+# Size of the pieces a finished GeoTIFF is streamed in
+_READ_SIZE = 1024 * 1024
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG colour types by number of bands, including alpha
+_PNG_COLOR_TYPES = {2: 4, 4: 6}
+
+
+class _PartStrips:
+    """
+    The output grid of a bounding box extraction, read in styled strips.
+
+    Iterating yields ``(row_off, data, mask)`` with the ``uint8`` output
+    bands and alpha mask of consecutive strips from the top of the image.
+    """
+
+    def __init__(
+        self,
+        tile_source: Reader,
+        bbox: tuple[float, float, float, float],
+        indexes: list[int] | None = None,
+        colormap: str | None = None,
+        vmin: float | list[float] | None = None,
+        vmax: float | list[float] | None = None,
+        nodata: int | float | None = None,
+        max_size: int | None = None,
+        dst_crs: str | None = None,
+        bounds_crs: str | None = None,
+        expression: str | None = None,
+        stretch: str | None = None,
+        chunk_budget: int = DEFAULT_CHUNK_BUDGET,
+    ):
+        if chunk_budget <= 0:
+            raise ValueError(f"chunk_budget must be positive, got {chunk_budget}")
+        if stretch and stretch not in STRETCH_MODES:
+            raise ValueError(f"Invalid stretch mode: {stretch!r}. Must be one of {STRETCH_MODES}.")
+        dataset = tile_source.dataset
+        bounds_crs = make_crs(bounds_crs) if bounds_crs else dataset.crs
+        # Like ``Reader.part``, the output defaults to the CRS of the bbox
+        self.crs: CRS = make_crs(dst_crs) if dst_crs else bounds_crs
+        if bounds_crs != self.crs:
+            bbox = transform_bounds(bounds_crs, self.crs, *bbox, densify_pts=21)
+        if self.crs != dataset.crs:
+            vrt_transform, native_width, native_height = get_vrt_transform(
+                dataset, bbox, dst_crs=self.crs
+            )
+            bbox = array_bounds(native_height, native_width, vrt_transform)
+        else:
+            window = windows.from_bounds(*bbox, transform=dataset.transform)
+            native_width, native_height = window.width, window.height
+        self.height, self.width = output_size(
+            dataset_height=native_height, dataset_width=native_width, max_size=max_size
+        )
+        self.bounds = tuple(bbox)
+        self.transform = from_bounds(*self.bounds, self.width, self.height)
+
+        self.tile_source = tile_source
+        self.read_kwargs, self.indexes, self.nodata = _tile_read_options(
+            tile_source, indexes, colormap, nodata, expression
+        )
+        self.style = {
+            "vmin": vmin,
+            "vmax": vmax,
+            "colormap": colormap,
+            "stretch": stretch,
+            "expression": expression,
+        }
+        # Compute the statistics before the first strip so all strips share them
+        _warm_statistics(tile_source, indexes, colormap, vmin, vmax, nodata, expression, stretch)
+        self.strip_height = _strip_height(
+            self.width, self.height, self._bytes_per_pixel(expression), chunk_budget
+        )
+
+    def _bytes_per_pixel(self, expression: str | None) -> int:
+        """
+        Estimate the working memory per output pixel of reading and styling.
+        """
+        profile = get_dataset_profile(self.tile_source)
+        itemsize = max(np.dtype(dtype).itemsize for dtype in profile.dtypes)
+        if expression:
+            bands = len(parse_expression(expression))
+            # Expressions evaluate to float64 outputs
+            outputs = (expression.count(";") + 1) * 9
+        else:
+            bands = len(self.indexes)
+            outputs = bands * 5
+        # Source values and their mask, float32 rescaling and the output
+        return bands * (itemsize + 1) + outputs + _OUTPUT_BYTES_PER_PIXEL
+
+    def __len__(self) -> int:
+        return -(-self.height // self.strip_height)
+
+    def __iter__(self) -> Iterator[tuple[int, np.ndarray, np.ndarray]]:
+        left, _, right, top = self.bounds
+        res_y = (top - self.bounds[1]) / self.height
+        for row_off in range(0, self.height, self.strip_height):
+            rows = min(self.strip_height, self.height - row_off)
+            strip_bbox = (left, top - (row_off + rows) * res_y, right, top - row_off * res_y)
+            img = self.tile_source.part(
+                strip_bbox,
+                dst_crs=self.crs,
+                bounds_crs=self.crs,
+                width=self.width,
+                height=rows,
+                **self.read_kwargs,
+            )
+            indexes = self.indexes or list(range(1, img.count + 1))
+            vmin, vmax = _handle_vmin_vmax(indexes, self.style["vmin"], self.style["vmax"])
+            data, mask = _style_image(
+                self.tile_source,
+                img,
+                indexes,
+                vmin,
+                vmax,
+                colormap=self.style["colormap"],
+                stretch=self.style["stretch"],
+                expression=self.style["expression"],
+                nodata=self.nodata,
+            )
+            yield row_off, data.astype(np.uint8, copy=False), mask.astype(np.uint8, copy=False)
+
+
+def _strip_height(width: int, height: int, bytes_per_pixel: int, chunk_budget: int) -> int:
+    """
+    Return the rows per strip that keep a strip within *chunk_budget* bytes.
+
+    Strips span whole rows of output blocks when the budget allows at
+    least one, otherwise as many rows as fit, with a minimum of one.
+    """
+    rows = chunk_budget // (width * bytes_per_pixel)
+    if rows >= _BLOCK_SIZE:
+        rows -= rows % _BLOCK_SIZE
+    return int(min(height, max(1, rows)))
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)))
+    )
+
+
+def _iter_png(
+    strips: _PartStrips, rendered: Iterator[tuple], compression_level: int | None = None
+) -> Iterator[bytes]:
+    """
+    Encode strips as a PNG, yielding the header and one IDAT chunk per strip.
+
+    Rows use the PNG "up" filter, which compresses smooth images well and
+    needs only the last row of the previous strip.
+    """
+    compressor = zlib.compressobj(6 if compression_level is None else compression_level)
+    previous = None
+    for _, data, mask in rendered:
+        if previous is None:
+            count = data.shape[0] + 1
+            if count not in _PNG_COLOR_TYPES:
+                raise InvalidFormat(f"PNG cannot store {data.shape[0]} bands with alpha")
+            header = struct.pack(
+                ">IIBBBBB", strips.width, strips.height, 8, _PNG_COLOR_TYPES[count], 0, 0, 0
+            )
+            yield _PNG_SIGNATURE + _png_chunk(b"IHDR", header)
+            previous = np.zeros((1, strips.width * count), dtype=np.uint8)
+        # Interleave to (rows, width * bands) scanlines
+        rows = np.concatenate([data, mask[np.newaxis]]).transpose(1, 2, 0)
+        rows = rows.reshape(rows.shape[0], -1)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        np.subtract(rows[:1], previous, out=filtered[:1, 1:])
+        np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+        previous = rows[-1:].copy()
+        compressed = compressor.compress(filtered.data)
+        if compressed:
+            yield _png_chunk(b"IDAT", compressed)
+    yield _png_chunk(b"IDAT", compressor.flush()) + _png_chunk(b"IEND", b"")
+
+
+def _write_gtiff(
+    path: pathlib.Path | str,
+    strips: _PartStrips,
+    rendered: Iterator[tuple],
+    compression_level: int | None = None,
+):
+    """
+    Write strips to a tiled, DEFLATE-compressed GeoTIFF with an alpha band.
+    """
+    profile = {
+        "driver": "GTiff",
+        "dtype": "uint8",
+        "width": strips.width,
+        "height": strips.height,
+        "transform": strips.transform,
+        "tiled": True,
+        "blockxsize": _BLOCK_SIZE,
+        "blockysize": _BLOCK_SIZE,
+        "compress": "DEFLATE",
+        "predictor": 2,
+        "BIGTIFF": "IF_SAFER",
+    }
+    if strips.crs:
+        profile["crs"] = strips.crs
+    if compression_level is not None:
+        profile["zlevel"] = compression_level
+    dst = None
+    try:
+        for row_off, data, mask in rendered:
+            count = data.shape[0]
+            if dst is None:
+                dst = rasterio.open(path, "w", count=count + 1, **profile)
+                dst.colorinterp = *dst.colorinterp[:-1], ColorInterp.alpha
+            window = windows.Window(0, row_off, strips.width, data.shape[1])
+            dst.write(data, indexes=list(range(1, count + 1)), window=window)
+            dst.write(mask, indexes=count + 1, window=window)
+    finally:
+        if dst is not None:
+            dst.close()
+
+
+def _iter_gtiff(
+    strips: _PartStrips, rendered: Iterator[tuple], compression_level: int | None = None
+) -> Iterator[bytes]:
+    """
+    Write strips to a temporary GeoTIFF, then yield the file in pieces.
+
+    TIFF readers need the block offsets written at the end, so the file
+    cannot be sent before it is complete.
+    """
+    fd, path = tempfile.mkstemp(suffix=".tif")
+    os.close(fd)
+    try:
+        _write_gtiff(path, strips, rendered, compression_level)
+        with open(path, "rb") as f:
+            while chunk := f.read(_READ_SIZE):
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+def _check_format(img_format: str) -> str:
+    fmt = img_format.upper()
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"Streaming supports {STREAM_FORMATS}, got {img_format!r}")
+    return fmt
+
+
+def iter_part(
+    tile_source: Reader,
+    bbox: tuple[float, float, float, float],
+    indexes: list[int] | None = None,
+    colormap: str | None = None,
+    vmin: float | list[float] | None = None,
+    vmax: float | list[float] | None = None,
+    nodata: int | float | None = None,
+    img_format: str = "GTIFF",
+    max_size: int | None = None,
+    dst_crs: str | None = None,
+    bounds_crs: str | None = None,
+    expression: str | None = None,
+    stretch: str | None = None,
+    compression_level: int | None = None,
+    chunk_budget: int = DEFAULT_CHUNK_BUDGET,
+) -> Iterator[bytes]:
+    """
+    Extract a bounding box like :func:`~localtileserver.tiler.handler.get_part`, in pieces.
+
+    The output is read and styled in horizontal strips spanning whole
+    rows of 512-pixel blocks, with as many rows as fit in
+    *chunk_budget*. A PNG is yielded as the strips are encoded. A GeoTIFF
+    is tiled and DEFLATE-compressed; it is assembled in a temporary file
+    and yielded once complete. Values are rescaled with dataset-wide
+    statistics, so the strips match.
+
+    The arguments are validated and the first strip is read before this
+    function returns, so errors are raised here rather than while
+    iterating.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for the raster dataset. It must stay
+        open until the iterator is exhausted.
+    bbox : tuple of float
+        Bounding box as ``(left, bottom, right, top)``.
+    indexes : list of int, optional
+        Band indexes to render. Auto-detected when not provided.
+    colormap : str, optional
+        Name of a colormap to apply when rendering a single band.
+    vmin : float or list of float, optional
+        Minimum value(s) for rescaling band data.
+    vmax : float or list of float, optional
+        Maximum value(s) for rescaling band data.
+    nodata : int or float, optional
+        Override nodata value for the dataset.
+    img_format : {"GTIFF", "PNG"}, optional
+        Output format. Defaults to ``"GTIFF"``.
+    max_size : int, optional
+        Maximum dimension of the output image in pixels. Defaults to the
+        native resolution of the dataset.
+    dst_crs : str, optional
+        Target CRS for the output image.
+    bounds_crs : str, optional
+        CRS of the *bbox* coordinates. Defaults to the dataset's
+        native CRS.
+    expression : str, optional
+        Band math expression (e.g., ``"b1/b2"``). When provided,
+        *indexes* is ignored.
+    stretch : str, optional
+        Stretch mode to apply before rendering.
+    compression_level : int, optional
+        Zlib compression level of the output, from ``1`` (fastest) to
+        ``9`` (smallest).
+    chunk_budget : int, optional
+        Approximate number of bytes used to read and style one strip.
+        Defaults to 64 MiB.
+
+    Returns
+    -------
+    iterator of bytes
+        The encoded image, in order.
+
+    Raises
+    ------
+    ValueError
+        If *img_format*, *stretch* or *chunk_budget* is invalid.
+    """
+    fmt = _check_format(img_format)
+    strips = _PartStrips(
+        tile_source,
+        bbox,
+        indexes=indexes,
+        colormap=colormap,
+        vmin=vmin,
+        vmax=vmax,
+        nodata=nodata,
+        max_size=max_size,
+        dst_crs=dst_crs,
+        bounds_crs=bounds_crs,
+        expression=expression,
+        stretch=stretch,
+        chunk_budget=chunk_budget,
+    )
+    rendered = iter(strips)
+    rendered = itertools.chain([next(rendered)], rendered)
+    if fmt == "PNG":
+        return _iter_png(strips, rendered, compression_level)
+    return _iter_gtiff(strips, rendered, compression_level)
+
+
+def write_part(
+    tile_source: Reader,
+    bbox: tuple[float, float, float, float],
+    path: pathlib.Path | str,
+    img_format: str = "GTIFF",
+    compression_level: int | None = None,
+    chunk_budget: int = DEFAULT_CHUNK_BUDGET,
+    **kwargs,
+) -> dict:
+    """
+    Extract a bounding box into a file, writing it strip by strip.
+
+    See :func:`iter_part` for how the image is read and styled. The file
+    is written next to *path* and moved into place once complete.
+
+    Parameters
+    ----------
+    tile_source : Reader
+        An open rio-tiler ``Reader`` for the raster dataset.
+    bbox : tuple of float
+        Bounding box as ``(left, bottom, right, top)``.
+    path : pathlib.Path or str
+        Output file.
+    img_format : {"GTIFF", "PNG"}, optional
+        Output format. Defaults to ``"GTIFF"``.
+    compression_level : int, optional
+        Zlib compression level of the output, from ``1`` to ``9``.
+    chunk_budget : int, optional
+        Approximate number of bytes used to read and style one strip.
+        Defaults to 64 MiB.
+    **kwargs
+        Style and extent arguments of :func:`iter_part` (``indexes``,
+        ``colormap``, ``vmin``, ``vmax``, ``nodata``, ``max_size``,
+        ``dst_crs``, ``bounds_crs``, ``expression``, ``stretch``).
+
+    Returns
+    -------
+    dict
+        The output ``width`` and ``height`` in pixels, the number of
+        ``strips`` and the ``strip_height`` in rows.
+    """
+    fmt = _check_format(img_format)
+    path = pathlib.Path(path)
+    strips = _PartStrips(tile_source, bbox, chunk_budget=chunk_budget, **kwargs)
+    partial = path.with_name(path.name + ".partial")
+    try:
+        if fmt == "PNG":
+            with open(partial, "wb") as f:
+                for chunk in _iter_png(strips, iter(strips), compression_level):
+                    f.write(chunk)
+        else:
+            _write_gtiff(partial, strips, iter(strips), compression_level)
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return {
+        "width": strips.width,
+        "height": strips.height,
+        "strips": len(strips),
+        "strip_height": strips.strip_height,
+    }
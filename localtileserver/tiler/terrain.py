@@ -0,0 +1,136 @@
+"""
+Encode elevation into RGB images for client-side terrain rendering.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+TERRAIN_SCHEMES = ("mapbox", "terrarium")
+
+# Both schemes pack an integer ``(height + offset) * scale`` into 24 bits
+_SCHEME_OFFSET_SCALE = {
+    "mapbox": (10000.0, 10.0),
+    "terrarium": (32768.0, 256.0),
+}
+
+
+def _offset_scale(scheme: str) -> tuple[float, float]:
+    try:
+        return _SCHEME_OFFSET_SCALE[scheme]
+    except KeyError:
+        raise ValueError(
+            f"Terrain scheme {scheme!r} not recognized. Use one of {list(TERRAIN_SCHEMES)}."
+        ) from None
+
+
+def encode_terrain(elevation: np.ndarray, scheme: str = "mapbox") -> np.ndarray:
+    """
+    Encode elevation values as RGB bands.
+
+    Parameters
+    ----------
+    elevation : numpy.ndarray
+        2D array of elevations in meters.
+    scheme : {"mapbox", "terrarium"}, optional
+        ``"mapbox"`` for Mapbox Terrain-RGB, where
+        ``height = -10000 + (R * 65536 + G * 256 + B) * 0.1``, or
+        ``"terrarium"`` for Mapzen Terrarium, where
+        ``height = R * 256 + G + B / 256 - 32768``. Defaults to
+        ``"mapbox"``. Values outside the range of the scheme are clipped
+        and NaN is encoded as the lowest height.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``uint8`` array of shape ``(3, height, width)``.
+    """
+    offset, scale = _offset_scale(scheme)
+    value = (np.asarray(elevation, dtype=np.float64) + offset) * scale
+    np.rint(value, out=value)
+    np.clip(value, 0, 2**24 - 1, out=value)
+    packed = np.nan_to_num(value, nan=0.0, copy=False).astype(np.uint32)
+    rgb = np.empty((3, *packed.shape), dtype=np.uint8)
+    rgb[0] = packed >> 16
+    rgb[1] = (packed >> 8) & 0xFF
+    rgb[2] = packed & 0xFF
+    return rgb
+
+
+def decode_terrain(rgb: np.ndarray, scheme: str = "mapbox") -> np.ndarray:
+    """
+    Decode RGB bands produced by :func:`encode_terrain` into elevations.
+
+    Parameters
+    ----------
+    rgb : numpy.ndarray
+        Array of shape ``(3, height, width)``.
+    scheme : {"mapbox", "terrarium"}, optional
+        Encoding scheme of *rgb*. Defaults to ``"mapbox"``.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``float64`` elevations in meters.
+    """
+    offset, scale = _offset_scale(scheme)
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    packed = (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+    return packed / scale - offset
+
+
+def hillshade(
+    elevation: np.ndarray,
+    cellsize: float,
+    azimuth: float = 315.0,
+    altitude: float = 45.0,
+    z_factor: float = 1.0,
+) -> np.ndarray:
+    """
+    Shade a buffered elevation array in float32.
+
+    Slope and aspect use central differences, so the outermost row and
+    column on each side only provide neighbors: read tiles with a
+    one-pixel buffer and the result is seamless across tile edges.
+
+    Parameters
+    ----------
+    elevation : numpy.ndarray
+        2D array of elevations of shape ``(height + 2, width + 2)``. NaN
+        marks missing values.
+    cellsize : float
+        Ground size of a pixel in the units of the elevations.
+    azimuth : float, optional
+        Direction of the light source in degrees clockwise from north.
+        Defaults to ``315``.
+    altitude : float, optional
+        Angle of the light source above the horizon in degrees. Defaults
+        to ``45``.
+    z_factor : float, optional
+        Vertical exaggeration. Defaults to ``1``.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``float32`` brightness between 0 and 255 of shape
+        ``(height, width)``. NaN where a pixel or one of its neighbors is
+        missing.
+    """
+    if not 0 <= azimuth <= 360:
+        raise ValueError("azimuth must be between 0 and 360 degrees")
+    if not 0 <= altitude <= 90:
+        raise ValueError("altitude must be between 0 and 90 degrees")
+    elev = np.asarray(elevation, dtype=np.float32)
+    scale = np.float32(z_factor / (2.0 * cellsize))
+    # Row indexes increase southward
+    dzdx = (elev[1:-1, 2:] - elev[1:-1, :-2]) * scale
+    dzdy = (elev[2:, 1:-1] - elev[:-2, 1:-1]) * scale
+    slope = np.arctan(np.hypot(dzdx, dzdy))
+    aspect = np.arctan2(dzdy, -dzdx)
+    zenith = np.float32(np.radians(90.0 - altitude))
+    light = np.float32(np.radians((450.0 - azimuth) % 360.0))
+    shaded = np.cos(zenith) * np.cos(slope)
+    shaded += np.sin(zenith) * np.sin(slope) * np.cos(light - aspect)
+    np.clip(shaded, 0, 1, out=shaded)
+    shaded *= np.float32(255)
+    return shaded
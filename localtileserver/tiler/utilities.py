@@ -2,16 +2,22 @@
 Utility functions for path resolution, caching, and CRS handling.
 """
 
+import logging
 import os
 import pathlib
 import shutil
 import tempfile
-from urllib.parse import urlencode, urlparse
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlparse
 
 from rasterio import CRS
+import requests
 
 from localtileserver.tiler.data import clean_url, get_data_path
 
+logger = logging.getLogger(__name__)
+
 
 class ImageBytes(bytes):
     """
@@ -77,6 +83,10 @@ def purge_cache():
     pathlib.Path
         Path to the newly created, empty cache directory.
     """
+    # Release the on-disk tile cache database before deleting it
+    from localtileserver.tiler.disk_cache import close_disk_caches
+
+    close_disk_caches()
     cache = get_cache_dir()
     shutil.rmtree(cache)
     # Return the cache dir so that a fresh directory is created.
@@ -118,6 +128,12 @@ def make_vsi(url: str, **options):
     return vsi
 
 
+# GDAL driver connection prefixes (e.g., GTI:/path/to/file.gpkg) use a
+# colon that urlparse misinterprets as a URL scheme. Pass these through
+# directly — rasterio/GDAL handles them natively.
+_GDAL_PREFIXES = ("GTI:", "WMTS:", "DAAS:", "EEDAI:", "NGW:", "PLMOSAIC:", "PLSCENES:")
+
+
 def get_clean_filename(filename: str):
     """
     Resolve a filename to a local path or GDAL virtual filesystem path.
@@ -125,7 +141,8 @@ def get_clean_filename(filename: str):
     Built-in example dataset names (e.g., ``"blue_marble"``,
     ``"bahamas"``) are expanded to their bundled data paths.  Remote
     URLs are converted to GDAL VSI paths, and local paths are resolved
-    to absolute ``pathlib.Path`` objects.
+    to absolute ``pathlib.Path`` objects. MBTiles and PMTiles archives
+    are resolved like local files and must not be remote.
 
     Parameters
     ----------
@@ -142,7 +159,8 @@ def get_clean_filename(filename: str):
     Raises
     ------
     OSError
-        If *filename* is empty or the resolved local path does not exist.
+        If *filename* is empty, the resolved local path does not exist,
+        or it names a remote tile archive.
     """
     if not filename:
         raise OSError("Empty path given")  # pragma: no cover
@@ -161,14 +179,13 @@ def get_clean_filename(filename: str):
 
     if str(filename).startswith("/vsi"):
         return filename
-    # GDAL driver connection prefixes (e.g., GTI:/path/to/file.gpkg) use a
-    # colon that urlparse misinterprets as a URL scheme. Pass these through
-    # directly — rasterio/GDAL handles them natively.
-    _GDAL_PREFIXES = ("GTI:", "WMTS:", "DAAS:", "EEDAI:", "NGW:", "PLMOSAIC:", "PLSCENES:")
     if str(filename).startswith(_GDAL_PREFIXES):
         return str(filename)
     parsed = urlparse(str(filename))
     if parsed.scheme in ["http", "https", "s3"]:
+        if parsed.path.lower().endswith((".mbtiles", ".pmtiles")):
+            # Archives are memory-mapped or opened with SQLite, not through GDAL
+            raise OSError(f"Tile archives must be local files: {filename}")
         return make_vsi(filename)
     # Otherwise, treat as local path on Disk
     filename = pathlib.Path(filename).expanduser().absolute()
@@ -177,6 +194,117 @@ def get_clean_filename(filename: str):
     return filename
 
 
+# Remote dataset versions are looked up with a HEAD request, so remember
+# them for a while instead of hitting the server on every tile.
+_REMOTE_VERSION_TTL = 300.0
+_REMOTE_VERSIONS: dict[str, tuple[float, str]] = {}
+_REMOTE_VERSIONS_LOCK = threading.Lock()
+# URLs whose expired version is being looked up in the background
+_REMOTE_VERSION_REFRESHES: set[str] = set()
+_REMOTE_VERSION_FLIGHT = None
+
+
+def _vsicurl_to_url(path: str) -> str | None:
+    """
+    Extract the HTTP URL from a ``/vsicurl`` path, if any.
+    """
+    if path.startswith("/vsicurl?"):
+        return parse_qs(path[len("/vsicurl?") :]).get("url", [None])[0]
+    if path.startswith("/vsicurl/"):
+        return path[len("/vsicurl/") :]
+    return None
+
+
+def _fetch_remote_version(url: str) -> str:
+    """
+    Look up the version of a remote file with a HEAD request and remember it.
+    """
+    version = ""
+    try:
+        r = requests.head(url, allow_redirects=True, timeout=5)
+        if r.ok:
+            headers = r.headers
+            version = headers.get("ETag") or headers.get("Last-Modified") or ""
+            if not version and headers.get("Content-Length"):
+                version = f"size-{headers['Content-Length']}"
+    except requests.RequestException as e:
+        logger.debug("Could not determine version of %s: %s", url, e)
+    with _REMOTE_VERSIONS_LOCK:
+        _REMOTE_VERSIONS[url] = (time.monotonic(), version)
+    return version
+
+
+def _refresh_remote_version(url: str):
+    try:
+        _fetch_remote_version(url)
+    finally:
+        with _REMOTE_VERSIONS_LOCK:
+            _REMOTE_VERSION_REFRESHES.discard(url)
+
+
+def _get_remote_version(url: str) -> str:
+    """
+    Return the ETag (or Last-Modified/Content-Length) of a remote file.
+
+    An expired version is still returned while a single background thread
+    looks it up again. Concurrent first lookups of a URL share one request.
+    """
+    global _REMOTE_VERSION_FLIGHT
+    with _REMOTE_VERSIONS_LOCK:
+        cached = _REMOTE_VERSIONS.get(url)
+        if cached is not None:
+            expired = time.monotonic() - cached[0] >= _REMOTE_VERSION_TTL
+            if expired and url not in _REMOTE_VERSION_REFRESHES:
+                _REMOTE_VERSION_REFRESHES.add(url)
+                threading.Thread(
+                    target=_refresh_remote_version,
+                    args=(url,),
+                    name="remote-version",
+                    daemon=True,
+                ).start()
+            return cached[1]
+        if _REMOTE_VERSION_FLIGHT is None:
+            # Imported here as the cache module depends on this one
+            from .cache import SingleFlight
+
+            _REMOTE_VERSION_FLIGHT = SingleFlight()
+    return _REMOTE_VERSION_FLIGHT.do(url, lambda: _fetch_remote_version(url))
+
+
+def get_dataset_version(path: pathlib.Path | str) -> str:
+    """
+    Return a token that changes whenever the dataset at *path* changes.
+
+    Local files are identified by their modification time and size.
+    Files served over HTTP(S) through ``/vsicurl`` are identified by
+    their ``ETag`` (falling back to ``Last-Modified``), looked up with a
+    ``HEAD`` request and remembered for a few minutes, after which they
+    are refreshed in the background. Other virtual file systems and GDAL
+    driver strings have no cheap version and return an empty string.
+
+    Parameters
+    ----------
+    path : pathlib.Path or str
+        A cleaned path as returned by :func:`get_clean_filename`.
+
+    Returns
+    -------
+    str
+        An opaque version token, or ``""`` if none could be determined.
+    """
+    path = str(path)
+    url = _vsicurl_to_url(path)
+    if url is not None:
+        return _get_remote_version(url)
+    if path.startswith(("/vsi", *_GDAL_PREFIXES)):
+        return ""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
 _FORMAT_MAP = {
     "png": "PNG",
     "jpeg": "JPEG",
@@ -221,6 +349,56 @@ def format_to_encoding(fmt: str | None) -> str:
     return encoding
 
 
+def get_encoder_options(
+    img_format: str,
+    quality: int | None = None,
+    compression_level: int | None = None,
+    lossless: bool | None = None,
+) -> dict:
+    """
+    Translate encoder settings into GDAL creation options for a format.
+
+    Settings that do not apply to *img_format* are ignored, so one set of
+    server-wide defaults can be used with every output format.
+
+    Parameters
+    ----------
+    img_format : str
+        Canonical GDAL format string from :func:`format_to_encoding`.
+    quality : int, optional
+        JPEG or WEBP quality, from ``1`` (smallest) to ``100`` (best).
+    compression_level : int, optional
+        PNG zlib compression level, from ``1`` (fastest) to ``9``
+        (smallest).
+    lossless : bool, optional
+        Use lossless WEBP compression.
+
+    Returns
+    -------
+    dict
+        Creation options to pass to the GDAL driver. Empty when all
+        settings are left to the driver defaults.
+
+    Raises
+    ------
+    ValueError
+        If *quality* or *compression_level* is out of range.
+    """
+    if quality is not None and not 1 <= quality <= 100:
+        raise ValueError(f"quality must be between 1 and 100, got {quality}")
+    if compression_level is not None and not 1 <= compression_level <= 9:
+        raise ValueError(f"compression_level must be between 1 and 9, got {compression_level}")
+    fmt = img_format.upper()
+    options = {}
+    if fmt == "PNG" and compression_level is not None:
+        options["ZLEVEL"] = compression_level
+    elif fmt in ("JPEG", "WEBP") and quality is not None:
+        options["QUALITY"] = quality
+    if fmt == "WEBP" and lossless is not None:
+        options["LOSSLESS"] = "TRUE" if lossless else "FALSE"
+    return options
+
+
 def make_crs(projection):
     """
     Create a ``rasterio.CRS`` from various projection representations.
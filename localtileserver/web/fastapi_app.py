@@ -18,11 +18,24 @@ from fastapi.templating import Jinja2Templates
 import uvicorn
 
 from localtileserver.tiler import data as tiler_data, get_clean_filename
+from localtileserver.tiler.cache import TileCache
+from localtileserver.tiler.cog import CogConverter
 from localtileserver.tiler.data import get_sf_bay_url
-from localtileserver.tiler.handler import get_meta_data, get_reader, get_source_bounds
+from localtileserver.tiler.disk_cache import DiskTileCache
+from localtileserver.tiler.handler import (
+    METATILE_SIZES,
+    get_meta_data,
+    get_reader,
+    get_source_bounds,
+)
+from localtileserver.tiler.pool import get_dataset_pool
+from localtileserver.tiler.prefetch import TilePrefetcher
+from localtileserver.tiler.stream import DEFAULT_CHUNK_BUDGET
+from localtileserver.tiler.utilities import get_dataset_version, get_encoder_options
 from localtileserver.web.routers.mosaic import router as mosaic_router
 from localtileserver.web.routers.stac import router as stac_router
 from localtileserver.web.routers.tiles import router as tiles_router
+from localtileserver.web.routers.utils import DEFAULT_CACHE_MAX_AGE
 from localtileserver.web.routers.xarray import router as xarray_router
 
 logger = logging.getLogger(__name__)
@@ -37,6 +50,17 @@ def create_app(
     cors_all: bool = False,
     debug: bool = False,
     cesium_token: str = "",
+    tile_cache_size: int = 0,
+    disk_cache_size: int = 0,
+    disk_cache_policy: str = "lru",
+    cache_max_age: dict[str, int] | None = None,
+    encoder_options: dict | None = None,
+    empty_tile_status: int = 200,
+    metatile_size: int = 1,
+    prefetch_depth: int = 0,
+    prefetch_cpu_share: float = 0.25,
+    part_chunk_budget: int = DEFAULT_CHUNK_BUDGET,
+    convert_to_cog: bool = False,
 ):
     """
     Create and configure the FastAPI application.
@@ -51,6 +75,53 @@ def create_app(
         Run the application in debug mode with verbose logging.
     cesium_token : str, optional
         Cesium Ion access token for the 3-D globe viewer.
+    tile_cache_size : int, optional
+        Size budget in bytes of the in-memory cache of rendered tiles.
+        ``0`` (default) disables the cache.
+    disk_cache_size : int, optional
+        Size budget in bytes of the persistent cache of rendered tiles
+        kept in :func:`localtileserver.tiler.utilities.get_cache_dir`.
+        ``0`` (default) disables the cache.
+    disk_cache_policy : {"lru", "lfu"}, optional
+        Eviction policy of the persistent tile cache. Default is ``"lru"``.
+    cache_max_age : dict, optional
+        ``Cache-Control`` max-age in seconds per image route, keyed by
+        ``"tiles"``, ``"thumbnail"``, ``"part"`` and ``"data"``. Routes default to
+        ``0``, which makes clients revalidate with the ETag on every use.
+    encoder_options : dict, optional
+        Server-wide encoder defaults with the keys ``quality``,
+        ``compression_level`` and ``lossless`` (see
+        :func:`localtileserver.tiler.utilities.get_encoder_options`).
+        Requests override them with query parameters of the same names.
+    empty_tile_status : {200, 204}, optional
+        Response to tiles without any valid pixel. ``200`` (default) sends
+        a shared, pre-encoded transparent image; ``204`` sends no content.
+    metatile_size : {1, 2, 4}, optional
+        Render tiles in blocks of ``metatile_size`` by ``metatile_size``
+        read in one pass, caching the neighbours of each requested tile
+        (see :func:`localtileserver.tiler.handler.get_metatile`). Cuts
+        range requests and warp setup for remote datasets. Requires
+        ``tile_cache_size`` or ``disk_cache_size``. Defaults to ``1``
+        (disabled).
+    prefetch_depth : int, optional
+        After each tile, render its neighbours within this many tiles and
+        its children down this many zoom levels into the tile caches in
+        the background (see
+        :class:`localtileserver.tiler.prefetch.TilePrefetcher`). Requires
+        ``tile_cache_size`` or ``disk_cache_size``. Defaults to ``0``
+        (disabled).
+    prefetch_cpu_share : float, optional
+        Fraction of its thread's time the prefetcher may spend rendering.
+        Defaults to ``0.25``.
+    part_chunk_budget : int, optional
+        Approximate bytes used per strip by ``/api/part.{fmt}?stream=true``
+        (see :func:`localtileserver.tiler.stream.iter_part`). Defaults to
+        64 MiB.
+    convert_to_cog : bool, optional
+        Convert requested local GeoTIFFs that are not Cloud Optimized to
+        COG copies in the cache directory in the background, and serve the
+        copies once ready (see :class:`localtileserver.tiler.cog.CogConverter`).
+        Defaults to ``False``.
 
     Returns
     -------
@@ -66,6 +137,32 @@ def create_app(
     # Store config values as app state
     app.state.cesium_token = cesium_token
     app.state.debug = debug
+    app.state.tile_cache = TileCache(tile_cache_size) if tile_cache_size > 0 else None
+    app.state.cache_max_age = {**DEFAULT_CACHE_MAX_AGE, **(cache_max_age or {})}
+    # Fail at startup rather than on every request for invalid defaults
+    get_encoder_options("PNG", **(encoder_options or {}))
+    app.state.encoder_options = dict(encoder_options or {})
+    if empty_tile_status not in (200, 204):
+        raise ValueError(f"empty_tile_status must be 200 or 204, got {empty_tile_status}")
+    app.state.empty_tile_status = empty_tile_status
+    if metatile_size not in METATILE_SIZES:
+        raise ValueError(f"metatile_size must be one of {METATILE_SIZES}, got {metatile_size}")
+    app.state.metatile_size = metatile_size
+    app.state.disk_cache = (
+        DiskTileCache(disk_cache_size, policy=disk_cache_policy) if disk_cache_size > 0 else None
+    )
+    if metatile_size > 1 and app.state.tile_cache is None and app.state.disk_cache is None:
+        # Without a cache the neighbours of every tile would be rendered and discarded
+        raise ValueError("Metatiles need tile_cache_size or disk_cache_size.")
+    app.state.prefetcher = None
+    if prefetch_depth > 0:
+        if app.state.tile_cache is None and app.state.disk_cache is None:
+            raise ValueError("Prefetching needs tile_cache_size or disk_cache_size.")
+        app.state.prefetcher = TilePrefetcher(depth=prefetch_depth, cpu_share=prefetch_cpu_share)
+    if part_chunk_budget <= 0:
+        raise ValueError(f"part_chunk_budget must be positive, got {part_chunk_budget}")
+    app.state.part_chunk_budget = part_chunk_budget
+    app.state.cog_converter = CogConverter() if convert_to_cog else None
 
     if cors_all:
         app.add_middleware(
@@ -191,9 +288,11 @@ def _build_template_context(
     # Try to load raster metadata
     try:
         clean_name = get_clean_filename(filename)
-        tile_source = get_reader(clean_name)
-        context.update(get_meta_data(tile_source))
-        context["bounds"] = get_source_bounds(tile_source, projection="EPSG:4326")
+        with get_dataset_pool().reader(
+            clean_name, opener=get_reader, version=get_dataset_version(clean_name)
+        ) as tile_source:
+            context.update(get_meta_data(tile_source))
+            context["bounds"] = get_source_bounds(tile_source, projection="EPSG:4326")
     except Exception:
         pass
 
@@ -223,6 +322,17 @@ def run_app(
     host: str = "127.0.0.1",
     cors_all: bool = False,
     run: bool = True,
+    tile_cache_size: int = 0,
+    disk_cache_size: int = 0,
+    disk_cache_policy: str = "lru",
+    cache_max_age: dict[str, int] | None = None,
+    encoder_options: dict | None = None,
+    empty_tile_status: int = 200,
+    metatile_size: int = 1,
+    prefetch_depth: int = 0,
+    prefetch_cpu_share: float = 0.25,
+    part_chunk_budget: int = DEFAULT_CHUNK_BUDGET,
+    convert_to_cog: bool = False,
 ):
     """
     Serve tiles from the raster at ``filename``.
@@ -249,6 +359,32 @@ def run_app(
     run : bool, optional
         If ``True`` (default), start the uvicorn server. If ``False``, return
         the app without running it.
+    tile_cache_size : int, optional
+        Size budget in bytes of the in-memory cache of rendered tiles.
+        ``0`` (default) disables the cache.
+    disk_cache_size : int, optional
+        Size budget in bytes of the persistent cache of rendered tiles.
+        ``0`` (default) disables the cache.
+    disk_cache_policy : {"lru", "lfu"}, optional
+        Eviction policy of the persistent tile cache. Default is ``"lru"``.
+    cache_max_age : dict, optional
+        ``Cache-Control`` max-age in seconds per image route, keyed by
+        ``"tiles"``, ``"thumbnail"``, ``"part"`` and ``"data"``.
+    encoder_options : dict, optional
+        Server-wide defaults for ``quality``, ``compression_level`` and
+        ``lossless``.
+    empty_tile_status : {200, 204}, optional
+        Response to tiles without any valid pixel.
+    metatile_size : {1, 2, 4}, optional
+        Render tiles in blocks of this many tiles per side.
+    prefetch_depth : int, optional
+        Prefetch neighbours and children of requested tiles this deep.
+    prefetch_cpu_share : float, optional
+        Fraction of its thread's time the prefetcher may spend rendering.
+    part_chunk_budget : int, optional
+        Approximate bytes used per strip by streamed part extractions.
+    convert_to_cog : bool, optional
+        Serve cached COG copies of local GeoTIFFs that are not COGs.
 
     Returns
     -------
@@ -258,7 +394,22 @@ def run_app(
     filename = get_clean_filename(filename)
     if not str(filename).startswith("/vsi") and not filename.exists():
         raise OSError(f"File does not exist: {filename}")
-    app = create_app(cors_all=cors_all, debug=debug, cesium_token=cesium_token)
+    app = create_app(
+        cors_all=cors_all,
+        debug=debug,
+        cesium_token=cesium_token,
+        tile_cache_size=tile_cache_size,
+        disk_cache_size=disk_cache_size,
+        disk_cache_policy=disk_cache_policy,
+        cache_max_age=cache_max_age,
+        encoder_options=encoder_options,
+        empty_tile_status=empty_tile_status,
+        metatile_size=metatile_size,
+        prefetch_depth=prefetch_depth,
+        prefetch_cpu_share=prefetch_cpu_share,
+        part_chunk_budget=part_chunk_budget,
+        convert_to_cog=convert_to_cog,
+    )
     app.state.filename = filename
     if os.name == "nt" and host == "127.0.0.1":
         host = "localhost"
@@ -283,6 +434,19 @@ def run_app(
 @click.option("-t", "--cesium-token", default="")
 @click.option("-h", "--host", default="127.0.0.1")
 @click.option("-c", "--cors-all", default=False)
+@click.option("--tile-cache-size", default=0, help="Rendered tile cache budget in bytes.")
+@click.option("--disk-cache-size", default=0, help="On-disk tile cache budget in bytes.")
+@click.option("--disk-cache-policy", default="lru", type=click.Choice(["lru", "lfu"]))
+@click.option(
+    "--metatile-size",
+    default=1,
+    type=click.Choice([str(size) for size in METATILE_SIZES]),
+    callback=lambda ctx, param, value: int(value),
+    help="Render tiles in blocks of N by N.",
+)
+@click.option("--prefetch-depth", default=0, help="Prefetch neighbouring and child tiles.")
+@click.option("--prefetch-cpu-share", default=0.25, help="CPU share of the prefetcher.")
+@click.option("--convert-to-cog", is_flag=True, help="Serve cached COG copies of non-COG GeoTIFFs.")
 def click_run_app(*args, **kwargs):
     """
     CLI entry point for serving tiles from a raster file.
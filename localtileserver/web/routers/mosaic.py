@@ -57,7 +57,7 @@ def mosaic_tile_view(
         raise HTTPException(status_code=404, detail="Tile outside bounds") from None
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
-    return Response(content=bytes(tile_data), media_type=f"image/{format.lower()}")
+    return Response(content=tile_data, media_type=f"image/{format.lower()}")
 
 
 @router.get("/thumbnail.{format}")
@@ -83,4 +83,4 @@ def mosaic_thumbnail_view(
         thumb = get_mosaic_preview(assets, img_format=encoding, max_size=max_size, indexes=idx)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
-    return Response(content=bytes(thumb), media_type=f"image/{format.lower()}")
+    return Response(content=thumb, media_type=f"image/{format.lower()}")
@@ -79,7 +79,7 @@ def stac_tile_view(
         )
     except TileOutsideBounds:
         raise HTTPException(status_code=404, detail="Tile outside bounds") from None
-    return Response(content=bytes(tile_data), media_type=f"image/{format.lower()}")
+    return Response(content=tile_data, media_type=f"image/{format.lower()}")
 
 
 @router.get("/thumbnail.{format}")
@@ -106,4 +106,4 @@ def stac_thumbnail_view(
         img_format=encoding,
         max_size=max_size,
     )
-    return Response(content=bytes(thumb), media_type=f"image/{format.lower()}")
+    return Response(content=thumb, media_type=f"image/{format.lower()}")
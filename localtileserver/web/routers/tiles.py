@@ -7,15 +7,22 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+import gzip
 import logging
+import os
 from typing import Annotated
 
 from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from rasterio import RasterioIOError
 from rio_tiler.errors import TileOutsideBounds
 
 from localtileserver.tiler import (
     format_to_encoding,
+    get_encoder_options,
     get_meta_data,
     get_preview,
     get_reader,
@@ -23,16 +30,41 @@ from localtileserver.tiler import (
     get_statistics,
     get_tile,
 )
+from localtileserver.tiler.archive import get_tile_archive, is_tile_archive
+from localtileserver.tiler.batch import BATCH_MEDIA_TYPE, pack_batch_item
+from localtileserver.tiler.cache import get_render_flight, get_statistics_cache, make_cache_key
 from localtileserver.tiler.data import get_sf_bay_url
-from localtileserver.tiler.handler import get_feature, get_part
+from localtileserver.tiler.handler import (
+    DATA_TILE_DTYPES,
+    get_data_tile,
+    get_empty_tile,
+    get_feature,
+    get_hillshade_tile,
+    get_metatile,
+    get_part,
+    get_terrain_tile,
+)
 from localtileserver.tiler.palettes import get_palettes
-from localtileserver.tiler.utilities import get_clean_filename
-from localtileserver.web.routers.utils import parse_style_params
+from localtileserver.tiler.pool import get_dataset_pool
+from localtileserver.tiler.stream import DEFAULT_CHUNK_BUDGET, STREAM_FORMATS, iter_part
+from localtileserver.tiler.terrain import TERRAIN_SCHEMES
+from localtileserver.tiler.utilities import get_clean_filename, get_dataset_version
+from localtileserver.web.routers.utils import (
+    accepts_encoding,
+    accepts_mimetype,
+    cache_headers,
+    is_not_modified,
+    parse_style_params,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["tiles"])
 
+# Limits of the batch tile endpoint
+MAX_BATCH_TILES = 256
+_BATCH_WORKERS = min(8, os.cpu_count() or 1)
+
 
 @router.get("/palettes")
 async def list_palettes():
@@ -40,12 +72,30 @@ async def list_palettes():
     return get_palettes()
 
 
+@router.get("/cache/stats")
+async def cache_stats_view(request: Request):
+    """Return hit/miss counters of the server-side caches."""
+    tile_cache = getattr(request.app.state, "tile_cache", None)
+    disk_cache = getattr(request.app.state, "disk_cache", None)
+    prefetcher = getattr(request.app.state, "prefetcher", None)
+    converter = getattr(request.app.state, "cog_converter", None)
+    return {
+        "dataset_pool": get_dataset_pool().stats(),
+        "statistics": get_statistics_cache().stats(),
+        "tiles": tile_cache.stats() if tile_cache is not None else None,
+        "disk_tiles": disk_cache.stats() if disk_cache is not None else None,
+        "renders": {"collapsed": get_render_flight().collapsed},
+        "prefetch": prefetcher.stats() if prefetcher is not None else None,
+        "cog_conversion": converter.stats() if converter is not None else None,
+    }
+
+
 @router.get("/metadata")
 def metadata_view(request: Request, filename: str = Query(None)):
     """Return raster metadata for the given file."""
     filename = _resolve_filename(request, filename)
-    reader = _get_reader(filename)
-    meta = get_meta_data(reader)
+    with _get_reader(filename) as reader:
+        meta = get_meta_data(reader)
     meta["filename"] = filename
     return meta
 
@@ -58,8 +108,8 @@ def bounds_view(
 ):
     """Return the geographic bounds of the raster."""
     filename = _resolve_filename(request, filename)
-    reader = _get_reader(filename)
-    bounds = get_source_bounds(reader, projection=crs)
+    with _get_reader(filename) as reader:
+        bounds = get_source_bounds(reader, projection=crs)
     bounds["filename"] = filename
     return bounds
 
@@ -70,9 +120,10 @@ def validate_cog_view(request: Request, filename: str = Query(None)):
     # Deferred import: validate → client → manager → web → tiles (circular).
     from localtileserver.validate import validate_cog
 
-    filename = _resolve_filename(request, filename)
-    reader = _get_reader(filename)
-    valid = validate_cog(reader, strict=True)
+    # The requested file, not the COG copy served in its place
+    filename = _requested_filename(request, filename)
+    with _get_reader(filename) as reader:
+        valid = validate_cog(reader, strict=True)
     if not valid:
         raise HTTPException(status_code=415, detail="Not a valid Cloud Optimized GeoTiff.")
     return "Valid Cloud Optimized GeoTiff."
@@ -87,9 +138,9 @@ def statistics_view(
 ):
     """Return band statistics for the raster."""
     filename = _resolve_filename(request, filename)
-    reader = _get_reader(filename)
     style = parse_style_params(indexes=indexes)
-    return get_statistics(reader, expression=expression, **style)
+    with _get_reader(filename) as reader:
+        return get_statistics(reader, expression=expression, **style)
 
 
 @router.get("/thumbnail.{format}")
@@ -105,6 +156,9 @@ def thumbnail_view(
     crs: str | None = Query(None),
     expression: str | None = Query(None),
     stretch: str | None = Query(None),
+    quality: int | None = Query(None, description="JPEG/WEBP quality (1-100)"),
+    compression_level: int | None = Query(None, description="PNG zlib level (1-9)"),
+    lossless: bool | None = Query(None, description="Lossless WEBP"),
 ):
     """Return a thumbnail preview image of the raster."""
     filename = _resolve_filename(request, filename)
@@ -114,21 +168,48 @@ def thumbnail_view(
         raise HTTPException(
             status_code=400, detail=f"Format {format} is not a valid encoding."
         ) from None
+    options = _encoder_options(request, encoding, quality, compression_level, lossless)
     try:
-        reader = _get_reader(filename)
         style = parse_style_params(
             indexes=indexes, colormap=colormap, vmin=vmin, vmax=vmax, nodata=nodata
         )
-        thumb_data = get_preview(
-            reader, img_format=encoding, crs=crs, expression=expression, stretch=stretch, **style
+        source, version = _dataset_version(filename)
+        key = make_cache_key(
+            source,
+            version,
+            img_format=encoding,
+            encoder=options or None,
+            crs=crs,
+            expression=expression,
+            stretch=stretch,
+            **style,
         )
+        headers = cache_headers(request, "thumbnail", key, source, version)
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+
+        def _render():
+            with _open_dataset(source, version) as reader:
+                return get_preview(
+                    reader,
+                    img_format=encoding,
+                    crs=crs,
+                    expression=expression,
+                    stretch=stretch,
+                    encoder_options=options,
+                    **style,
+                )
+
+        thumb_data = get_render_flight().do(("thumbnail", key), _render)
+    except HTTPException:
+        raise
     except RasterioIOError as e:
         logger.error("RasterioIOError rendering thumbnail: %s", e)
         raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
     except Exception as e:
         logger.error("Unexpected error rendering thumbnail: %s", e)
         raise HTTPException(status_code=500, detail=f"Thumbnail rendering error: {e}") from None
-    return Response(content=bytes(thumb_data), media_type=f"image/{format.lower()}")
+    return Response(content=thumb_data, media_type=f"image/{format.lower()}", headers=headers)
 
 
 @router.get("/tiles/{z}/{x}/{y}.{format}")
@@ -146,27 +227,364 @@ def tile_view(
     nodata: str | None = Query(None),
     expression: str | None = Query(None),
     stretch: str | None = Query(None),
+    quality: int | None = Query(None, description="JPEG/WEBP quality (1-100)"),
+    compression_level: int | None = Query(None, description="PNG zlib level (1-9)"),
+    lossless: bool | None = Query(None, description="Lossless WEBP"),
 ):
-    """Return a single map tile at the given z/x/y coordinates."""
+    """Return a single map tile at the given z/x/y coordinates.
+
+    The ``auto`` format serves WEBP to clients that accept it, and JPEG for
+    fully opaque tiles or PNG otherwise to all others.
+    """
     filename = _resolve_filename(request, filename)
+    auto = format.lower() == "auto"
+    try:
+        if auto:
+            img_format = "WEBP" if accepts_mimetype(request, "image/webp") else "AUTO"
+        else:
+            img_format = format_to_encoding(format)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Format {format} is not a valid encoding."
+        ) from None
+    options = _encoder_options(request, img_format, quality, compression_level, lossless)
     try:
-        reader = _get_reader(filename)
-        img_format = format_to_encoding(format)
         style = parse_style_params(
             indexes=indexes, colormap=colormap, vmin=vmin, vmax=vmax, nodata=nodata
         )
-        tile_binary = get_tile(
-            reader, z, x, y, img_format=img_format, expression=expression, stretch=stretch, **style
+        source, version = _dataset_version(filename)
+        render = _StyledTileRenderer(
+            request, source, version, img_format, options, expression, stretch, style
         )
+        cache_key = render.cache_key(z, x, y)
+        headers = cache_headers(request, "tiles", cache_key, source, version)
+        if auto:
+            headers["Vary"] = "Accept"
+        # Conditional requests and cache hits are served without opening the dataset
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        prefetcher = getattr(request.app.state, "prefetcher", None)
+        if prefetcher is None or render.is_archive:
+            tile_binary = render(z, x, y)
+        else:
+            with prefetcher.foreground():
+                tile_binary = render(z, x, y)
+            prefetcher.schedule(z, x, y, render, key=render.cache_key)
     except TileOutsideBounds:
         raise HTTPException(status_code=404, detail="Tile outside bounds") from None
+    except HTTPException:
+        raise
     except RasterioIOError as e:
         logger.error("RasterioIOError rendering tile z=%s x=%s y=%s: %s", z, x, y, e)
         raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
     except Exception as e:
         logger.error("Unexpected error rendering tile z=%s x=%s y=%s: %s", z, x, y, e)
         raise HTTPException(status_code=500, detail=f"Tile rendering error: {e}") from None
-    return Response(content=bytes(tile_binary), media_type=f"image/{img_format.lower()}")
+    if getattr(request.app.state, "empty_tile_status", 200) == 204 and _is_empty_tile(
+        tile_binary, render.img_format
+    ):
+        return Response(status_code=204, headers=headers)
+    return Response(
+        content=tile_binary,
+        media_type=_media_type(tile_binary, render.img_format),
+        headers=headers,
+    )
+
+
+@router.post("/tiles/batch.{format}")
+def tile_batch_view(
+    request: Request,
+    format: str,
+    tiles: Annotated[list[tuple[int, int, int]], Body(embed=True)],
+    filename: str = Query(None),
+    indexes: str | None = Query(None),
+    colormap: str | None = Query(None),
+    vmin: str | None = Query(None),
+    vmax: str | None = Query(None),
+    nodata: str | None = Query(None),
+    expression: str | None = Query(None),
+    stretch: str | None = Query(None),
+    quality: int | None = Query(None, description="JPEG/WEBP quality (1-100)"),
+    compression_level: int | None = Query(None, description="PNG zlib level (1-9)"),
+    lossless: bool | None = Query(None, description="Lossless WEBP"),
+):
+    """Return many map tiles sharing one style in a length-prefixed container.
+
+    The body is ``{"tiles": [[z, x, y], ...]}``. Tiles are rendered in
+    parallel and streamed back in request order, each with its own status,
+    so a tile outside the dataset does not fail the whole batch.
+    """
+    filename = _resolve_filename(request, filename)
+    if len(tiles) > MAX_BATCH_TILES:
+        raise HTTPException(
+            status_code=400, detail=f"A batch holds at most {MAX_BATCH_TILES} tiles."
+        )
+    if any(not 0 <= value < 2**32 for tile in tiles for value in tile):
+        raise HTTPException(status_code=400, detail="Tile coordinates must be non-negative.")
+    try:
+        if format.lower() == "auto":
+            img_format = "WEBP" if accepts_mimetype(request, "image/webp") else "AUTO"
+        else:
+            img_format = format_to_encoding(format)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Format {format} is not a valid encoding."
+        ) from None
+    options = _encoder_options(request, img_format, quality, compression_level, lossless)
+    try:
+        style = parse_style_params(
+            indexes=indexes, colormap=colormap, vmin=vmin, vmax=vmax, nodata=nodata
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    # The dataset and style are resolved once for the whole batch
+    source, version = _dataset_version(filename)
+    render = _StyledTileRenderer(
+        request, source, version, img_format, options, expression, stretch, style
+    )
+    empty_status = getattr(request.app.state, "empty_tile_status", 200)
+
+    def _render_item(tile: tuple[int, int, int]) -> bytes:
+        z, x, y = tile
+        if x >= 2**z or y >= 2**z:
+            return pack_batch_item(z, x, y, 400, b"Invalid tile coordinates")
+        try:
+            tile_binary = render(z, x, y)
+        except TileOutsideBounds:
+            return pack_batch_item(z, x, y, 404, b"Tile outside bounds")
+        except Exception as e:
+            logger.error("Error rendering batch tile z=%s x=%s y=%s: %s", z, x, y, e)
+            return pack_batch_item(z, x, y, 500, f"Tile rendering error: {e}".encode())
+        if empty_status == 204 and _is_empty_tile(tile_binary, render.img_format):
+            return pack_batch_item(z, x, y, 204, b"")
+        return pack_batch_item(z, x, y, 200, tile_binary)
+
+    def _stream():
+        executor = ThreadPoolExecutor(max_workers=max(1, min(_BATCH_WORKERS, len(tiles))))
+        try:
+            yield from executor.map(_render_item, tiles)
+        finally:
+            # Drop queued tiles if the client went away
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    headers = {"Cache-Control": "no-store", "X-Tile-Format": render.img_format.lower()}
+    return StreamingResponse(_stream(), media_type=BATCH_MEDIA_TYPE, headers=headers)
+
+
+@router.get("/terrain/{z}/{x}/{y}.{format}")
+def terrain_tile_view(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+    format: str,
+    filename: str = Query(None),
+    scheme: str = Query("mapbox", description="mapbox (Terrain-RGB) or terrarium"),
+    band: str = Query("1"),
+    nodata: str | None = Query(None),
+):
+    """Return an elevation tile encoded as Terrain-RGB or Terrarium."""
+    filename = _resolve_filename(request, filename)
+    img_format = format.upper()
+    if img_format not in ("PNG", "WEBP"):
+        raise HTTPException(status_code=400, detail="Terrain tiles must be png or webp.")
+    if scheme not in TERRAIN_SCHEMES:
+        raise HTTPException(
+            status_code=400, detail=f"scheme must be one of {', '.join(TERRAIN_SCHEMES)}."
+        )
+    caches = _tile_caches(request)
+    try:
+        source, version = _dataset_version(filename)
+        cache_key = make_cache_key(
+            source,
+            version,
+            terrain=(z, x, y),
+            img_format=img_format,
+            scheme=scheme,
+            band=band,
+            nodata=nodata,
+        )
+        headers = cache_headers(request, "tiles", cache_key, source, version)
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+
+        def _render():
+            with _open_dataset(source, version) as reader:
+                return get_terrain_tile(
+                    reader,
+                    z,
+                    x,
+                    y,
+                    scheme=scheme,
+                    band=band,
+                    nodata=nodata,
+                    img_format=img_format,
+                )
+
+        tile_binary = _cached_render(caches, "terrain", cache_key, source, version, _render)
+    except TileOutsideBounds:
+        raise HTTPException(status_code=404, detail="Tile outside bounds") from None
+    except HTTPException:
+        raise
+    except RasterioIOError as e:
+        logger.error("RasterioIOError rendering terrain tile z=%s x=%s y=%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
+    except Exception as e:
+        logger.error("Unexpected error rendering terrain tile z=%s x=%s y=%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail=f"Terrain tile error: {e}") from None
+    return Response(content=tile_binary, media_type=f"image/{format.lower()}", headers=headers)
+
+
+@router.get("/hillshade/{z}/{x}/{y}.{format}")
+def hillshade_tile_view(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+    format: str,
+    filename: str = Query(None),
+    azimuth: float = Query(315.0, description="Light direction, degrees clockwise from north"),
+    altitude: float = Query(45.0, description="Light angle above the horizon in degrees"),
+    z_factor: float = Query(1.0, description="Vertical exaggeration"),
+    band: str = Query("1"),
+    nodata: str | None = Query(None),
+    quality: int | None = Query(None, description="JPEG/WEBP quality (1-100)"),
+    compression_level: int | None = Query(None, description="PNG zlib level (1-9)"),
+    lossless: bool | None = Query(None, description="Lossless WEBP"),
+):
+    """Return a hillshade tile computed from an elevation band."""
+    filename = _resolve_filename(request, filename)
+    if not 0 <= azimuth <= 360:
+        raise HTTPException(status_code=400, detail="azimuth must be between 0 and 360.")
+    if not 0 <= altitude <= 90:
+        raise HTTPException(status_code=400, detail="altitude must be between 0 and 90.")
+    auto = format.lower() == "auto"
+    try:
+        if auto:
+            img_format = "WEBP" if accepts_mimetype(request, "image/webp") else "AUTO"
+        else:
+            img_format = format_to_encoding(format)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Format {format} is not a valid encoding."
+        ) from None
+    options = _encoder_options(request, img_format, quality, compression_level, lossless)
+    caches = _tile_caches(request)
+    try:
+        source, version = _dataset_version(filename)
+        cache_key = make_cache_key(
+            source,
+            version,
+            hillshade=(z, x, y),
+            img_format=img_format,
+            encoder=options or None,
+            azimuth=azimuth,
+            altitude=altitude,
+            z_factor=z_factor,
+            band=band,
+            nodata=nodata,
+        )
+        headers = cache_headers(request, "tiles", cache_key, source, version)
+        if auto:
+            headers["Vary"] = "Accept"
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+
+        def _render():
+            with _open_dataset(source, version) as reader:
+                return get_hillshade_tile(
+                    reader,
+                    z,
+                    x,
+                    y,
+                    azimuth=azimuth,
+                    altitude=altitude,
+                    z_factor=z_factor,
+                    band=band,
+                    nodata=nodata,
+                    img_format=img_format,
+                    encoder_options=options,
+                )
+
+        tile_binary = _cached_render(caches, "hillshade", cache_key, source, version, _render)
+    except TileOutsideBounds:
+        raise HTTPException(status_code=404, detail="Tile outside bounds") from None
+    except HTTPException:
+        raise
+    except RasterioIOError as e:
+        logger.error("RasterioIOError rendering hillshade tile z=%s x=%s y=%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
+    except Exception as e:
+        logger.error("Unexpected error rendering hillshade tile z=%s x=%s y=%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail=f"Hillshade tile error: {e}") from None
+    return Response(
+        content=tile_binary, media_type=_media_type(tile_binary, img_format), headers=headers
+    )
+
+
+@router.get("/data/{z}/{x}/{y}.npy")
+def data_tile_view(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+    filename: str = Query(None),
+    indexes: str | None = Query(None),
+    nodata: str | None = Query(None),
+    expression: str | None = Query(None),
+    dtype: str | None = Query(None, description="Cast values, e.g. float16"),
+    compress: bool = Query(False, description="Gzip the payload if the client accepts it"),
+    compression_level: int = Query(6, description="Gzip level (1-9)"),
+):
+    """Return the unscaled band values and mask of a tile as a NumPy array."""
+    filename = _resolve_filename(request, filename)
+    if dtype is not None and dtype not in DATA_TILE_DTYPES:
+        raise HTTPException(
+            status_code=400, detail=f"dtype must be one of {', '.join(DATA_TILE_DTYPES)}."
+        )
+    if not 1 <= compression_level <= 9:
+        raise HTTPException(status_code=400, detail="compression_level must be between 1 and 9.")
+    gzipped = compress and accepts_encoding(request, "gzip")
+    caches = _tile_caches(request)
+    try:
+        style = parse_style_params(indexes=indexes, nodata=nodata)
+        source, version = _dataset_version(filename)
+        cache_key = make_cache_key(
+            source,
+            version,
+            data_tile=(z, x, y),
+            dtype=dtype,
+            expression=expression,
+            gzip=compression_level if gzipped else None,
+            **style,
+        )
+        headers = cache_headers(request, "data", cache_key, source, version)
+        if compress:
+            headers["Vary"] = "Accept-Encoding"
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+
+        def _render():
+            with _open_dataset(source, version) as reader:
+                data = get_data_tile(reader, z, x, y, expression=expression, dtype=dtype, **style)
+            if gzipped:
+                data = gzip.compress(data, compresslevel=compression_level)
+            return data
+
+        payload = _cached_render(caches, "data", cache_key, source, version, _render)
+    except TileOutsideBounds:
+        raise HTTPException(status_code=404, detail="Tile outside bounds") from None
+    except HTTPException:
+        raise
+    except RasterioIOError as e:
+        logger.error("RasterioIOError reading data tile z=%s x=%s y=%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
+    except Exception as e:
+        logger.error("Unexpected error reading data tile z=%s x=%s y=%s: %s", z, x, y, e)
+        raise HTTPException(status_code=500, detail=f"Data tile error: {e}") from None
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=payload, media_type="application/x-npy", headers=headers)
 
 
 @router.get("/part.{format}")
@@ -182,9 +600,13 @@ def part_view(
     nodata: str | None = Query(None),
     expression: str | None = Query(None),
     stretch: str | None = Query(None),
+    quality: int | None = Query(None, description="JPEG/WEBP quality (1-100)"),
+    compression_level: int | None = Query(None, description="PNG zlib level (1-9)"),
+    lossless: bool | None = Query(None, description="Lossless WEBP"),
     max_size: int = Query(1024),
     dst_crs: str | None = Query(None),
     bounds_crs: str | None = Query(None),
+    stream: bool = Query(False, description="Render in strips of bounded memory (tif or png)"),
 ):
     """Return a cropped image of the raster for the given bounding box."""
     filename = _resolve_filename(request, filename)
@@ -194,6 +616,7 @@ def part_view(
         raise HTTPException(
             status_code=400, detail=f"Format {format} is not a valid encoding."
         ) from None
+    options = _encoder_options(request, encoding, quality, compression_level, lossless)
     try:
         parts = [float(x.strip()) for x in bbox.split(",")]
         if len(parts) != 4:
@@ -204,14 +627,16 @@ def part_view(
             status_code=400, detail="bbox must be 4 comma-separated floats: left,bottom,right,top"
         ) from None
     try:
-        reader = _get_reader(filename)
         style = parse_style_params(
             indexes=indexes, colormap=colormap, vmin=vmin, vmax=vmax, nodata=nodata
         )
-        result = get_part(
-            reader,
-            bbox_tuple,
+        source, version = _dataset_version(filename)
+        key = make_cache_key(
+            source,
+            version,
+            bbox=bbox_tuple,
             img_format=encoding,
+            encoder=options or None,
             max_size=max_size,
             dst_crs=dst_crs,
             bounds_crs=bounds_crs,
@@ -219,13 +644,99 @@ def part_view(
             stretch=stretch,
             **style,
         )
+        headers = cache_headers(request, "part", key, source, version)
+        if is_not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        if stream:
+            return _stream_part(
+                request,
+                source,
+                version,
+                bbox_tuple,
+                encoding,
+                options,
+                headers,
+                media_type=f"image/{format.lower()}",
+                max_size=max_size,
+                dst_crs=dst_crs,
+                bounds_crs=bounds_crs,
+                expression=expression,
+                stretch=stretch,
+                **style,
+            )
+
+        def _render():
+            with _open_dataset(source, version) as reader:
+                return get_part(
+                    reader,
+                    bbox_tuple,
+                    img_format=encoding,
+                    max_size=max_size,
+                    dst_crs=dst_crs,
+                    bounds_crs=bounds_crs,
+                    expression=expression,
+                    stretch=stretch,
+                    encoder_options=options,
+                    **style,
+                )
+
+        result = get_render_flight().do(("part", key), _render)
+    except HTTPException:
+        raise
     except RasterioIOError as e:
         logger.error("RasterioIOError rendering part: %s", e)
         raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
     except Exception as e:
         logger.error("Unexpected error rendering part: %s", e)
         raise HTTPException(status_code=500, detail=f"Part rendering error: {e}") from None
-    return Response(content=bytes(result), media_type=f"image/{format.lower()}")
+    return Response(content=result, media_type=f"image/{format.lower()}", headers=headers)
+
+
+def _stream_part(
+    request: Request,
+    source: str,
+    version: str,
+    bbox: tuple[float, float, float, float],
+    encoding: str,
+    options: dict,
+    headers: dict,
+    media_type: str,
+    **kwargs,
+) -> StreamingResponse:
+    """
+    Stream a part rendered in strips, keeping the reader leased until the end.
+
+    The first strip is rendered before the response starts, so invalid
+    requests still fail with an error status.
+    """
+    if encoding.upper() not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400, detail="Streaming supports the tif and png formats only."
+        )
+    budget = getattr(request.app.state, "part_chunk_budget", DEFAULT_CHUNK_BUDGET)
+    stack = ExitStack()
+    try:
+        reader = stack.enter_context(_open_dataset(source, version))
+        chunks = iter_part(
+            reader,
+            bbox,
+            img_format=encoding,
+            compression_level=options.get("compression_level"),
+            chunk_budget=budget,
+            **kwargs,
+        )
+    except ValueError as e:
+        stack.close()
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    except BaseException:
+        stack.close()
+        raise
+
+    def _body():
+        with stack:
+            yield from chunks
+
+    return StreamingResponse(_body(), media_type=media_type, headers=headers)
 
 
 @router.post("/feature.{format}")
@@ -241,6 +752,9 @@ def feature_view(
     nodata: str | None = Query(None),
     expression: str | None = Query(None),
     stretch: str | None = Query(None),
+    quality: int | None = Query(None, description="JPEG/WEBP quality (1-100)"),
+    compression_level: int | None = Query(None, description="PNG zlib level (1-9)"),
+    lossless: bool | None = Query(None, description="Lossless WEBP"),
     max_size: int = Query(1024),
     dst_crs: str | None = Query(None),
 ):
@@ -252,31 +766,42 @@ def feature_view(
         raise HTTPException(
             status_code=400, detail=f"Format {format} is not a valid encoding."
         ) from None
+    options = _encoder_options(request, encoding, quality, compression_level, lossless)
     try:
-        reader = _get_reader(filename)
         style = parse_style_params(
             indexes=indexes, colormap=colormap, vmin=vmin, vmax=vmax, nodata=nodata
         )
-        result = get_feature(
-            reader,
-            geojson,
-            img_format=encoding,
-            max_size=max_size,
-            dst_crs=dst_crs,
-            expression=expression,
-            stretch=stretch,
-            **style,
-        )
+        with _get_reader(filename) as reader:
+            result = get_feature(
+                reader,
+                geojson,
+                img_format=encoding,
+                max_size=max_size,
+                dst_crs=dst_crs,
+                expression=expression,
+                stretch=stretch,
+                encoder_options=options,
+                **style,
+            )
     except RasterioIOError as e:
         logger.error("RasterioIOError rendering feature: %s", e)
         raise HTTPException(status_code=500, detail=f"Rasterio error: {e}") from None
     except Exception as e:
         logger.error("Unexpected error rendering feature: %s", e)
         raise HTTPException(status_code=500, detail=f"Feature rendering error: {e}") from None
-    return Response(content=bytes(result), media_type=f"image/{format.lower()}")
+    return Response(content=result, media_type=f"image/{format.lower()}")
 
 
 def _resolve_filename(request: Request, filename: str | None) -> str:
+    """Resolve the dataset to serve, swapping in its COG copy once converted."""
+    filename = _requested_filename(request, filename)
+    converter = getattr(request.app.state, "cog_converter", None)
+    if converter is None:
+        return filename
+    return converter.resolve(filename)
+
+
+def _requested_filename(request: Request, filename: str | None) -> str:
     """Resolve the filename from query params, app state, or default."""
     if filename:
         return filename
@@ -288,13 +813,214 @@ def _resolve_filename(request: Request, filename: str | None) -> str:
     return get_sf_bay_url()
 
 
-def _get_reader(filename: str):
-    """Resolve filename and return a rio-tiler Reader."""
+def _clean_filename(filename: str):
+    """Resolve filename, raising a 400 error if it cannot be found."""
     try:
-        clean = get_clean_filename(filename)
+        return get_clean_filename(filename)
     except OSError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _dataset_version(filename: str) -> tuple[str, str]:
+    """Return the cleaned path of a dataset and its version token."""
+    clean = _clean_filename(filename)
+    return str(clean), get_dataset_version(clean)
+
+
+def _encoder_options(
+    request: Request,
+    img_format: str,
+    quality: int | None,
+    compression_level: int | None,
+    lossless: bool | None,
+) -> dict:
+    """Merge request encoder settings over the server defaults, raising 400 if invalid."""
+    settings = dict(getattr(request.app.state, "encoder_options", None) or {})
+    requested = {"quality": quality, "compression_level": compression_level, "lossless": lossless}
+    settings.update({k: v for k, v in requested.items() if v is not None})
+    try:
+        get_encoder_options(img_format, **settings)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    return settings
+
+
+def _media_type(data: bytes, img_format: str) -> str:
+    """Return the media type of an encoded image, detecting the ``AUTO`` choice."""
+    if img_format == "AUTO":
+        return "image/jpeg" if data[:3] == b"\xff\xd8\xff" else "image/png"
+    return f"image/{img_format.lower()}"
+
+
+def _is_empty_tile(data: bytes, img_format: str) -> bool:
+    """Return whether *data* is the shared transparent tile for the format."""
+    try:
+        return data == get_empty_tile(img_format)
+    except ValueError:
+        return False
+
+
+def _tile_caches(request: Request) -> list:
+    """Return the enabled rendered-tile caches, fastest first."""
+    state = request.app.state
+    caches = [getattr(state, "tile_cache", None), getattr(state, "disk_cache", None)]
+    return [cache for cache in caches if cache is not None]
+
+
+def _cache_lookup(caches: list, key: str, source: str, version: str) -> bytes | None:
+    """Look a tile up in each cache, copying hits into the faster caches."""
+    for i, cache in enumerate(caches):
+        value = cache.get(key)
+        if value is not None:
+            for faster in caches[:i]:
+                faster.put(key, value, source=source, version=version)
+            return value
+    return None
+
+
+def _cached_render(
+    caches: list,
+    route: str,
+    key: str,
+    source: str,
+    version: str,
+    render: Callable[[], bytes],
+) -> bytes:
+    """Serve *key* from the tile caches, or render it once and fill the caches."""
+    value = _cache_lookup(caches, key, source, version)
+    if value is not None:
+        return value
+
+    def _render_and_store():
+        value = render()
+        for cache in caches:
+            cache.put(key, value, source=source, version=version)
+        return value
+
+    # Identical requests arriving together share one render
+    return get_render_flight().do((route, key), _render_and_store)
+
+
+class _StyledTileRenderer:
+    """Render tiles of one dataset and style through the tile caches.
+
+    With ``app.state.metatile_size`` above one, a cache miss renders the
+    whole metatile around the tile and caches its neighbours too.
+    Concurrent requests for tiles of one metatile share a single render.
+
+    Tiles of MBTiles and PMTiles archives are looked up directly, without
+    the caches, in the format they are stored in.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        source: str,
+        version: str,
+        img_format: str,
+        options: dict,
+        expression: str | None,
+        stretch: str | None,
+        style: dict,
+    ):
+        self.caches = _tile_caches(request)
+        self.metatile_size = getattr(request.app.state, "metatile_size", 1)
+        self.source = source
+        self.version = version
+        self.img_format = img_format
+        self.options = options
+        self.expression = expression
+        self.stretch = stretch
+        self.style = style
+        self.is_archive = is_tile_archive(source)
+        if self.is_archive:
+            with get_tile_archive(source, version) as archive:
+                self.img_format = archive.img_format
+
+    def cache_key(self, z: int, x: int, y: int) -> str:
+        return make_cache_key(
+            self.source,
+            self.version,
+            tile=(z, x, y),
+            img_format=self.img_format,
+            encoder=self.options or None,
+            expression=self.expression,
+            stretch=self.stretch,
+            **self.style,
+        )
+
+    def _render_args(self) -> dict:
+        return {
+            "img_format": self.img_format,
+            "expression": self.expression,
+            "stretch": self.stretch,
+            "encoder_options": self.options,
+            **self.style,
+        }
+
+    def __call__(self, z: int, x: int, y: int) -> bytes:
+        if self.is_archive:
+            with get_tile_archive(self.source, self.version) as archive:
+                return archive.read_tile(z, x, y)
+        if self.metatile_size > 1:
+            tile = self._render_metatile(z, x, y)
+            if tile is not None:
+                return tile
+
+        def _render():
+            with _open_dataset(self.source, self.version) as reader:
+                return get_tile(reader, z, x, y, **self._render_args())
+
+        key = self.cache_key(z, x, y)
+        return _cached_render(self.caches, "tiles", key, self.source, self.version, _render)
+
+    def _render_metatile(self, z: int, x: int, y: int) -> bytes | None:
+        key = self.cache_key(z, x, y)
+        value = _cache_lookup(self.caches, key, self.source, self.version)
+        if value is not None:
+            return value
+        size = self.metatile_size
+        origin = (z, x - x % size, y - y % size)
+
+        def _render():
+            try:
+                with _open_dataset(self.source, self.version) as reader:
+                    tiles = get_metatile(reader, z, x, y, size=size, **self._render_args())
+            except TileOutsideBounds:
+                return {}
+            for (tz, tx, ty), tile in tiles.items():
+                tile_key = self.cache_key(tz, tx, ty)
+                for cache in self.caches:
+                    cache.put(tile_key, tile, source=self.source, version=self.version)
+            return tiles
+
+        # Requests for any tile of the block share one read
+        tiles = get_render_flight().do(("metatile", self.cache_key(*origin)), _render)
+        # Missing when the tile that started the shared render was outside the dataset
+        return tiles.get((z, x, y))
+
+
+@contextmanager
+def _get_reader(filename: str) -> Iterator:
+    """Resolve filename and lease a pooled rio-tiler Reader for the request."""
+    source, version = _dataset_version(filename)
+    with _open_dataset(source, version) as reader:
+        yield reader
+
+
+@contextmanager
+def _open_dataset(source: str, version: str) -> Iterator:
+    """Lease a pooled Reader for a dataset already resolved by ``_dataset_version``."""
+    pool = get_dataset_pool()
     try:
-        return get_reader(clean)
+        reader = pool.checkout(source, opener=get_reader, version=version)
     except RasterioIOError as e:
         raise HTTPException(status_code=400, detail=f"RasterioIOError: {e!s}") from e
+    discard = False
+    try:
+        yield reader
+    except RasterioIOError:
+        discard = True
+        raise
+    finally:
+        pool.checkin(source, reader, discard=discard, version=version)
@@ -2,9 +2,23 @@
 Shared utilities for FastAPI routers.
 """
 
+from email.utils import formatdate
+import os
+
+from fastapi import Request
+
 from localtileserver.tiler.data import get_sf_bay_url
 from localtileserver.tiler.utilities import get_clean_filename
 
+# Default ``Cache-Control`` max-age in seconds per image route. ``0`` makes
+# clients revalidate every time, which is cheap thanks to the ETag.
+DEFAULT_CACHE_MAX_AGE = {
+    "tiles": 0,
+    "thumbnail": 0,
+    "part": 0,
+    "data": 0,
+}
+
 
 def get_clean_filename_from_params(filename: str | None = None) -> str:
     """
@@ -89,3 +103,121 @@ def parse_style_params(
         else:
             out["nodata"] = nodata
     return out
+
+
+def cache_headers(request: Request, route: str, key: str, source: str, version: str) -> dict:
+    """
+    Build the HTTP caching headers for a rendered image response.
+
+    Parameters
+    ----------
+    request : fastapi.Request
+        The incoming request; ``request.app.state.cache_max_age`` holds the
+        per-route max-age configuration.
+    route : str
+        Name of the route in the max-age configuration, e.g. ``"tiles"``.
+    key : str
+        Canonical key of the rendered output (see
+        :func:`localtileserver.tiler.cache.make_cache_key`).
+    source : str
+        Cleaned path of the dataset.
+    version : str
+        Version token of the dataset. When empty the dataset contents
+        cannot be tracked, so no validators are emitted.
+
+    Returns
+    -------
+    dict
+        ``Cache-Control`` and, when the dataset is versioned, ``ETag`` and
+        (for local files) ``Last-Modified`` headers.
+    """
+    max_age = getattr(request.app.state, "cache_max_age", DEFAULT_CACHE_MAX_AGE).get(route, 0)
+    headers = {"Cache-Control": f"public, max-age={max_age}" if max_age > 0 else "no-cache"}
+    if version:
+        headers["ETag"] = f'"{key}"'
+        if os.path.isfile(source):
+            headers["Last-Modified"] = formatdate(os.path.getmtime(source), usegmt=True)
+    return headers
+
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    """
+    Return whether the client's cached copy matches the response ETag.
+
+    Parameters
+    ----------
+    request : fastapi.Request
+        The incoming request.
+    headers : dict
+        Response headers from :func:`cache_headers`.
+
+    Returns
+    -------
+    bool
+        ``True`` if ``If-None-Match`` matches and a ``304 Not Modified``
+        should be returned.
+    """
+    etag = headers.get("ETag")
+    if_none_match = request.headers.get("if-none-match")
+    if not etag or not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates or "*" in candidates
+
+
+def _header_allows(value: str, token: str) -> bool:
+    """Return whether a comma-separated header lists *token* with non-zero quality."""
+    for entry in value.split(","):
+        name, *params = (part.strip() for part in entry.split(";"))
+        if name.lower() != token:
+            continue
+        for param in params:
+            key, _, q = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(q) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def accepts_mimetype(request: Request, mimetype: str) -> bool:
+    """
+    Return whether the request's ``Accept`` header explicitly allows a type.
+
+    Wildcards are not considered a match, since clients that send only
+    ``*/*`` or ``image/*`` may not be able to decode newer formats.
+
+    Parameters
+    ----------
+    request : fastapi.Request
+        The incoming request.
+    mimetype : str
+        The media type to look for, e.g. ``"image/webp"``.
+
+    Returns
+    -------
+    bool
+        ``True`` if *mimetype* is listed with a non-zero quality value.
+    """
+    return _header_allows(request.headers.get("accept", ""), mimetype)
+
+
+def accepts_encoding(request: Request, encoding: str) -> bool:
+    """
+    Return whether the request's ``Accept-Encoding`` header allows a coding.
+
+    Parameters
+    ----------
+    request : fastapi.Request
+        The incoming request.
+    encoding : str
+        The content coding to look for, e.g. ``"gzip"``.
+
+    Returns
+    -------
+    bool
+        ``True`` if *encoding* is listed with a non-zero quality value.
+    """
+    return _header_allows(request.headers.get("accept-encoding", ""), encoding)
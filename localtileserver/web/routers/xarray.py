@@ -87,7 +87,7 @@ def xarray_tile_view(
         tile_data = get_xarray_tile(reader, z, x, y, img_format=encoding, indexes=idx)
     except TileOutsideBounds:
         raise HTTPException(status_code=404, detail="Tile outside bounds") from None
-    return Response(content=bytes(tile_data), media_type=f"image/{format.lower()}")
+    return Response(content=tile_data, media_type=f"image/{format.lower()}")
 
 
 @router.get("/thumbnail.{format}")
@@ -108,4 +108,4 @@ def xarray_thumbnail_view(
     if indexes:
         idx = [int(i.strip()) for i in indexes.split(",")]
     thumb = get_xarray_preview(reader, img_format=encoding, max_size=max_size, indexes=idx)
-    return Response(content=bytes(thumb), media_type=f"image/{format.lower()}")
+    return Response(content=thumb, media_type=f"image/{format.lower()}")
@@ -6,9 +6,21 @@ import pytest
 import rasterio
 
 from localtileserver.examples import get_bahamas, get_blue_marble, get_data_path, get_landsat7
+from localtileserver.tiler.cache import get_statistics_cache
+from localtileserver.tiler.pool import get_dataset_pool
+from localtileserver.tiler.profile import clear_dataset_profiles
 from localtileserver.web import create_app
 
 
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    """Keep pooled dataset handles and cached results from leaking between tests."""
+    yield
+    get_dataset_pool().clear()
+    get_statistics_cache().clear()
+    clear_dataset_profiles()
+
+
 @pytest.fixture
 def flask_client():
     """FastAPI test client (name kept for backwards compatibility with existing tests)."""
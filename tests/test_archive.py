@@ -0,0 +1,165 @@
+"""Tests for serving MBTiles and PMTiles archives as tile sources."""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import shutil
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+import pytest
+from rio_tiler.errors import TileOutsideBounds
+
+from localtileserver import TileClient
+from localtileserver.tiler import (
+    archive as archive_module,
+    get_dataset_profile,
+    get_empty_tile,
+    get_reader,
+    get_tile,
+)
+from localtileserver.tiler.archive import TileArchive, get_tile_archive, is_tile_archive
+from localtileserver.tiler.export import export_tiles
+from localtileserver.tiler.mbtiles import MBTiles
+from localtileserver.tiler.utilities import get_clean_filename
+from localtileserver.web import create_app
+
+
+@pytest.fixture(params=[".mbtiles", ".pmtiles"])
+def archive_file(request, tmp_path, bahamas_file):
+    path = tmp_path / f"bahamas{request.param}"
+    export_tiles(bahamas_file, path, [7, 8], workers=2, indexes=[1], colormap="viridis")
+    return str(path)
+
+
+@pytest.fixture
+def bahamas_tile(bahamas_file):
+    with get_reader(bahamas_file) as reader:
+        tile = reader.tms.tile(-77.5, 24.5, 8)
+        return (tile.z, tile.x, tile.y), get_tile(
+            reader, tile.z, tile.x, tile.y, indexes=[1], colormap="viridis"
+        )
+
+
+def test_is_tile_archive():
+    assert is_tile_archive("tiles.MBTiles")
+    assert is_tile_archive("/data/tiles.pmtiles")
+    assert not is_tile_archive("image.tif")
+    with pytest.raises(OSError, match="local files"):
+        get_clean_filename("https://example.com/tiles.pmtiles")
+
+
+def test_tile_archive(archive_file, bahamas_file, bahamas_tile):
+    (z, x, y), expected = bahamas_tile
+    with get_reader(archive_file) as archive:
+        assert isinstance(archive, TileArchive)
+        assert archive.img_format == "PNG"
+        assert (archive.minzoom, archive.maxzoom) == (7, 8)
+        with get_reader(bahamas_file) as reader:
+            expected_bounds = get_dataset_profile(reader).geographic_bounds
+        assert archive.bounds == pytest.approx(expected_bounds, abs=1e-6)
+        assert get_tile(archive, z, x, y, colormap="ignored") == expected
+        assert get_tile(archive, z, x, y).mimetype == "image/png"
+        # Below the zoom range of the archive
+        with pytest.raises(TileOutsideBounds):
+            archive.read_tile(6, x // 4, y // 4)
+        with pytest.raises(TileOutsideBounds):
+            archive.read_tile(8, 0, 0)
+
+
+def test_missing_tile_is_empty(tmp_path):
+    path = tmp_path / "sparse.mbtiles"
+    with MBTiles(path, mode="a") as archive:
+        archive.put_tiles([(3, 1, 2, b"stored")])
+        archive.update_metadata(format="png", minzoom=3, maxzoom=3)
+    with TileArchive(path) as archive:
+        assert archive.bounds[0] == -180.0
+        assert archive.read_tile(3, 1, 2) == b"stored"
+        assert archive.read_tile(3, 2, 2) == get_empty_tile("PNG")
+
+
+def test_tile_archive_threads(archive_file, bahamas_tile):
+    (z, x, y), expected = bahamas_tile
+    with get_tile_archive(archive_file) as archive:
+        with get_tile_archive(archive_file) as again:
+            assert again is archive
+        with ThreadPoolExecutor(8) as executor:
+            tiles = list(executor.map(lambda _: archive.read_tile(z, x, y), range(200)))
+    assert all(tile == expected for tile in tiles)
+
+
+@pytest.fixture
+def archives(monkeypatch):
+    monkeypatch.setattr(archive_module, "_ARCHIVES", OrderedDict())
+    monkeypatch.setattr(archive_module, "_MAX_ARCHIVES", 1)
+
+
+def _spy_close(monkeypatch, archive):
+    close = MagicMock(wraps=archive.close)
+    monkeypatch.setattr(archive, "close", close)
+    return close
+
+
+def test_tile_archive_closed_when_replaced(archives, archive_file, monkeypatch):
+    lease = get_tile_archive(archive_file, version="1")
+    old = lease.__enter__()
+    close = _spy_close(monkeypatch, old)
+    with get_tile_archive(archive_file, version="2") as new:
+        assert new is not old
+    # Still being read
+    close.assert_not_called()
+    lease.__exit__(None, None, None)
+    close.assert_called_once()
+    # Replaced and unused archives are closed at once
+    with get_tile_archive(archive_file, version="2") as new:
+        close = _spy_close(monkeypatch, new)
+    with get_tile_archive(archive_file, version="3"):
+        pass
+    close.assert_called_once()
+
+
+def test_tile_archive_closed_when_evicted(archives, archive_file, tmp_path, monkeypatch):
+    other = tmp_path / f"other{archive_file[-8:]}"
+    shutil.copy(archive_file, other)
+    with get_tile_archive(archive_file) as first:
+        close = _spy_close(monkeypatch, first)
+    with get_tile_archive(other):
+        pass
+    close.assert_called_once()
+    assert [path for path, _ in archive_module._ARCHIVES] == [str(other)]
+
+
+def test_serve_archive(archive_file, bahamas_tile):
+    (z, x, y), expected = bahamas_tile
+    app = create_app()
+    with TestClient(app) as client:
+        params = {"filename": archive_file}
+        # The stored encoding is served whatever the requested extension
+        r = client.get(f"/api/tiles/{z}/{x}/{y}.jpeg", params=params)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "image/png"
+        assert r.content == expected
+        assert "ETag" in r.headers
+        r = client.get("/api/tiles/8/0/0.png", params=params)
+        assert r.status_code == 404
+        r = client.get("/api/bounds", params=params)
+        assert r.status_code == 200
+        assert r.json()["left"] == pytest.approx(-78.96, abs=1e-2)
+        r = client.get("/api/metadata", params=params)
+        assert r.json()["maxzoom"] == 8
+        r = client.post(
+            f"/api/tiles/batch.png?filename={archive_file}", json={"tiles": [[z, x, y]]}
+        )
+        assert r.headers["X-Tile-Format"] == "png"
+
+
+def test_client_archive(archive_file, bahamas_tile):
+    (z, x, y), expected = bahamas_tile
+    client = TileClient(archive_file)
+    try:
+        assert client.filename == archive_file
+        assert (client.min_zoom, client.max_zoom) == (7, 8)
+        assert client.tile(z, x, y) == expected
+        bottom, top, left, right = client.bounds()
+        assert left < -77.5 < right and bottom < 24.5 < top
+    finally:
+        client.shutdown(force=True)
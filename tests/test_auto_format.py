@@ -0,0 +1,75 @@
+"""Tests for the ``auto`` tile format."""
+
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+
+from localtileserver import TileClient
+from localtileserver.tiler.handler import _auto_format
+from localtileserver.web import create_app
+
+OPAQUE_TILE = "/api/tiles/10/289/441.auto"
+EDGE_TILE = "/api/tiles/8/72/110.auto"
+
+
+def test_auto_format_choice():
+    data = np.zeros((3, 4, 4), dtype=np.uint8)
+    opaque = np.full((4, 4), 255, dtype=np.uint8)
+    partial = opaque.copy()
+    partial[0, 0] = 0
+    assert _auto_format(data, opaque) == "JPEG"
+    assert _auto_format(data, partial) == "PNG"
+    assert _auto_format(data.astype(np.uint16), opaque) == "PNG"
+    assert _auto_format(np.zeros((2, 4, 4), dtype=np.uint8), opaque) == "PNG"
+
+
+def test_auto_opaque_tile_is_jpeg(flask_client, bahamas_file):
+    r = flask_client.get(f"{OPAQUE_TILE}?filename={bahamas_file}")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/jpeg"
+    assert r.headers["vary"] == "Accept"
+    assert r.content[:3] == b"\xff\xd8\xff"
+
+
+def test_auto_transparent_tile_is_png(flask_client, bahamas_file):
+    r = flask_client.get(f"{EDGE_TILE}?filename={bahamas_file}")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/png"
+    assert r.headers["vary"] == "Accept"
+    assert r.content[:4] == b"\x89PNG"
+
+
+@pytest.mark.parametrize("tile", [OPAQUE_TILE, EDGE_TILE])
+def test_auto_prefers_webp(flask_client, bahamas_file, tile):
+    url = f"{tile}?filename={bahamas_file}"
+    r = flask_client.get(url, headers={"Accept": "image/avif,image/webp,*/*"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/webp"
+    assert r.headers["vary"] == "Accept"
+    # Each variant has its own validator
+    assert r.headers["etag"] != flask_client.get(url).headers["etag"]
+
+
+def test_explicit_format_does_not_vary(flask_client, bahamas_file):
+    r = flask_client.get(f"/api/tiles/10/289/441.png?filename={bahamas_file}")
+    assert r.status_code == 200
+    assert "vary" not in r.headers
+
+
+def test_auto_cached_media_type(bahamas_file):
+    with TestClient(create_app(tile_cache_size=2**20)) as client:
+        for _ in range(2):
+            r = client.get(f"{OPAQUE_TILE}?filename={bahamas_file}")
+            assert r.headers["content-type"] == "image/jpeg"
+        assert client.get("/api/cache/stats").json()["tiles"]["hits"] == 1
+
+
+def test_get_tile_url_encoding(bahamas_file):
+    tile_client = TileClient(bahamas_file)
+    try:
+        assert "{z}/{x}/{y}.png" in tile_client.get_tile_url()
+        assert "{z}/{x}/{y}.auto" in tile_client.get_tile_url(encoding="auto")
+        with pytest.raises(ValueError):
+            tile_client.get_tile_url(encoding="bmp")
+    finally:
+        tile_client.shutdown(force=True)
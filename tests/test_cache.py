@@ -0,0 +1,201 @@
+"""Tests for the shared caches in localtileserver.tiler.cache."""
+
+import concurrent.futures
+import os
+import shutil
+import threading
+import time
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import pytest
+
+from localtileserver.tiler import get_dataset_version
+from localtileserver.tiler.cache import (
+    SingleFlight,
+    StatisticsCache,
+    TileCache,
+    get_render_flight,
+    make_cache_key,
+)
+from localtileserver.tiler.handler import get_reader, get_statistics, get_tile
+from localtileserver.web import create_app
+
+
+@pytest.fixture
+def bahamas_copy(bahamas_file, tmp_path):
+    path = tmp_path / "bahamas.tif"
+    shutil.copy(bahamas_file, path)
+    return path
+
+
+# --- SingleFlight ---
+
+
+def test_single_flight_collapses_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def _work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return "value"
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
+        first = ex.submit(flight.do, "key", _work)
+        started.wait(timeout=5)
+        others = [ex.submit(flight.do, "key", _work) for _ in range(3)]
+        results = [first.result()] + [f.result() for f in others]
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert flight.collapsed == 3
+
+
+def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+
+    def _fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        flight.do("key", _fail)
+    # The failed call is not remembered
+    assert flight.do("key", lambda: 1) == 1
+
+
+# --- get_dataset_version ---
+
+
+def test_dataset_version_changes_with_mtime(bahamas_copy):
+    before = get_dataset_version(bahamas_copy)
+    st = os.stat(bahamas_copy)
+    os.utime(bahamas_copy, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert get_dataset_version(bahamas_copy) != before
+
+
+def test_dataset_version_unknown_for_vsi():
+    assert get_dataset_version("/vsis3/bucket/key.tif") == ""
+
+
+# --- StatisticsCache ---
+
+
+def test_statistics_cache_hit(bahamas_file):
+    cache = StatisticsCache()
+    reader = get_reader(bahamas_file)
+    first = cache.get(reader, indexes=[1])
+    second = cache.get(reader, indexes=[1])
+    assert first is second
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    # Different parameters are separate entries
+    cache.get(reader, indexes=[2])
+    cache.get(reader, expression="b1+b2")
+    assert cache.stats()["entries"] == 3
+
+
+def test_statistics_cache_invalidated_by_mtime(bahamas_copy):
+    cache = StatisticsCache()
+    reader = get_reader(bahamas_copy)
+    first = cache.get(reader, indexes=[1])
+    st = os.stat(bahamas_copy)
+    os.utime(bahamas_copy, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(reader, indexes=[1]) is not first
+
+
+def test_statistics_cache_lru_bound(bahamas_file):
+    cache = StatisticsCache(max_entries=2)
+    reader = get_reader(bahamas_file)
+    for i in (1, 2, 3):
+        cache.get(reader, indexes=[i])
+    assert cache.stats()["entries"] == 2
+
+
+def test_tile_statistics_computed_once(bahamas_file, monkeypatch):
+    reader = get_reader(bahamas_file)
+    calls = []
+    original = reader.statistics
+
+    def _counting_statistics(*args, **kwargs):
+        calls.append(kwargs)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(reader, "statistics", _counting_statistics)
+    for _ in range(3):
+        get_tile(reader, 8, 72, 110, indexes=[1], colormap="viridis", stretch="minmax")
+        get_tile(reader, 8, 72, 110, indexes=[1], vmin=10)
+    get_statistics(reader, indexes=[1])
+    assert len(calls) == 1
+
+
+def test_tile_cache_lru_byte_budget():
+    cache = TileCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+    # "b" is now least recently used and makes room for "c"
+    cache.put("c", b"123")
+    assert cache.get("b") is None
+    assert cache.get("c") == b"123"
+    # Payloads larger than the budget are never stored
+    cache.put("d", b"x" * 11)
+    assert cache.get("d") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 8
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+
+
+def test_make_cache_key_canonical():
+    key = make_cache_key("a.tif", "v1", tile=(1, 2, 3), indexes=[1, 2], colormap=None)
+    assert key == make_cache_key("a.tif", "v1", indexes=[1, 2], tile=(1, 2, 3))
+    assert key != make_cache_key("a.tif", "v2", indexes=[1, 2], tile=(1, 2, 3))
+    assert key != make_cache_key("a.tif", "v1", indexes=[2, 1], tile=(1, 2, 3))
+
+
+def test_tile_endpoint_cache_skips_dataset(bahamas_file):
+    app = create_app(tile_cache_size=2**20)
+    with TestClient(app) as client:
+        url = f"/api/tiles/8/72/110.png?filename={bahamas_file}"
+        first = client.get(url)
+        with patch("localtileserver.web.routers.tiles.get_tile") as get_tile:
+            second = client.get(url)
+            get_tile.assert_not_called()
+        assert second.content == first.content
+        # A different style is a different entry
+        assert client.get(url + "&colormap=viridis").status_code == 200
+        stats = client.get("/api/cache/stats").json()
+    assert stats["tiles"]["hits"] == 1
+    assert stats["tiles"]["misses"] == 2
+    assert stats["dataset_pool"]["misses"] == 1
+    assert stats["dataset_pool"]["hits"] == 1
+
+
+def test_tile_cache_disabled_by_default(flask_client):
+    assert flask_client.get("/api/cache/stats").json()["tiles"] is None
+
+
+def test_identical_tile_requests_render_once(flask_client, bahamas_file):
+    flight = get_render_flight()
+    before = flight.collapsed
+    calls = []
+
+    def _slow_tile(*args, **kwargs):
+        calls.append(1)
+        # Hold the render until the other requests are waiting on it
+        deadline = time.monotonic() + 5
+        while flight.collapsed < before + 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return b"tile"
+
+    url = f"/api/tiles/8/72/110.png?filename={bahamas_file}"
+    with patch("localtileserver.web.routers.tiles.get_tile", side_effect=_slow_tile):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
+            responses = list(ex.map(lambda _: flask_client.get(url), range(4)))
+    assert [r.content for r in responses] == [b"tile"] * 4
+    assert len(calls) == 1
+    stats = flask_client.get("/api/cache/stats").json()
+    assert stats["renders"]["collapsed"] == before + 3
@@ -0,0 +1,112 @@
+"""Tests for serving COG copies of GeoTIFFs that are not Cloud Optimized."""
+
+import os
+
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_bounds
+from rio_cogeo import cog_validate
+
+from localtileserver.tiler.cog import CogConverter
+from localtileserver.web import create_app
+
+
+@pytest.fixture
+def striped_file(tmp_path):
+    # Striped and without overviews
+    path = tmp_path / "striped.tif"
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=1024,
+        height=1024,
+        count=1,
+        dtype="uint16",
+        crs="EPSG:3857",
+        transform=from_bounds(0, 0, 10240, 10240, 1024, 1024),
+    ) as dst:
+        dst.write(np.arange(1024 * 1024, dtype="uint16").reshape(1, 1024, 1024))
+    return str(path)
+
+
+@pytest.fixture
+def converter(tmp_path):
+    converter = CogConverter(cache_dir=tmp_path / "cog")
+    yield converter
+    converter.close()
+
+
+def test_convert(converter, striped_file):
+    assert converter.resolve(striped_file) == striped_file
+    assert converter.status(striped_file) == "pending"
+    assert converter.wait(timeout=60)
+    assert converter.status(striped_file) == "converted"
+    copy = converter.resolve(striped_file)
+    assert copy != striped_file
+    assert cog_validate(copy, strict=True, quiet=True)[0]
+    with rasterio.open(striped_file) as src, rasterio.open(copy) as dst:
+        np.testing.assert_array_equal(src.read(), dst.read())
+        assert dst.overviews(1)
+    assert converter.stats()["converted"] == 1
+    # Copies made earlier are reused
+    assert CogConverter(cache_dir=converter.cache_dir).resolve(striped_file) == copy
+
+
+def test_modified_source(converter, striped_file):
+    converter.resolve(striped_file)
+    converter.wait(timeout=60)
+    old = converter.resolve(striped_file)
+    stat = os.stat(striped_file)
+    os.utime(striped_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # The original is served until the new version is converted
+    assert converter.resolve(striped_file) == striped_file
+    converter.wait(timeout=60)
+    new = converter.resolve(striped_file)
+    assert new not in (old, striped_file)
+    assert not os.path.exists(old)
+
+
+def test_not_converted(converter, bahamas_file, tmp_path):
+    # Already a COG
+    bahamas_file = str(bahamas_file)
+    assert converter.resolve(bahamas_file) == bahamas_file
+    converter.wait(timeout=60)
+    assert converter.status(bahamas_file) == "cog"
+    assert converter.resolve(bahamas_file) == bahamas_file
+    # Not a local GeoTIFF
+    for path in ("https://example.com/image.tif", "blue_marble", str(tmp_path / "missing.tif")):
+        assert converter.resolve(path) == path
+        assert converter.status(path) is None
+    # Unreadable
+    broken = tmp_path / "broken.tif"
+    broken.write_bytes(b"not a tiff")
+    converter.resolve(broken)
+    converter.wait(timeout=60)
+    assert converter.status(broken) == "failed"
+    assert converter.resolve(broken) == str(broken)
+    with pytest.raises(KeyError):
+        CogConverter(profile="bogus")
+
+
+def test_serve_converted(converter, striped_file):
+    app = create_app(convert_to_cog=True)
+    app.state.cog_converter = converter
+    params = {"filename": striped_file, "colormap": "viridis"}
+    with TestClient(app) as client:
+        first = client.get("/api/tiles/14/8192/8191.png", params=params)
+        assert first.status_code == 200
+        converter.wait(timeout=60)
+        second = client.get("/api/tiles/14/8192/8191.png", params=params)
+        assert second.status_code == 200
+        # The copy is a new dataset version
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert second.content == first.content
+        assert client.get("/api/metadata", params=params).json()["filename"] != striped_file
+        # Validation reports on the requested file
+        assert client.get("/api/validate", params=params).status_code == 415
+        stats = client.get("/api/cache/stats").json()
+        assert stats["cog_conversion"]["converted"] == 1
+    assert create_app().state.cog_converter is None
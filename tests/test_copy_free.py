@@ -0,0 +1,82 @@
+"""Micro-benchmarks for the copy-free render -> response path."""
+
+import tracemalloc
+from unittest.mock import patch
+
+import numpy as np
+from rio_tiler.utils import render
+from starlette.requests import Request
+from starlette.responses import Response
+
+from localtileserver.tiler import ImageBytes
+from localtileserver.tiler.handler import _encode
+from localtileserver.web import create_app
+from localtileserver.web.routers.tiles import tile_view
+
+
+def _peak_allocation(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def test_encode_matches_rio_render():
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, size=(3, 256, 256), dtype=np.uint8)
+    mask = np.full((256, 256), 255, dtype=np.uint8)
+    payload = _encode(data, mask, "PNG")
+    assert isinstance(payload, ImageBytes)
+    assert payload.mimetype == "image/png"
+    assert payload == render(data, mask, img_format="PNG")
+
+
+def test_response_does_not_copy_payload():
+    # Noise does not compress, so the encoded payload is large (~3 MB)
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 256, size=(3, 1024, 1024), dtype=np.uint8)
+    payload = _encode(data, None, "PNG")
+
+    # Previously the routers wrapped the payload in bytes(), a full copy
+    before = _peak_allocation(lambda: Response(content=bytes(payload)))
+    after = _peak_allocation(lambda: Response(content=payload))
+    assert before >= len(payload)
+    assert after < 0.01 * len(payload)
+
+
+def test_tile_response_body_is_rendered_payload(bahamas_file):
+    payload = ImageBytes(b"\x89PNG rendered tile", mimetype="image/png")
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/tiles/8/72/110.png",
+            "headers": [],
+            "query_string": b"",
+            "app": create_app(),
+        }
+    )
+    with patch("localtileserver.web.routers.tiles.get_tile", return_value=payload):
+        response = tile_view(
+            request,
+            8,
+            72,
+            110,
+            "png",
+            filename=str(bahamas_file),
+            indexes=None,
+            colormap=None,
+            vmin=None,
+            vmax=None,
+            nodata=None,
+            expression=None,
+            stretch=None,
+            quality=None,
+            compression_level=None,
+            lossless=None,
+        )
+    # The encoded buffer reaches the HTTP body without another copy
+    assert response.body is payload
@@ -0,0 +1,105 @@
+"""Tests for raw numeric data tiles."""
+
+import io
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from localtileserver.tiler import get_data_path, get_data_tile, get_reader
+
+TILE = "/api/data/8/72/110.npy"
+
+
+def _load(content):
+    return np.load(io.BytesIO(content))
+
+
+def test_get_data_tile(bahamas_file):
+    with get_reader(bahamas_file) as reader:
+        raw = reader.tile(72, 110, 8, indexes=[1, 2, 3])
+        band = reader.tile(72, 110, 8, indexes=[1])
+        with patch("localtileserver.tiler.handler._band_statistics") as stats:
+            tile = get_data_tile(reader, 8, 72, 110)
+            stats.assert_not_called()
+        half = get_data_tile(reader, 8, 72, 110, indexes=[1], dtype="float16")
+    arr = _load(tile)
+    assert tile.mimetype == "application/x-npy"
+    assert arr.shape == (4, 256, 256)
+    assert arr.dtype == raw.data.dtype
+    np.testing.assert_array_equal(arr[:3], raw.data)
+    np.testing.assert_array_equal(arr[3], raw.mask)
+    arr = _load(half)
+    assert arr.dtype == np.float16
+    assert arr.shape == (2, 256, 256)
+    np.testing.assert_array_equal(arr[0], band.data[0].astype(np.float16))
+
+
+def test_get_data_tile_invalid_dtype(bahamas_file):
+    with get_reader(bahamas_file) as reader, pytest.raises(ValueError):
+        get_data_tile(reader, 8, 72, 110, dtype="complex64")
+
+
+def test_data_tile_endpoint(flask_client, bahamas_file):
+    r = flask_client.get(f"{TILE}?filename={bahamas_file}&indexes=1,2&dtype=float32")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-npy"
+    assert "content-encoding" not in r.headers
+    arr = _load(r.content)
+    assert arr.shape == (3, 256, 256)
+    assert arr.dtype == np.float32
+    assert set(np.unique(arr[2])) <= {0, 255}
+
+
+def test_data_tile_expression(flask_client, bahamas_file):
+    r = flask_client.get(f"{TILE}?filename={bahamas_file}&expression=b1*2.0")
+    assert r.status_code == 200
+    arr = _load(r.content)
+    plain = _load(flask_client.get(f"{TILE}?filename={bahamas_file}&indexes=1").content)
+    valid = arr[1] > 0
+    np.testing.assert_allclose(arr[0][valid], plain[0][valid] * 2.0)
+
+
+def test_data_tile_gzip(flask_client, bahamas_file):
+    url = f"{TILE}?filename={bahamas_file}&compress=true&compression_level=1"
+    raw = flask_client.get(
+        f"{TILE}?filename={bahamas_file}", headers={"Accept-Encoding": "identity"}
+    )
+    r = flask_client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    # The test client transparently decodes the body
+    assert r.content == raw.content
+    assert int(r.headers["content-length"]) < len(raw.content)
+    # Clients that cannot decode gzip get the plain payload
+    r = flask_client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.content == raw.content
+
+
+@pytest.mark.parametrize(
+    "params",
+    ["dtype=complex64", "compression_level=0", "compress=true&compression_level=10"],
+)
+def test_data_tile_bad_params(flask_client, bahamas_file, params):
+    r = flask_client.get(f"{TILE}?filename={bahamas_file}&{params}")
+    assert r.status_code == 400
+
+
+def test_data_tile_outside_bounds(flask_client, bahamas_file):
+    r = flask_client.get(f"/api/data/8/0/0.npy?filename={bahamas_file}")
+    assert r.status_code == 404
+
+
+def test_data_tile_float_mask():
+    with get_reader(get_data_path("co_elevation_roi.tif")) as reader:
+        arr = _load(get_data_tile(reader, 12, 829, 1565, dtype="float16"))
+    assert arr.dtype == np.float16
+    assert set(np.unique(arr[1])) == {0, 255}
+    assert np.isfinite(arr[0][arr[1] == 255]).all()
+
+
+def test_data_tile_missing_file(flask_client, tmp_path):
+    r = flask_client.get(TILE, params={"filename": str(tmp_path / "missing.tif")})
+    assert r.status_code == 400
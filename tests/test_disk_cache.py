@@ -0,0 +1,150 @@
+"""Tests for the persistent tile cache in localtileserver.tiler.disk_cache."""
+
+import concurrent.futures
+import sqlite3
+
+from fastapi.testclient import TestClient
+import pytest
+
+from localtileserver.tiler import purge_cache
+from localtileserver.tiler.disk_cache import DiskTileCache
+from localtileserver.web import create_app
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "localtileserver.tiler.utilities.tempfile.gettempdir", lambda: str(tmp_path)
+    )
+    return tmp_path / "localtileserver"
+
+
+def test_disk_cache_persists(tmp_path):
+    path = tmp_path / "tiles.sqlite"
+    cache = DiskTileCache(1000, path=path)
+    cache.put("a", b"tile", source="a.tif", version="1")
+    cache.close()
+    # A new instance, e.g. after a restart, sees the entry
+    reopened = DiskTileCache(1000, path=path)
+    assert reopened.get("a") == b"tile"
+    assert reopened.get("b") is None
+    stats = reopened.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 4
+    reopened.close()
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = DiskTileCache(10, path=tmp_path / "tiles.sqlite")
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") is not None
+    cache.put("c", b"123")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_disk_cache_lfu_eviction(tmp_path):
+    cache = DiskTileCache(10, path=tmp_path / "tiles.sqlite", policy="lfu")
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    for _ in range(3):
+        cache.get("a")
+    cache.get("b")
+    cache.get("b")
+    # "a" was used last but "b" less often
+    cache.get("a")
+    cache.put("c", b"123")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    cache.close()
+
+
+def test_disk_cache_buffers_hits(tmp_path):
+    path = tmp_path / "tiles.sqlite"
+    cache = DiskTileCache(1000, path=path, flush_hits=3, flush_interval=3600)
+
+    def _hits():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT hits FROM tiles WHERE key = 'a'").fetchone()[0]
+
+    cache.put("a", b"tile")
+    cache.get("a")
+    cache.get("a")
+    # Hits are not written until enough are buffered
+    assert _hits() == 0
+    cache.get("a")
+    assert _hits() == 3
+    cache.get("a")
+    cache.flush()
+    assert _hits() == 4
+    cache.get("a")
+    cache.close()
+    assert _hits() == 5
+
+
+def test_disk_cache_invalid_policy(tmp_path):
+    with pytest.raises(ValueError):
+        DiskTileCache(10, path=tmp_path / "tiles.sqlite", policy="fifo")
+
+
+def test_disk_cache_drops_outdated_versions(tmp_path):
+    cache = DiskTileCache(1000, path=tmp_path / "tiles.sqlite")
+    cache.put("old", b"old", source="a.tif", version="1")
+    cache.put("other", b"other", source="b.tif", version="1")
+    cache.put("new", b"new", source="a.tif", version="2")
+    assert cache.get("old") is None
+    assert cache.get("other") == b"other"
+    assert cache.get("new") == b"new"
+    assert cache.stats()["bytes"] == 8
+    cache.close()
+
+
+def test_disk_cache_concurrent_writers(tmp_path):
+    path = tmp_path / "tiles.sqlite"
+    caches = [DiskTileCache(500, path=path) for _ in range(4)]
+
+    def _write(i):
+        cache = caches[i % len(caches)]
+        cache.put(f"tile-{i}", bytes(20), source="a.tif", version="1")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(_write, range(100)))
+    stats = caches[0].stats()
+    assert stats["bytes"] <= 500
+    assert stats["bytes"] == stats["entries"] * 20
+    for cache in caches:
+        cache.close()
+
+
+def test_purge_cache_clears_disk_cache(cache_dir):
+    cache = DiskTileCache(1000)
+    assert cache.path.parent == cache_dir
+    cache.put("a", b"tile")
+    purge_cache()
+    assert cache.get("a") is None
+    cache.close()
+
+
+def test_tile_endpoint_disk_cache(cache_dir, bahamas_file):
+    url = f"/api/tiles/8/72/110.png?filename={bahamas_file}"
+    app = create_app(disk_cache_size=2**20)
+    with TestClient(app) as client:
+        first = client.get(url)
+        assert first.status_code == 200
+    app.state.disk_cache.close()
+    # A fresh app (e.g. after a restart) is served from disk
+    app = create_app(disk_cache_size=2**20)
+    with TestClient(app) as client:
+        assert client.get(url).content == first.content
+        stats = client.get("/api/cache/stats").json()
+    assert stats["disk_tiles"]["hits"] == 1
+    # The dataset was only opened for the first request
+    assert stats["dataset_pool"]["misses"] == 1
+    assert stats["dataset_pool"]["hits"] == 0
+    app.state.disk_cache.close()
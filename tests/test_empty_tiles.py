@@ -0,0 +1,89 @@
+"""Tests for short-circuiting tiles without valid pixels."""
+
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_bounds
+
+from localtileserver.tiler import get_empty_tile, get_reader, get_tile
+from localtileserver.web import create_app
+
+EMPTY_TILE = (8, 127, 127)
+DATA_TILE = (8, 128, 127)
+
+
+@pytest.fixture
+def half_nodata_file(tmp_path):
+    """A raster around (0, 0) whose western half is nodata."""
+    path = tmp_path / "half_nodata.tif"
+    data = np.zeros((1, 256, 256), dtype=np.uint8)
+    data[:, :, 128:] = 200
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=256,
+        height=256,
+        count=1,
+        dtype="uint8",
+        crs="EPSG:4326",
+        transform=from_bounds(-1, -1, 1, 1, 256, 256),
+        nodata=0,
+    ) as dst:
+        dst.write(data)
+    return path
+
+
+@pytest.mark.parametrize("fmt", ["PNG", "JPEG", "WEBP", "AUTO"])
+def test_get_empty_tile_is_shared(fmt):
+    tile = get_empty_tile(fmt)
+    assert tile is get_empty_tile(fmt.lower())
+    assert get_empty_tile(fmt, 512, 512) != tile
+
+
+def test_get_empty_tile_invalid_format():
+    with pytest.raises(ValueError):
+        get_empty_tile("GTiff")
+
+
+def test_empty_tile_skips_rendering(half_nodata_file):
+    with (
+        get_reader(half_nodata_file) as reader,
+        patch("localtileserver.tiler.handler._apply_stretch") as stretch,
+    ):
+        tile = get_tile(reader, *EMPTY_TILE, colormap="viridis", stretch="equalize")
+        stretch.assert_not_called()
+        data_tile = get_tile(reader, *DATA_TILE, colormap="viridis")
+    assert tile is get_empty_tile("PNG")
+    assert data_tile != get_empty_tile("PNG")
+
+
+def test_empty_tile_endpoint(flask_client, half_nodata_file):
+    z, x, y = EMPTY_TILE
+    r = flask_client.get(f"/api/tiles/{z}/{x}/{y}.png?filename={half_nodata_file}")
+    assert r.status_code == 200
+    assert r.content == get_empty_tile("PNG")
+
+
+def test_empty_tile_no_content(half_nodata_file):
+    with TestClient(create_app(empty_tile_status=204)) as client:
+        for fmt in ("png", "jpeg", "webp", "auto"):
+            z, x, y = EMPTY_TILE
+            r = client.get(f"/api/tiles/{z}/{x}/{y}.{fmt}?filename={half_nodata_file}")
+            assert r.status_code == 204
+            assert r.content == b""
+            z, x, y = DATA_TILE
+            r = client.get(f"/api/tiles/{z}/{x}/{y}.{fmt}?filename={half_nodata_file}")
+            assert r.status_code == 200
+        # Data formats always carry the values
+        z, x, y = EMPTY_TILE
+        r = client.get(f"/api/tiles/{z}/{x}/{y}.npy?filename={half_nodata_file}")
+        assert r.status_code == 200
+
+
+def test_invalid_empty_tile_status():
+    with pytest.raises(ValueError):
+        create_app(empty_tile_status=404)
@@ -0,0 +1,97 @@
+"""Tests for PNG, JPEG and WEBP encoder options."""
+
+from fastapi.testclient import TestClient
+import pytest
+
+from localtileserver.tiler import get_encoder_options
+from localtileserver.web import create_app
+
+
+def test_get_encoder_options():
+    assert get_encoder_options("PNG") == {}
+    assert get_encoder_options("PNG", quality=50, compression_level=1) == {"ZLEVEL": 1}
+    assert get_encoder_options("JPEG", quality=50, compression_level=1) == {"QUALITY": 50}
+    assert get_encoder_options("WEBP", quality=50, lossless=True) == {
+        "QUALITY": 50,
+        "LOSSLESS": "TRUE",
+    }
+    assert get_encoder_options("GTiff", quality=50, compression_level=1, lossless=True) == {}
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"quality": 0}, {"quality": 101}, {"compression_level": 0}, {"compression_level": 10}],
+)
+def test_get_encoder_options_out_of_range(kwargs):
+    with pytest.raises(ValueError):
+        get_encoder_options("PNG", **kwargs)
+
+
+@pytest.mark.parametrize(
+    "route",
+    [
+        "/api/tiles/8/72/110.{fmt}",
+        "/api/thumbnail.{fmt}",
+        "/api/part.{fmt}?bbox=-78,24,-77.5,24.5&bounds_crs=EPSG:4326",
+    ],
+)
+def test_quality_changes_output(flask_client, bahamas_file, route):
+    url = route.format(fmt="jpeg")
+    url += f"{'&' if '?' in url else '?'}filename={bahamas_file}"
+    low = flask_client.get(url + "&quality=5")
+    high = flask_client.get(url + "&quality=95")
+    assert low.status_code == high.status_code == 200
+    assert low.headers["content-type"] == "image/jpeg"
+    assert len(low.content) < len(high.content)
+    # Distinct settings must not share cache validators
+    assert low.headers["etag"] != high.headers["etag"]
+
+
+def test_png_compression_level(flask_client, bahamas_file):
+    url = f"/api/tiles/8/72/110.png?filename={bahamas_file}"
+    fast = flask_client.get(url + "&compression_level=1")
+    small = flask_client.get(url + "&compression_level=9")
+    assert fast.status_code == small.status_code == 200
+    assert len(small.content) < len(fast.content)
+
+
+def test_webp_lossless(flask_client, bahamas_file):
+    url = f"/api/tiles/8/72/110.webp?filename={bahamas_file}"
+    lossy = flask_client.get(url + "&quality=10")
+    lossless = flask_client.get(url + "&lossless=true")
+    assert lossy.status_code == lossless.status_code == 200
+    assert len(lossy.content) < len(lossless.content)
+
+
+def test_feature_quality(flask_client, bahamas_file):
+    geojson = {
+        "type": "Polygon",
+        "coordinates": [[[-78, 24], [-77.5, 24], [-77.5, 24.5], [-78, 24.5], [-78, 24]]],
+    }
+    url = f"/api/feature.jpeg?filename={bahamas_file}"
+    low = flask_client.post(url + "&quality=5", json=geojson)
+    high = flask_client.post(url + "&quality=95", json=geojson)
+    assert low.status_code == high.status_code == 200
+    assert len(low.content) < len(high.content)
+
+
+def test_invalid_encoder_option(flask_client, bahamas_file):
+    r = flask_client.get(f"/api/tiles/8/72/110.jpeg?filename={bahamas_file}&quality=500")
+    assert r.status_code == 400
+    assert "quality" in r.json()["detail"]
+
+
+def test_server_default_encoder_options(bahamas_file):
+    url = f"/api/tiles/8/72/110.jpeg?filename={bahamas_file}"
+    with TestClient(create_app()) as client:
+        default = client.get(url).content
+        explicit = client.get(url + "&quality=5").content
+    with TestClient(create_app(encoder_options={"quality": 5})) as client:
+        assert client.get(url).content == explicit
+        # Request parameters override the server defaults
+        assert client.get(url + "&quality=75").content == default
+
+
+def test_invalid_server_default_encoder_options():
+    with pytest.raises(ValueError):
+        create_app(encoder_options={"compression_level": 12})
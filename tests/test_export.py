@@ -0,0 +1,182 @@
+"""Tests for exporting tile pyramids to MBTiles and PMTiles archives."""
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_bounds
+
+from localtileserver import TileClient
+from localtileserver.tiler import get_reader, get_statistics_cache, get_tile
+from localtileserver.tiler.export import export_tiles
+from localtileserver.tiler.mbtiles import MBTiles
+from localtileserver.tiler.pmtiles import (
+    PMTiles,
+    PMTilesWriter,
+    tileid_to_zxy,
+    zxy_to_tileid,
+)
+
+
+@pytest.fixture
+def constant_file(tmp_path):
+    # Interior tiles of a constant raster render identically
+    path = tmp_path / "constant.tif"
+    with rasterio.open(
+        path,
+        "w",
+        driver="GTiff",
+        width=512,
+        height=512,
+        count=1,
+        dtype="uint8",
+        crs="EPSG:4326",
+        transform=from_bounds(-10, -10, 10, 10, 512, 512),
+    ) as dst:
+        dst.write(np.full((1, 512, 512), 100, dtype="uint8"))
+    return str(path)
+
+
+def test_tile_ids():
+    # Values from the PMTiles specification
+    tiles = [(0, 0, 0), (1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0), (2, 0, 0)]
+    assert [zxy_to_tileid(*tile) for tile in tiles] == [0, 1, 2, 3, 4, 5]
+    for tile in [(0, 0, 0), (5, 3, 17), (12, 4095, 0), (20, 123456, 654321)]:
+        assert tileid_to_zxy(zxy_to_tileid(*tile)) == tile
+
+
+def test_pmtiles_roundtrip(tmp_path):
+    path = tmp_path / "tiles.pmtiles"
+    tiles = {}
+    with PMTilesWriter(path, "PNG") as writer:
+        for z in range(9):
+            for x in range(2**z):
+                for y in range(2**z):
+                    data = b"same" if (x + y) % 3 else f"{z}/{x}/{y}".encode()
+                    writer.put_tile(z, x, y, data)
+                    tiles[(z, x, y)] = data
+    with PMTiles(path) as archive:
+        # Large enough to need leaf directories
+        assert archive._leaf_length > 0
+        assert archive.img_format == "PNG"
+        assert (archive.minzoom, archive.maxzoom) == (0, 8)
+        assert all(archive.get_tile(*tile) == data for tile, data in tiles.items())
+        assert archive.get_tile(9, 0, 0) is None
+    # Repeated contents are stored once
+    distinct = sum(len(data) for data in set(tiles.values()))
+    assert path.stat().st_size < distinct + 64 * 1024
+
+
+def test_pmtiles_invalid(tmp_path):
+    path = tmp_path / "bad.pmtiles"
+    path.write_bytes(b"not a pmtiles archive" * 10)
+    with pytest.raises(ValueError, match="not a PMTiles"):
+        PMTiles(path)
+    with pytest.raises(ValueError, match="PMTiles supports"):
+        PMTilesWriter(tmp_path / "x.pmtiles", "GTIFF")
+
+
+@pytest.mark.parametrize("suffix", [".mbtiles", ".pmtiles"])
+def test_export_tiles(bahamas_file, tmp_path, suffix):
+    path = tmp_path / f"bahamas{suffix}"
+    calls = []
+    result = export_tiles(
+        bahamas_file,
+        path,
+        [7, 8],
+        workers=2,
+        progress=lambda done, total: calls.append((done, total)),
+        indexes=[1],
+        colormap="viridis",
+    )
+    assert result["stored"] > 0
+    assert result["tiles"] == result["stored"] + result["empty"]
+    assert calls[-1] == (result["tiles"], result["tiles"])
+    for key in ("statistics", "render", "write", "seconds", "tiles_per_second"):
+        assert result[key] >= 0
+    assert not path.with_name(path.name + ".partial").exists()
+    archive = MBTiles(path) if suffix == ".mbtiles" else PMTiles(path)
+    with archive, get_reader(bahamas_file) as reader:
+        tile = reader.tms.tile(-77.5, 24.5, 8)
+        assert archive.get_tile(tile.z, tile.x, tile.y) == get_tile(
+            reader, tile.z, tile.x, tile.y, indexes=[1], colormap="viridis"
+        )
+
+
+def test_export_deduplicates(constant_file, tmp_path):
+    path = tmp_path / "constant.mbtiles"
+    result = export_tiles(constant_file, path, 6, workers=1)
+    assert result["unique"] < result["stored"]
+    with MBTiles(path) as archive:
+        assert archive.deduplicated
+        assert len(list(archive.tile_coordinates())) == result["stored"]
+        assert archive._conn.execute("SELECT COUNT(*) FROM images").fetchone() == (
+            result["unique"],
+        )
+    pm = export_tiles(constant_file, tmp_path / "constant.pmtiles", 6, workers=1)
+    assert pm["unique"] == result["unique"]
+
+
+@pytest.mark.parametrize("suffix", [".mbtiles", ".pmtiles"])
+def test_export_keeps_black_jpeg(tmp_path, suffix):
+    # Opaque black tiles encode like the empty JPEG but must be stored
+    source = tmp_path / "black.tif"
+    with rasterio.open(
+        source,
+        "w",
+        driver="GTiff",
+        width=256,
+        height=256,
+        count=3,
+        dtype="uint8",
+        crs="EPSG:4326",
+        transform=from_bounds(-45, -60, 45, 60, 256, 256),
+    ) as dst:
+        dst.write(np.zeros((3, 256, 256), dtype="uint8"))
+    result = export_tiles(source, tmp_path / f"black{suffix}", [2, 3], img_format="jpeg", workers=1)
+    assert result["stored"] > 0
+    assert result["empty"] == 0
+
+
+def test_export_resolves_statistics_once(constant_file, tmp_path):
+    cache = get_statistics_cache()
+    cache.clear()
+    export_tiles(constant_file, tmp_path / "a.pmtiles", [5, 6], workers=4, stretch="minmax")
+    assert cache.stats()["misses"] == 1
+
+
+def test_export_processes(bahamas_file, tmp_path):
+    threads = export_tiles(bahamas_file, tmp_path / "t.pmtiles", 7, stretch="linear")
+    processes = export_tiles(
+        bahamas_file, tmp_path / "p.pmtiles", 7, executor="process", workers=2, stretch="linear"
+    )
+    assert processes["stored"] == threads["stored"]
+    with PMTiles(tmp_path / "t.pmtiles") as a, PMTiles(tmp_path / "p.pmtiles") as b:
+        with get_reader(bahamas_file) as reader:
+            tile = reader.tms.tile(-77.5, 24.5, 7)
+        assert a.get_tile(tile.z, tile.x, tile.y) == b.get_tile(tile.z, tile.x, tile.y)
+
+
+def test_export_invalid(bahamas_file, tmp_path):
+    with pytest.raises(ValueError, match="archive type"):
+        export_tiles(bahamas_file, tmp_path / "tiles.zip", 7)
+    with pytest.raises(ValueError, match="supports"):
+        export_tiles(bahamas_file, tmp_path / "tiles.pmtiles", 7, img_format="GTIFF")
+    with pytest.raises(ValueError, match="executor"):
+        export_tiles(bahamas_file, tmp_path / "tiles.pmtiles", 7, executor="gpu")
+    with pytest.raises(ValueError, match="bbox"):
+        export_tiles(bahamas_file, tmp_path / "tiles.pmtiles", 7, bbox=(0, 0, 1, 1))
+
+
+def test_client_export_tiles(bahamas_file, tmp_path):
+    client = TileClient(bahamas_file)
+    try:
+        result = client.export_tiles(
+            tmp_path / "bahamas.pmtiles", 7, encoding="jpeg", indexes=[1, 2, 3]
+        )
+        assert result["stored"] > 0
+        with PMTiles(tmp_path / "bahamas.pmtiles") as archive:
+            assert archive.img_format == "JPEG"
+        with pytest.raises(ValueError, match="both"):
+            client.export_tiles(tmp_path / "x.pmtiles", 7, expression="b1", indexes=[1])
+    finally:
+        client.shutdown(force=True)
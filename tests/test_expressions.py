@@ -1,7 +1,9 @@
 """Tests for band math expressions, statistics, stretch modes, output formats, and part/feature."""
 
+import io
 import json
 
+import numpy as np
 import pytest
 import rasterio.warp
 
@@ -373,3 +375,17 @@ def test_client_feature_with_stretch():
         assert len(result) > 0
     finally:
         client.shutdown(force=True)
+
+
+def test_stretch_equalize_is_seamless(reader):
+    # The dataset-wide CDF maps a value to the same output in every tile
+    lookups = []
+    for x, y in [(72, 110), (73, 110)]:
+        raw = reader.tile(x, y, 8, indexes=[1]).data[0]
+        out = np.load(
+            io.BytesIO(get_tile(reader, 8, x, y, indexes=[1], stretch="equalize", img_format="NPY"))
+        )[0]
+        lookups.append(dict(zip(raw.ravel().tolist(), out.ravel().tolist(), strict=True)))
+    shared = set(lookups[0]) & set(lookups[1])
+    assert shared
+    assert all(lookups[0][v] == lookups[1][v] for v in shared)
@@ -0,0 +1,112 @@
+"""Tests for server-side hillshade tiles."""
+
+import io
+
+from fastapi.testclient import TestClient
+import numpy as np
+from PIL import Image
+import pytest
+
+from localtileserver.tiler import get_data_path, get_hillshade_tile, get_reader, hillshade
+from localtileserver.web import create_app
+
+TILE = (12, 829, 1565)
+
+
+@pytest.fixture
+def dem_file():
+    return get_data_path("co_elevation_roi.tif")
+
+
+def _la(content):
+    return np.asarray(Image.open(io.BytesIO(content)).convert("LA")).transpose(2, 0, 1)
+
+
+def test_flat_surface():
+    shaded = hillshade(np.full((5, 6), 100.0), cellsize=10.0)
+    assert shaded.shape == (3, 4)
+    assert shaded.dtype == np.float32
+    np.testing.assert_allclose(shaded, 255 * np.cos(np.radians(45)), rtol=1e-5)
+
+
+def test_lighting_direction():
+    # Elevation increasing eastward: the slope faces west
+    ramp = np.tile(np.arange(5, dtype=float) * 2, (5, 1))
+    west = hillshade(ramp, cellsize=10.0, azimuth=270)
+    east = hillshade(ramp, cellsize=10.0, azimuth=90)
+    assert (west > east).all()
+    # z_factor exaggerates the slope away from the light
+    assert (hillshade(ramp, cellsize=10.0, azimuth=90, z_factor=2) < east).all()
+
+
+def test_nan_propagates():
+    elevation = np.zeros((5, 5))
+    elevation[0, 1] = np.nan
+    shaded = hillshade(elevation, cellsize=1.0)
+    assert np.isnan(shaded[0, 0])
+    assert np.isfinite(shaded[1:, 1:]).all()
+
+
+@pytest.mark.parametrize("kwargs", [{"azimuth": 400}, {"altitude": -1}])
+def test_invalid_light(kwargs):
+    with pytest.raises(ValueError):
+        hillshade(np.zeros((3, 3)), cellsize=1.0, **kwargs)
+
+
+def test_buffered_tiles_are_seamless():
+    rng = np.random.default_rng(0)
+    elevation = rng.normal(size=(10, 18)).cumsum(axis=1)
+    whole = hillshade(elevation, cellsize=1.0)
+    # Two adjacent 8x8 tiles each read with a one-pixel buffer
+    left = hillshade(elevation[:, :10], cellsize=1.0)
+    right = hillshade(elevation[:, 8:], cellsize=1.0)
+    np.testing.assert_array_equal(np.hstack([left, right]), whole)
+
+
+def test_get_hillshade_tile(dem_file):
+    z, x, y = TILE
+    with get_reader(dem_file) as reader:
+        img = reader.tile(x, y, z, indexes=[1])
+        tile = get_hillshade_tile(reader, z, x, y)
+    assert tile.mimetype == "image/png"
+    gray, alpha = _la(tile)
+    valid = alpha != 0
+    assert valid.any()
+    assert not valid.all()
+    # Only pixels with data are shaded
+    assert not (valid & np.ma.getmaskarray(img.array)[0]).any()
+    assert gray[valid].std() > 0
+
+
+def test_hillshade_endpoint(dem_file):
+    z, x, y = TILE
+    url = f"/api/hillshade/{z}/{x}/{y}.png?filename={dem_file}&azimuth=90&z_factor=2"
+    with TestClient(create_app(tile_cache_size=2**20)) as client:
+        r = client.get(url)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "image/png"
+        assert r.headers["etag"]
+        assert client.get(url).content == r.content
+        assert client.get("/api/cache/stats").json()["tiles"]["hits"] == 1
+        other = client.get(url.replace("azimuth=90", "azimuth=270"))
+        assert other.status_code == 200
+        assert other.content != r.content
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["azimuth=361", "altitude=91", "quality=0"],
+)
+def test_hillshade_endpoint_bad_params(flask_client, dem_file, query):
+    url = f"/api/hillshade/12/829/1565.jpeg?filename={dem_file}&{query}"
+    assert flask_client.get(url).status_code == 400
+
+
+def test_hillshade_endpoint_outside_bounds(flask_client, dem_file):
+    assert flask_client.get(f"/api/hillshade/12/0/0.png?filename={dem_file}").status_code == 404
+
+
+def test_hillshade_endpoint_missing_file(flask_client, tmp_path):
+    missing = tmp_path / "missing.tif"
+    r = flask_client.get("/api/hillshade/12/829/1565.png", params={"filename": str(missing)})
+    assert r.status_code == 400
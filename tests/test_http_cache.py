@@ -0,0 +1,135 @@
+"""Tests for HTTP conditional caching of image responses."""
+
+import concurrent.futures
+import os
+import shutil
+import threading
+import time
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import pytest
+
+from localtileserver.tiler import utilities
+from localtileserver.web import create_app
+
+
+@pytest.fixture
+def bahamas_copy(bahamas_file, tmp_path):
+    path = tmp_path / "bahamas.tif"
+    shutil.copy(bahamas_file, path)
+    return path
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/tiles/8/72/110.png",
+        "/api/thumbnail.png?max_size=64",
+        "/api/part.png?bbox=-78.2,23.5,-77.5,24.2",
+    ],
+)
+def test_etag_not_modified(flask_client, bahamas_copy, url):
+    sep = "&" if "?" in url else "?"
+    url = f"{url}{sep}filename={bahamas_copy}"
+    r = flask_client.get(url)
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert r.headers["last-modified"]
+    assert r.headers["cache-control"] == "no-cache"
+    # Same request again yields the same validator
+    assert flask_client.get(url).headers["etag"] == etag
+    with (
+        patch("localtileserver.web.routers.tiles.get_tile") as get_tile,
+        patch("localtileserver.web.routers.tiles.get_preview") as get_preview,
+        patch("localtileserver.web.routers.tiles.get_part") as get_part,
+    ):
+        r = flask_client.get(url, headers={"If-None-Match": f'W/"other", {etag}'})
+        assert r.status_code == 304
+        assert r.content == b""
+        assert r.headers["etag"] == etag
+        get_tile.assert_not_called()
+        get_preview.assert_not_called()
+        get_part.assert_not_called()
+    # Different parameters are a different resource
+    r = flask_client.get(url + "&colormap=viridis", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_etag_changes_with_file(flask_client, bahamas_copy):
+    url = f"/api/tiles/8/72/110.png?filename={bahamas_copy}"
+    etag = flask_client.get(url).headers["etag"]
+    stat = os.stat(bahamas_copy)
+    os.utime(bahamas_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    r = flask_client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_cache_control_max_age_per_route(bahamas_file):
+    app = create_app(cache_max_age={"tiles": 3600})
+    with TestClient(app) as client:
+        r = client.get(f"/api/tiles/8/72/110.png?filename={bahamas_file}")
+        assert r.headers["cache-control"] == "public, max-age=3600"
+        r = client.get(f"/api/thumbnail.png?max_size=64&filename={bahamas_file}")
+        assert r.headers["cache-control"] == "no-cache"
+
+
+@pytest.mark.parametrize("url", ["/api/tiles/8/72/110.png", "/api/thumbnail.png"])
+def test_missing_file_is_bad_request(flask_client, tmp_path, url):
+    r = flask_client.get(url, params={"filename": str(tmp_path / "missing.tif")})
+    assert r.status_code == 400
+
+
+@pytest.fixture
+def remote_versions(monkeypatch):
+    monkeypatch.setattr(utilities, "_REMOTE_VERSIONS", {})
+    monkeypatch.setattr(utilities, "_REMOTE_VERSION_REFRESHES", set())
+    calls = []
+    release = threading.Event()
+
+    class _Response:
+        ok = True
+
+        def __init__(self):
+            self.headers = {"ETag": f'"v{len(calls)}"'}
+
+    def _head(url, **kwargs):
+        calls.append(url)
+        release.wait(timeout=10)
+        return _Response()
+
+    monkeypatch.setattr(utilities.requests, "head", _head)
+    return calls, release
+
+
+def test_remote_version_lookups_are_shared(remote_versions):
+    calls, release = remote_versions
+    url = "https://example.com/image.tif"
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as ex:
+        futures = [ex.submit(utilities._get_remote_version, url) for _ in range(8)]
+        time.sleep(0.2)
+        release.set()
+        versions = {f.result() for f in futures}
+    assert versions == {'"v1"'}
+    assert len(calls) == 1
+
+
+def test_remote_version_refreshed_in_background(remote_versions, monkeypatch):
+    calls, release = remote_versions
+    url = "https://example.com/image.tif"
+    release.set()
+    assert utilities._get_remote_version(url) == '"v1"'
+    monkeypatch.setattr(utilities, "_REMOTE_VERSION_TTL", 0.0)
+    release.clear()
+    # Expired versions are served while one refresh runs
+    assert utilities._get_remote_version(url) == '"v1"'
+    assert utilities._get_remote_version(url) == '"v1"'
+    release.set()
+    deadline = time.monotonic() + 10
+    while utilities._REMOTE_VERSION_REFRESHES and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 2
+    monkeypatch.setattr(utilities, "_REMOTE_VERSION_TTL", 300.0)
+    assert utilities._get_remote_version(url) == '"v2"'
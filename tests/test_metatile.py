@@ -0,0 +1,98 @@
+"""Tests for metatile rendering."""
+
+import io
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+import numpy as np
+from PIL import Image
+import pytest
+import rasterio
+from rasterio.transform import from_bounds
+from rio_tiler.errors import TileOutsideBounds
+
+from localtileserver.tiler import get_data_path, get_metatile, get_reader, get_tile
+from localtileserver.web import create_app
+
+
+@pytest.fixture
+def dem_file():
+    return get_data_path("co_elevation_roi.tif")
+
+
+def _rgba(content):
+    return np.asarray(Image.open(io.BytesIO(content)).convert("RGBA"))
+
+
+def test_metatile_reads_once(dem_file):
+    with get_reader(dem_file) as reader, patch.object(reader, "part", wraps=reader.part) as part:
+        tiles = get_metatile(reader, 13, 1658, 3131, size=2, colormap="terrain")
+        assert part.call_count == 1
+        assert set(tiles) == {
+            (13, 1658, 3130),
+            (13, 1659, 3130),
+            (13, 1658, 3131),
+            (13, 1659, 3131),
+        }
+        for key, tile in tiles.items():
+            assert tile == get_tile(reader, *key, colormap="terrain")
+
+
+def test_metatile_matches_tiles(bahamas_file):
+    with get_reader(bahamas_file) as reader:
+        tiles = get_metatile(reader, 10, 289, 441, size=4)
+        # Tiles of the block outside the dataset are left out
+        assert len(tiles) == 12
+        assert all(reader.tile_exists(x, y, z) for z, x, y in tiles)
+        for key, tile in tiles.items():
+            # Resampling may round a few pixels differently over the larger read
+            differs = (_rgba(tile) != _rgba(get_tile(reader, *key))).any(axis=-1)
+            assert differs.mean() < 0.001
+
+
+def test_metatile_clipped_to_matrix(tmp_path):
+    path = tmp_path / "world.tif"
+    profile = {
+        "driver": "GTiff",
+        "width": 64,
+        "height": 32,
+        "count": 1,
+        "dtype": "uint8",
+        "crs": "EPSG:4326",
+        "transform": from_bounds(-180, -85, 180, 85, 64, 32),
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(np.full((1, 32, 64), 100, dtype=np.uint8))
+    with get_reader(path) as reader:
+        assert set(get_metatile(reader, 0, 0, 0, size=4)) == {(0, 0, 0)}
+        assert len(get_metatile(reader, 1, 1, 1, size=4)) == 4
+
+
+def test_metatile_errors(bahamas_file):
+    with get_reader(bahamas_file) as reader:
+        with pytest.raises(TileOutsideBounds):
+            get_metatile(reader, 10, 0, 0)
+        with pytest.raises(ValueError):
+            get_metatile(reader, 10, 289, 441, size=3)
+
+
+def test_metatile_endpoint_caches_neighbours(dem_file):
+    app = create_app(tile_cache_size=2**22, metatile_size=2)
+    with TestClient(app) as client:
+        r = client.get(f"/api/tiles/13/1659/3131.png?filename={dem_file}&colormap=terrain")
+        assert r.status_code == 200
+        assert client.get("/api/cache/stats").json()["tiles"]["entries"] == 4
+        neighbour = client.get(f"/api/tiles/13/1658/3130.png?filename={dem_file}&colormap=terrain")
+        assert neighbour.status_code == 200
+        assert client.get("/api/cache/stats").json()["tiles"]["hits"] == 1
+        assert client.get(f"/api/tiles/12/0/0.png?filename={dem_file}").status_code == 404
+    with get_reader(dem_file) as reader:
+        assert r.content == get_tile(reader, 13, 1659, 3131, colormap="terrain")
+
+
+def test_invalid_metatile_size():
+    with pytest.raises(ValueError):
+        create_app(tile_cache_size=2**20, metatile_size=3)
+    # The neighbours would be thrown away without a cache
+    with pytest.raises(ValueError, match="tile_cache_size or disk_cache_size"):
+        create_app(metatile_size=2)
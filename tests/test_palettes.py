@@ -1,8 +1,15 @@
 """Tests for localtileserver.tiler.palettes -- especially the colormap registry."""
 
+import io
+import json
+
+import numpy as np
 import pytest
+from rio_tiler.colormap import cmap as RIO_CMAPS
 
+from localtileserver.tiler import get_reader, get_tile
 from localtileserver.tiler.palettes import (
+    compile_colormap,
     get_registered_colormap,
     palette_valid_or_raise,
     register_colormap,
@@ -60,3 +67,61 @@ def test_valid_custom_registered():
 def test_invalid_custom_unregistered():
     with pytest.raises(ValueError, match="not found"):
         palette_valid_or_raise("custom:doesnotexist")
+
+
+# --- Colormap compilation ---
+
+
+def test_compile_rio_cmap_matches_rio_tiler():
+    lut = compile_colormap("viridis")
+    assert lut.shape == (256, 4)
+    assert lut.dtype == np.uint8
+    expected = RIO_CMAPS.get("viridis")
+    assert all(tuple(lut[i]) == tuple(expected[i]) for i in range(256))
+    # Cached and shared read-only
+    assert compile_colormap("viridis") is lut
+    assert not lut.flags.writeable
+
+
+def test_compile_discrete_json_and_registry():
+    data = {"1": [255, 0, 0, 255], "3": [0, 255, 0]}
+    lut = compile_colormap(json.dumps(data))
+    assert tuple(lut[1]) == (255, 0, 0, 255)
+    assert tuple(lut[3]) == (0, 255, 0, 255)
+    # Unlisted values are transparent, as in rio-tiler's discrete colormaps
+    assert tuple(lut[2]) == (0, 0, 0, 0)
+    key = register_colormap({1: (255, 0, 0, 255), 3: (0, 255, 0, 255)})
+    np.testing.assert_array_equal(compile_colormap(key), lut)
+
+
+@pytest.mark.parametrize("key", ["-1", "256", "1000"])
+def test_compile_out_of_range_keys(key):
+    with pytest.raises(ValueError, match="between 0 and 255"):
+        compile_colormap(json.dumps({"1": [255, 0, 0, 255], key: [0, 255, 0, 255]}))
+
+
+def test_compile_matplotlib_colormaps():
+    matplotlib = pytest.importorskip("matplotlib")
+    listed = matplotlib.colormaps["tab10"]
+    lut = compile_colormap(listed)
+    assert tuple(lut[0]) == (*(int(v * 255) for v in listed.colors[0]), 255)
+    lut = compile_colormap(json.dumps(["red", "blue"]))
+    assert tuple(lut[0]) == (255, 0, 0, 255)
+    assert tuple(lut[255]) == (0, 0, 255, 255)
+
+
+def test_compile_empty_colormap():
+    assert compile_colormap(None) is None
+    assert compile_colormap("") is None
+
+
+@pytest.mark.parametrize("colormap", ["viridis", json.dumps({"10": [255, 0, 0, 128]})])
+def test_lut_tile_matches_rio_tiler(bahamas_file, colormap):
+    reader = get_reader(bahamas_file)
+    tile = np.load(
+        io.BytesIO(get_tile(reader, 8, 72, 110, indexes=[1], colormap=colormap, img_format="NPY"))
+    )
+    img = reader.tile(72, 110, 8, indexes=[1])
+    cmap = RIO_CMAPS.get(colormap) if colormap == "viridis" else {10: (255, 0, 0, 128)}
+    expected = np.load(io.BytesIO(img.render(img_format="NPY", colormap=cmap)))
+    np.testing.assert_array_equal(tile, expected)
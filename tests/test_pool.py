@@ -0,0 +1,157 @@
+"""Tests for the pooled dataset handles in localtileserver.tiler.pool."""
+
+import concurrent.futures
+import threading
+
+import pytest
+from rasterio import RasterioIOError
+
+from localtileserver.tiler import get_clean_filename
+from localtileserver.tiler.pool import DatasetPool, get_dataset_pool
+
+
+@pytest.fixture
+def clean_bahamas(bahamas_file):
+    return get_clean_filename(bahamas_file)
+
+
+def test_pool_reuses_handle(clean_bahamas):
+    pool = DatasetPool()
+    with pool.reader(clean_bahamas) as first:
+        pass
+    with pool.reader(clean_bahamas) as second:
+        pass
+    assert first is second
+    stats = pool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["open"] == 1
+    pool.clear()
+
+
+def test_pool_concurrent_checkouts_get_distinct_handles(clean_bahamas):
+    pool = DatasetPool()
+    barrier = threading.Barrier(4)
+
+    def _lease():
+        with pool.reader(clean_bahamas) as reader:
+            barrier.wait(timeout=10)
+            return id(reader)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
+        ids = list(ex.map(lambda _: _lease(), range(4)))
+    assert len(set(ids)) == 4
+    assert pool.stats()["idle"] == 4
+    pool.clear()
+
+
+def test_pool_max_open_evicts_and_closes(clean_bahamas):
+    pool = DatasetPool(max_open=1)
+    with pool.reader(clean_bahamas) as first:
+        pass
+    # Opening another dataset in a full pool closes the idle handle
+    other = get_clean_filename("blue_marble")
+    with pool.reader(other):
+        pass
+    assert first.dataset.closed
+    stats = pool.stats()
+    assert stats["evictions"] == 1
+    assert stats["open"] == 1
+    pool.clear()
+
+
+def test_pool_idle_timeout(clean_bahamas):
+    pool = DatasetPool(idle_timeout=0)
+    with pool.reader(clean_bahamas) as first:
+        pass
+    with pool.reader(clean_bahamas) as second:
+        pass
+    assert first is not second
+    assert first.dataset.closed
+    pool.clear()
+
+
+def test_pool_discards_handle_after_io_error(clean_bahamas):
+    pool = DatasetPool()
+    with pytest.raises(RasterioIOError):
+        with pool.reader(clean_bahamas) as reader:
+            raise RasterioIOError("broken")
+    assert reader.dataset.closed
+    assert pool.stats()["open"] == 0
+
+
+def test_pool_drops_stale_versions(clean_bahamas):
+    pool = DatasetPool()
+    with pool.reader(clean_bahamas, version="1") as first:
+        pass
+    with pool.reader(clean_bahamas, version="1") as second:
+        pass
+    assert first is second
+    # A rewritten file does not reuse handles of the old version
+    with pool.reader(clean_bahamas, version="2") as third:
+        pass
+    assert third is not first
+    assert first.dataset.closed
+    stats = pool.stats()
+    assert stats["open"] == 1
+    assert stats["evictions"] == 1
+    pool.clear()
+
+
+def test_pool_unversioned_handles_are_not_stale(clean_bahamas):
+    pool = DatasetPool()
+    with pool.reader(clean_bahamas, version="1") as versioned:
+        pass
+    with pool.reader(clean_bahamas) as unversioned:
+        pass
+    # Callers with and without a version do not close each other's handles
+    with pool.reader(clean_bahamas, version="1") as again:
+        pass
+    with pool.reader(clean_bahamas) as unversioned_again:
+        pass
+    assert again is versioned
+    assert unversioned_again is unversioned
+    assert pool.stats()["evictions"] == 0
+    pool.clear()
+
+
+def test_viewer_and_tiles_share_handles(flask_client, bahamas_file):
+    pool = get_dataset_pool()
+    pool.clear()
+    assert flask_client.get(f"/?filename={bahamas_file}").status_code == 200
+    assert flask_client.get(f"/api/tiles/8/72/110.png?filename={bahamas_file}").status_code == 200
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 0
+
+
+def test_tile_endpoint_resolves_filename_once(flask_client, bahamas_file, monkeypatch):
+    from localtileserver.web.routers import tiles
+
+    calls = []
+
+    def _clean(filename):
+        calls.append(filename)
+        return get_clean_filename(filename)
+
+    monkeypatch.setattr(tiles, "get_clean_filename", _clean)
+    r = flask_client.get(f"/api/tiles/8/71/110.png?filename={bahamas_file}")
+    assert r.status_code == 200
+    assert len(calls) == 1
+
+
+def test_tile_endpoint_uses_pool(flask_client, bahamas_file):
+    for _ in range(3):
+        r = flask_client.get(f"/api/tiles/8/72/110.png?filename={bahamas_file}")
+        assert r.status_code == 200
+    stats = get_dataset_pool().stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+    assert stats["in_use"] == 0
+
+
+def test_cache_stats_endpoint(flask_client, bahamas_file):
+    flask_client.get(f"/api/metadata?filename={bahamas_file}")
+    r = flask_client.get("/api/cache/stats")
+    assert r.status_code == 200
+    assert r.json()["dataset_pool"]["misses"] >= 1
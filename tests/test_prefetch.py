@@ -0,0 +1,123 @@
+"""Tests for background tile prefetching."""
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+
+from localtileserver.tiler import get_data_path
+from localtileserver.tiler.prefetch import TilePrefetcher, prefetch_candidates
+from localtileserver.web import create_app
+
+
+def _wait_idle(prefetcher, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = prefetcher.stats()
+        if stats["completed"] + stats["failed"] + stats["dropped"] == stats["scheduled"]:
+            return stats
+        time.sleep(0.01)
+    raise AssertionError(f"Prefetcher did not finish: {prefetcher.stats()}")
+
+
+def test_prefetch_candidates():
+    tiles = prefetch_candidates(3, 4, 5)
+    assert set(tiles[:8]) == {(3, 4 + dx, 5 + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)} - {
+        (3, 4, 5)
+    }
+    assert set(tiles[8:]) == {(4, 8, 10), (4, 9, 10), (4, 8, 11), (4, 9, 11)}
+    # Clipped to the tile matrix
+    assert prefetch_candidates(0, 0, 0)[0][0] == 1
+    assert len(prefetch_candidates(1, 0, 0)) == 3 + 4
+    # Nearest ring first
+    deep = prefetch_candidates(5, 10, 10, depth=2)
+    assert len(deep) == 24 + 4 + 16
+    assert all(max(abs(x - 10), abs(y - 10)) == 1 for _, x, y in deep[:8])
+
+
+def test_prefetcher_renders_candidates():
+    rendered = []
+    prefetcher = TilePrefetcher(cpu_share=1)
+    assert prefetcher.schedule(3, 4, 5, lambda *tile: rendered.append(tile)) == 12
+    stats = _wait_idle(prefetcher)
+    assert stats["completed"] == 12
+    assert sorted(rendered) == sorted(prefetch_candidates(3, 4, 5))
+    prefetcher.close()
+
+
+def test_prefetcher_waits_for_foreground():
+    rendered = []
+    prefetcher = TilePrefetcher(cpu_share=1)
+    with prefetcher.foreground():
+        assert prefetcher.schedule(3, 4, 5, lambda *tile: rendered.append(tile)) == 12
+        # Already queued tiles are not queued twice
+        assert prefetcher.schedule(3, 4, 6, lambda *tile: rendered.append(tile)) == 8
+        time.sleep(0.2)
+        assert rendered == []
+    assert _wait_idle(prefetcher)["completed"] == 20
+    prefetcher.close()
+
+
+def test_prefetcher_bounded_queue():
+    rendered = []
+    prefetcher = TilePrefetcher(max_queue=3, cpu_share=1)
+    with prefetcher.foreground():
+        prefetcher.schedule(3, 4, 5, lambda *tile: rendered.append(tile))
+        stats = prefetcher.stats()
+        assert stats["queued"] == 3
+        assert stats["dropped"] == 9
+    _wait_idle(prefetcher)
+    # The oldest entries were dropped
+    assert rendered == prefetch_candidates(3, 4, 5)[-3:]
+    prefetcher.close()
+
+
+def test_prefetcher_failures_and_close():
+    started = threading.Event()
+    release = threading.Event()
+
+    def _render(*tile):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("outside")
+
+    prefetcher = TilePrefetcher(cpu_share=1)
+    prefetcher.schedule(3, 4, 5, _render)
+    assert started.wait(5)
+    prefetcher.close()
+    release.set()
+    stats = _wait_idle(prefetcher)
+    assert stats["failed"] == 1
+    assert stats["dropped"] == 11
+    assert prefetcher.schedule(3, 4, 5, _render) == 0
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"depth": 0}, {"max_queue": 0}, {"workers": 0}, {"cpu_share": 0}]
+)
+def test_prefetcher_invalid(kwargs):
+    with pytest.raises(ValueError):
+        TilePrefetcher(**kwargs)
+
+
+def test_prefetch_endpoint():
+    dem_file = get_data_path("co_elevation_roi.tif")
+    app = create_app(tile_cache_size=2**22, prefetch_depth=1, prefetch_cpu_share=1)
+    try:
+        with TestClient(app) as client:
+            url = "/api/tiles/13/{x}/{y}.png?filename=" + str(dem_file)
+            assert client.get(url.format(x=1659, y=3131)).status_code == 200
+            _wait_idle(app.state.prefetcher)
+            stats = client.get("/api/cache/stats").json()
+            assert stats["prefetch"]["scheduled"] == 12
+            assert stats["tiles"]["entries"] > 1
+            assert client.get(url.format(x=1658, y=3130)).status_code == 200
+            assert client.get("/api/cache/stats").json()["tiles"]["hits"] >= 1
+    finally:
+        app.state.prefetcher.close()
+
+
+def test_prefetch_needs_cache():
+    with pytest.raises(ValueError):
+        create_app(prefetch_depth=1)
@@ -0,0 +1,53 @@
+"""Tests for the memoized dataset profile."""
+
+import dataclasses
+import os
+import shutil
+
+import pytest
+from rasterio.enums import ColorInterp
+
+from localtileserver.tiler import get_dataset_profile, get_reader, get_source_bounds, get_tile
+
+
+@pytest.fixture
+def bahamas_copy(bahamas_file, tmp_path):
+    path = tmp_path / "bahamas.tif"
+    shutil.copy(bahamas_file, path)
+    return path
+
+
+def test_profile_contents(bahamas_file):
+    reader = get_reader(bahamas_file)
+    profile = get_dataset_profile(reader)
+    assert profile.count == 3
+    assert profile.dtypes == ("uint8",) * 3
+    assert profile.colorinterp == (ColorInterp.red, ColorInterp.green, ColorInterp.blue)
+    assert profile.band_names == ("b1", "b2", "b3")
+    assert profile.nodata == 0
+    assert profile.overviews == (2,)
+    assert profile.minzoom == reader.minzoom
+    assert profile.maxzoom == reader.maxzoom
+    bounds = get_source_bounds(reader)
+    assert bounds["left"] == round(profile.geographic_bounds[0], 6)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        profile.count = 1
+    assert not hasattr(profile, "__dict__")
+
+
+def test_profile_memoized(bahamas_copy, monkeypatch):
+    reader = get_reader(bahamas_copy)
+    profile = get_dataset_profile(reader)
+    # Another handle on the same file version shares the profile
+    assert get_dataset_profile(get_reader(bahamas_copy)) is profile
+    # Rendering tiles no longer calls info()
+    calls = []
+    original_info = reader.info
+    monkeypatch.setattr(reader, "info", lambda: calls.append(1) or original_info())
+    get_tile(reader, 8, 72, 110)
+    get_tile(reader, 8, 72, 110, indexes=[1], colormap="viridis")
+    assert not calls
+    # A new file version gets a new profile
+    stat = os.stat(bahamas_copy)
+    os.utime(bahamas_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert get_dataset_profile(reader) is not profile
@@ -1,5 +1,9 @@
 from matplotlib.colors import ListedColormap
+import numpy as np
 import pytest
+from rio_tiler.models import ImageData
+
+from localtileserver.tiler.handler import _rescale_image, _stretch_lut
 
 from .utilities import get_content
 
@@ -128,3 +132,36 @@ def test_tile_vmin_vmax(bahamas, compare):
 def test_landsat7_nodata(landsat7, compare, nodata):
     thumbnail = landsat7.thumbnail(nodata=nodata)
     compare(thumbnail)
+
+
+@pytest.mark.parametrize("dtype", ["uint8", "uint16", "int16", "float32"])
+def test_rescale_image_matches_rio_tiler(dtype):
+    rng = np.random.default_rng(0)
+    data = rng.integers(0, 250, size=(2, 32, 32)).astype(dtype)
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[:, :4] = True
+    in_range = [(10, 200), (0, 120)]
+    expected = ImageData(np.ma.MaskedArray(data.copy(), mask=mask)).rescale(in_range=in_range)
+    img = ImageData(np.ma.MaskedArray(data.copy(), mask=mask))
+    _rescale_image(img, in_range)
+    assert img.array.dtype == np.uint8
+    assert (img.array.data[mask] == 0).all()
+    np.testing.assert_array_equal(img.array.mask, mask)
+    # float32 instead of float64 arithmetic may round down one step
+    diff = img.array.data.astype(int) - expected.array.data.astype(int)
+    assert np.abs(diff).max() <= 1
+
+
+@pytest.mark.parametrize("stretch", ["sqrt", "log"])
+def test_rescale_image_stretch_lut_matches_float(stretch):
+    data = np.arange(1000, dtype="uint16").reshape(1, 10, 100)
+    via_lut = ImageData(np.ma.MaskedArray(data.copy()))
+    _rescale_image(via_lut, [(100, 900)], stretch=stretch)
+    via_float = ImageData(np.ma.MaskedArray(data.astype("float32")))
+    _rescale_image(via_float, [(100, 900)], stretch=stretch)
+    np.testing.assert_array_equal(via_lut.array.data, via_float.array.data)
+    assert via_lut.array.data[0, 0, 0] == 0
+    assert via_lut.array.data[0, -1, -1] == 255
+    assert _stretch_lut("uint16", 100.0, 900.0, stretch) is _stretch_lut(
+        "uint16", 100.0, 900.0, stretch
+    )
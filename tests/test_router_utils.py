@@ -1,6 +1,13 @@
 """Tests for localtileserver.web.routers.utils edge cases."""
 
-from localtileserver.web.routers.utils import get_clean_filename_from_params, parse_style_params
+import pytest
+from starlette.requests import Request
+
+from localtileserver.web.routers.utils import (
+    accepts_mimetype,
+    get_clean_filename_from_params,
+    parse_style_params,
+)
 
 # --- get_clean_filename_from_params ---
 
@@ -57,3 +64,23 @@ def test_parse_style_params_indexes_attribute_error():
 def test_parse_style_params_single_values():
     result = parse_style_params(vmin="10", vmax="200", nodata="0")
     assert result == {"vmin": "10", "vmax": "200", "nodata": "0"}
+
+
+# --- accepts_mimetype ---
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("", False),
+        ("*/*", False),
+        ("image/*", False),
+        ("image/avif,image/webp,*/*", True),
+        ("image/webp;q=0.8, image/png", True),
+        ("image/webp;q=0, image/png", False),
+        ("IMAGE/WEBP", True),
+    ],
+)
+def test_accepts_mimetype(accept, expected):
+    request = Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+    assert accepts_mimetype(request, "image/webp") is expected
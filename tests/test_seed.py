@@ -0,0 +1,172 @@
+"""Tests for seeding tiles into MBTiles archives."""
+
+import sqlite3
+from unittest.mock import patch
+
+from click.testing import CliRunner
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_bounds
+
+from localtileserver.cli import cli
+from localtileserver.tiler import get_reader, get_statistics_cache, get_tile, seed
+from localtileserver.tiler.mbtiles import MBTiles
+from localtileserver.tiler.seed import seed_tiles
+
+
+def test_mbtiles_roundtrip(tmp_path):
+    path = tmp_path / "tiles.mbtiles"
+    with MBTiles(path, mode="a") as archive:
+        archive.put_tiles([(3, 1, 2, b"a"), (3, 2, 2, b"b")])
+        archive.update_metadata(format="png", minzoom=3)
+    with MBTiles(path) as archive:
+        assert archive.get_tile(3, 1, 2) == b"a"
+        assert archive.get_tile(3, 1, 1) is None
+        assert sorted(archive.tile_coordinates()) == [(3, 1, 2), (3, 2, 2)]
+        assert archive.metadata == {"format": "png", "minzoom": "3"}
+    # Rows are stored flipped as MBTiles requires
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT tile_row FROM tiles WHERE tile_column = 1").fetchone() == (5,)
+    with pytest.raises(FileNotFoundError):
+        MBTiles(tmp_path / "missing.mbtiles")
+
+
+def test_seed_tiles(bahamas_file, tmp_path):
+    path = tmp_path / "bahamas.mbtiles"
+    calls = []
+    result = seed_tiles(
+        bahamas_file,
+        path,
+        minzoom=7,
+        maxzoom=8,
+        processes=1,
+        progress=lambda done, total: calls.append((done, total)),
+        indexes=[1],
+        colormap="viridis",
+    )
+    assert result["rendered"] > 0
+    assert result["skipped"] == 0
+    assert calls[-1][0] == calls[-1][1] == result["rendered"] + result["empty"]
+    with MBTiles(path) as archive:
+        metadata = archive.metadata
+        assert metadata["format"] == "png"
+        assert (metadata["minzoom"], metadata["maxzoom"]) == ("7", "8")
+        z, x, y = next(archive.tile_coordinates(8))
+        with get_reader(bahamas_file) as reader:
+            assert archive.get_tile(z, x, y) == get_tile(
+                reader, z, x, y, indexes=[1], colormap="viridis"
+            )
+
+    # Rerunning resumes: stored tiles are skipped, and the range can grow
+    result2 = seed_tiles(
+        bahamas_file,
+        path,
+        minzoom=7,
+        maxzoom=9,
+        processes=1,
+        indexes=[1],
+        colormap="viridis",
+        stretch=None,
+    )
+    assert result2["skipped"] == result["rendered"]
+    with MBTiles(path) as archive:
+        assert (archive.metadata["minzoom"], archive.metadata["maxzoom"]) == ("7", "9")
+
+    with pytest.raises(ValueError, match="other settings"):
+        seed_tiles(bahamas_file, path, minzoom=7, maxzoom=7, processes=1)
+    result3 = seed_tiles(bahamas_file, path, minzoom=7, maxzoom=7, processes=1, overwrite=True)
+    assert result3["skipped"] == 0
+
+
+def test_seed_tiles_keeps_black_jpeg(tmp_path):
+    # Opaque black tiles encode like the empty JPEG but must be stored
+    source = tmp_path / "black.tif"
+    with rasterio.open(
+        source,
+        "w",
+        driver="GTiff",
+        width=256,
+        height=256,
+        count=3,
+        dtype="uint8",
+        crs="EPSG:4326",
+        transform=from_bounds(-45, -60, 45, 60, 256, 256),
+    ) as dst:
+        dst.write(np.zeros((3, 256, 256), dtype="uint8"))
+    result = seed_tiles(source, tmp_path / "black.mbtiles", 2, 3, img_format="jpeg", processes=1)
+    assert result["rendered"] > 0
+    assert result["empty"] == 0
+
+
+def test_seed_tiles_process_pool(bahamas_file, tmp_path):
+    path = tmp_path / "pool.mbtiles"
+    pooled = seed_tiles(bahamas_file, path, minzoom=7, maxzoom=9, processes=2)
+    single = seed_tiles(
+        bahamas_file, tmp_path / "single.mbtiles", minzoom=7, maxzoom=9, processes=1
+    )
+    assert pooled["rendered"] == single["rendered"]
+    with MBTiles(path) as a, MBTiles(tmp_path / "single.mbtiles") as b:
+        tiles = sorted(a.tile_coordinates())
+        assert tiles == sorted(b.tile_coordinates())
+        assert all(a.get_tile(*t) == b.get_tile(*t) for t in tiles)
+
+
+def test_seed_tiles_resolves_statistics_once(bahamas_file, tmp_path):
+    cache = get_statistics_cache()
+    cache.clear()
+    with patch.object(seed, "_render_chunks", wraps=seed._render_chunks) as render_chunks:
+        seed_tiles(
+            bahamas_file,
+            tmp_path / "a.mbtiles",
+            minzoom=7,
+            maxzoom=8,
+            processes=2,
+            stretch="linear",
+        )
+    # Workers receive the statistics computed by the parent
+    statistics = render_chunks.call_args.args[4]
+    assert statistics
+    assert cache.stats()["misses"] == 1
+    seed_tiles(
+        bahamas_file, tmp_path / "b.mbtiles", minzoom=7, maxzoom=8, processes=1, stretch="linear"
+    )
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"img_format": "GTiff"},
+        {"minzoom": 5, "maxzoom": 4},
+        {"bbox": (0, 0, 1, 1)},
+        {"encoder_options": {"quality": 0}},
+    ],
+)
+def test_seed_tiles_invalid(bahamas_file, tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        seed_tiles(bahamas_file, tmp_path / "x.mbtiles", processes=1, **kwargs)
+
+
+def test_seed_cli(bahamas_file, tmp_path):
+    path = tmp_path / "cli.mbtiles"
+    args = ["seed", str(bahamas_file), str(path), "--minzoom", "7", "--maxzoom", "7", "-j", "1"]
+    result = CliRunner().invoke(cli, [*args, "--bbox", "-79,23,-76,26", "-f", "jpeg"])
+    assert result.exit_code == 0, result.output
+    assert "tiles/s" in result.output
+    with MBTiles(path) as archive:
+        assert archive.metadata["format"] == "jpg"
+        assert len(list(archive.tile_coordinates())) > 0
+    # Different settings without --overwrite
+    result = CliRunner().invoke(cli, args)
+    assert result.exit_code != 0
+    assert "other settings" in result.output
+    assert CliRunner().invoke(cli, [*args, "--bbox", "1,2"]).exit_code != 0
+
+
+def test_cli_serves_by_default(bahamas_file):
+    with patch("localtileserver.web.fastapi_app.run_app") as run_app:
+        result = CliRunner().invoke(cli, [str(bahamas_file), "-p", "0", "-b", "False"])
+        assert result.exit_code == 0, result.output
+        run_app.assert_called_once()
+        assert CliRunner().invoke(cli, ["serve", str(bahamas_file)]).exit_code == 0
@@ -0,0 +1,130 @@
+"""Tests for extracting large bounding boxes in strips."""
+
+import io
+
+from fastapi.testclient import TestClient
+import numpy as np
+from PIL import Image
+import pytest
+import rasterio
+
+from localtileserver import TileClient
+from localtileserver.tiler import get_part, get_reader
+from localtileserver.tiler.stream import _strip_height, iter_part, write_part
+from localtileserver.web import create_app
+
+
+def _png_array(data: bytes) -> np.ndarray:
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+
+@pytest.fixture
+def bahamas_bbox(bahamas_file):
+    with get_reader(bahamas_file) as reader:
+        return tuple(reader.dataset.bounds)
+
+
+def test_strip_height():
+    # Whole rows of 512-pixel blocks when the budget allows
+    assert _strip_height(1000, 5000, 10, 1000 * 10 * 1300) == 1024
+    assert _strip_height(1000, 700, 10, 1000 * 10 * 1300) == 700
+    # Fewer rows, but at least one, when it does not
+    assert _strip_height(1000, 5000, 10, 1000 * 10 * 100) == 100
+    assert _strip_height(1000, 5000, 10, 1) == 1
+
+
+@pytest.mark.parametrize(
+    "style",
+    [
+        {},
+        {"dst_crs": "EPSG:3857"},
+        {"indexes": [1], "colormap": "viridis"},
+        {"stretch": "linear"},
+        {"expression": "b1/2;b2;b3"},
+    ],
+)
+def test_stream_matches_part(bahamas_file, bahamas_bbox, style):
+    with get_reader(bahamas_file) as reader:
+        expected = _png_array(get_part(reader, bahamas_bbox, max_size=600, **style))
+        # A small budget splits the image into many strips
+        chunks = list(
+            iter_part(
+                reader, bahamas_bbox, img_format="PNG", max_size=600, chunk_budget=2**18, **style
+            )
+        )
+        assert len(chunks) > 3
+        np.testing.assert_array_equal(_png_array(b"".join(chunks)), expected)
+        tif = b"".join(iter_part(reader, bahamas_bbox, max_size=600, chunk_budget=2**18, **style))
+    with rasterio.MemoryFile(tif) as memfile, memfile.open() as dataset:
+        assert dataset.profile["tiled"]
+        assert dataset.compression.name == "deflate"
+        assert dataset.crs == rasterio.crs.CRS.from_string(style.get("dst_crs", "EPSG:32618"))
+        np.testing.assert_array_equal(np.moveaxis(dataset.read(), 0, -1), expected)
+
+
+def test_write_part(bahamas_file, bahamas_bbox, tmp_path):
+    with get_reader(bahamas_file) as reader:
+        result = write_part(
+            reader, bahamas_bbox, tmp_path / "out.tif", chunk_budget=2**20, indexes=[1]
+        )
+        assert (result["width"], result["height"]) == (reader.dataset.width, reader.dataset.height)
+        assert result["strips"] > 1
+        png = write_part(reader, bahamas_bbox, tmp_path / "out.png", img_format="PNG")
+        assert png["strips"] == 1
+    with rasterio.open(tmp_path / "out.tif") as dataset:
+        assert dataset.count == 2
+        assert dataset.colorinterp[-1] == rasterio.enums.ColorInterp.alpha
+        assert dataset.block_shapes[0] == (512, 512)
+    assert _png_array((tmp_path / "out.png").read_bytes()).shape[-1] == 4
+    assert not list(tmp_path.glob("*.partial"))
+
+
+def test_stream_invalid(bahamas_file, bahamas_bbox):
+    with get_reader(bahamas_file) as reader:
+        with pytest.raises(ValueError, match="Streaming supports"):
+            iter_part(reader, bahamas_bbox, img_format="JPEG")
+        with pytest.raises(ValueError, match="chunk_budget"):
+            iter_part(reader, bahamas_bbox, chunk_budget=0)
+        with pytest.raises(ValueError, match="stretch"):
+            iter_part(reader, bahamas_bbox, stretch="bogus")
+
+
+def test_stream_endpoint(bahamas_file, bahamas_bbox):
+    app = create_app(part_chunk_budget=2**18)
+    bbox = ",".join(str(v) for v in bahamas_bbox)
+    params = {"filename": bahamas_file, "bbox": bbox, "max_size": 600}
+    with TestClient(app) as client:
+        expected = client.get("/api/part.png", params=params)
+        r = client.get("/api/part.png", params={**params, "stream": True})
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "image/png"
+        assert r.headers["ETag"]
+        np.testing.assert_array_equal(_png_array(r.content), _png_array(expected.content))
+        r = client.get("/api/part.tif", params={**params, "stream": True})
+        assert r.status_code == 200
+        with rasterio.MemoryFile(r.content) as memfile, memfile.open() as dataset:
+            assert dataset.width == 600
+        r = client.get("/api/part.jpeg", params={**params, "stream": True})
+        assert r.status_code == 400
+        r = client.get("/api/part.png", params={**params, "stream": True, "stretch": "bogus"})
+        assert r.status_code == 400
+    with pytest.raises(ValueError, match="part_chunk_budget"):
+        create_app(part_chunk_budget=0)
+
+
+def test_client_write_part(bahamas_file, tmp_path):
+    client = TileClient(bahamas_file)
+    try:
+        bottom, top, left, right = client.bounds()
+        result = client.write_part(
+            tmp_path / "part.png",
+            (left, bottom, right, top),
+            encoding="png",
+            max_size=256,
+            bounds_crs="EPSG:4326",
+            colormap="viridis",
+        )
+        assert max(result["width"], result["height"]) == 256
+        assert _png_array((tmp_path / "part.png").read_bytes()).shape[-1] == 4
+    finally:
+        client.shutdown(force=True)
@@ -0,0 +1,114 @@
+"""Tests for Terrain-RGB and Terrarium elevation tiles."""
+
+import io
+
+from fastapi.testclient import TestClient
+import numpy as np
+from PIL import Image
+import pytest
+
+from localtileserver.tiler import (
+    decode_terrain,
+    encode_terrain,
+    get_data_path,
+    get_reader,
+    get_terrain_tile,
+)
+from localtileserver.web import create_app
+
+TILE = (12, 829, 1565)
+
+
+@pytest.fixture
+def dem_file():
+    return get_data_path("co_elevation_roi.tif")
+
+
+def _rgba(content):
+    return np.asarray(Image.open(io.BytesIO(content)).convert("RGBA")).transpose(2, 0, 1)
+
+
+@pytest.mark.parametrize(("scheme", "resolution"), [("mapbox", 0.1), ("terrarium", 1 / 256)])
+def test_encode_decode_roundtrip(scheme, resolution):
+    elevation = np.array([[-415.2, 0.0, 1234.56], [2962.3, 4401.7, 8848.86]])
+    decoded = decode_terrain(encode_terrain(elevation, scheme), scheme)
+    np.testing.assert_allclose(decoded, elevation, atol=resolution / 2 + 1e-9)
+
+
+def test_encode_known_values():
+    # 0 m is 100000 * 0.1 above the Terrain-RGB base of -10000 m
+    np.testing.assert_array_equal(encode_terrain(np.zeros((1, 1)))[:, 0, 0], [1, 134, 160])
+    np.testing.assert_array_equal(
+        encode_terrain(np.zeros((1, 1)), "terrarium")[:, 0, 0], [128, 0, 0]
+    )
+
+
+def test_encode_clips_and_handles_nan():
+    rgb = encode_terrain(np.array([[np.nan, -20000.0, 2e6]]))
+    np.testing.assert_array_equal(rgb[:, 0, 0], [0, 0, 0])
+    np.testing.assert_array_equal(rgb[:, 0, 1], [0, 0, 0])
+    np.testing.assert_array_equal(rgb[:, 0, 2], [255, 255, 255])
+
+
+def test_invalid_scheme():
+    with pytest.raises(ValueError):
+        encode_terrain(np.zeros((1, 1)), "bogus")
+
+
+@pytest.mark.parametrize("scheme", ["mapbox", "terrarium"])
+def test_get_terrain_tile(dem_file, scheme):
+    z, x, y = TILE
+    with get_reader(dem_file) as reader:
+        img = reader.tile(x, y, z, indexes=[1], nodata=np.nan)
+        tile = get_terrain_tile(reader, z, x, y, scheme=scheme)
+    assert tile.mimetype == "image/png"
+    rgba = _rgba(tile)
+    valid = ~np.ma.getmaskarray(img.array)[0]
+    np.testing.assert_array_equal(rgba[3] != 0, valid)
+    decoded = decode_terrain(rgba[:3], scheme)
+    resolution = 0.1 if scheme == "mapbox" else 1 / 256
+    np.testing.assert_allclose(decoded[valid], img.data[0][valid], atol=resolution)
+
+
+def test_get_terrain_tile_lossy_format(dem_file):
+    with get_reader(dem_file) as reader, pytest.raises(ValueError):
+        get_terrain_tile(reader, *TILE, img_format="JPEG")
+
+
+def test_terrain_endpoint(dem_file):
+    z, x, y = TILE
+    url = f"/api/terrain/{z}/{x}/{y}.webp?filename={dem_file}&scheme=terrarium"
+    with TestClient(create_app(tile_cache_size=2**20)) as client:
+        r = client.get(url)
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "image/webp"
+        assert r.headers["etag"]
+        assert client.get(url).content == r.content
+        assert client.get("/api/cache/stats").json()["tiles"]["hits"] == 1
+    # Lossless WEBP decodes to the same elevations as PNG
+    with get_reader(dem_file) as reader:
+        png = get_terrain_tile(reader, z, x, y, scheme="terrarium")
+    webp_rgba, png_rgba = _rgba(r.content), _rgba(png)
+    np.testing.assert_array_equal(webp_rgba[3], png_rgba[3])
+    # Color under fully transparent pixels is not preserved
+    valid = png_rgba[3] != 0
+    np.testing.assert_array_equal(webp_rgba[:3, valid], png_rgba[:3, valid])
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/api/terrain/12/829/1565.jpeg", "/api/terrain/12/829/1565.png?scheme=bogus"],
+)
+def test_terrain_endpoint_bad_params(flask_client, dem_file, url):
+    sep = "&" if "?" in url else "?"
+    assert flask_client.get(f"{url}{sep}filename={dem_file}").status_code == 400
+
+
+def test_terrain_endpoint_outside_bounds(flask_client, dem_file):
+    assert flask_client.get(f"/api/terrain/12/0/0.png?filename={dem_file}").status_code == 404
+
+
+def test_terrain_endpoint_missing_file(flask_client, tmp_path):
+    missing = tmp_path / "missing.tif"
+    r = flask_client.get("/api/terrain/12/829/1565.png", params={"filename": str(missing)})
+    assert r.status_code == 400
@@ -0,0 +1,96 @@
+"""Tests for the batch tile endpoint."""
+
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_bounds
+
+from localtileserver.tiler.batch import BATCH_MEDIA_TYPE, iter_batch, pack_batch_item
+from localtileserver.web import create_app
+
+TILES = [[10, 289, 441], [8, 72, 110], [10, 0, 0]]
+
+
+def test_pack_and_iter_batch():
+    data = pack_batch_item(1, 0, 1, 200, b"abc") + pack_batch_item(2, 3, 1, 404, b"")
+    items = list(iter_batch(data))
+    assert [tuple(item) for item in items] == [(1, 0, 1, 200, b"abc"), (2, 3, 1, 404, b"")]
+    with pytest.raises(ValueError):
+        list(iter_batch(data[:-1] + pack_batch_item(0, 0, 0, 200, b"x")[:5]))
+
+
+def test_batch_matches_single_tiles(bahamas_file):
+    with TestClient(create_app(tile_cache_size=2**20)) as client:
+        r = client.post(
+            f"/api/tiles/batch.png?filename={bahamas_file}&indexes=1&colormap=viridis",
+            json={"tiles": TILES},
+        )
+        assert r.status_code == 200
+        assert r.headers["content-type"] == BATCH_MEDIA_TYPE
+        assert r.headers["x-tile-format"] == "png"
+        items = list(iter_batch(r.content))
+        assert [(i.z, i.x, i.y) for i in items] == [tuple(t) for t in TILES]
+        assert [i.status for i in items] == [200, 200, 404]
+        # Batches share the cache of the single tile endpoint
+        for item in items[:2]:
+            single = client.get(
+                f"/api/tiles/{item.z}/{item.x}/{item.y}.png"
+                f"?filename={bahamas_file}&indexes=1&colormap=viridis"
+            )
+            assert single.content == item.payload
+        assert client.get("/api/cache/stats").json()["tiles"]["hits"] == 2
+
+
+def test_batch_item_errors(bahamas_file):
+    with TestClient(create_app()) as client:
+        r = client.post(
+            f"/api/tiles/batch.jpeg?filename={bahamas_file}",
+            json={"tiles": [[2, 4, 0], [2, 0, 9], [10, 289, 441]]},
+        )
+    items = list(iter_batch(r.content))
+    assert [i.status for i in items] == [400, 400, 200]
+    assert items[2].payload[:3] == b"\xff\xd8\xff"
+
+
+def test_batch_empty_tile_status(tmp_path):
+    path = tmp_path / "half_nodata.tif"
+    data = np.zeros((1, 256, 256), dtype=np.uint8)
+    data[:, :, 128:] = 200
+    profile = {
+        "driver": "GTiff",
+        "width": 256,
+        "height": 256,
+        "count": 1,
+        "dtype": "uint8",
+        "crs": "EPSG:4326",
+        "transform": from_bounds(-1, -1, 1, 1, 256, 256),
+        "nodata": 0,
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(data)
+    with TestClient(create_app(empty_tile_status=204)) as client:
+        r = client.post(
+            f"/api/tiles/batch.png?filename={path}",
+            json={"tiles": [[8, 127, 127], [8, 128, 127]]},
+        )
+    assert [(i.status, bool(i.payload)) for i in iter_batch(r.content)] == [
+        (204, False),
+        (200, True),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("url", "body"),
+    [
+        ("/api/tiles/batch.bogus", {"tiles": [[0, 0, 0]]}),
+        ("/api/tiles/batch.png?quality=0", {"tiles": [[0, 0, 0]]}),
+        ("/api/tiles/batch.png", {"tiles": [[0, 0, 0]] * 257}),
+        ("/api/tiles/batch.png", {"tiles": [[0, 0]]}),
+        ("/api/tiles/batch.png", {"tiles": [[-1, 0, 0]]}),
+    ],
+)
+def test_batch_bad_requests(flask_client, bahamas_file, url, body):
+    sep = "&" if "?" in url else "?"
+    r = flask_client.post(f"{url}{sep}filename={bahamas_file}", json=body)
+    assert r.status_code in (400, 422)